@@ -0,0 +1,229 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import AsyncOpenAI, OpenAI
+from dotenv import load_dotenv
+from metrics import counter, histogram, observe, url_template
+
+load_dotenv()
+
+# ------------------------------------------------------
+# Pool configuration
+# ------------------------------------------------------
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+KEEPALIVE_SIZE = int(os.getenv("HTTP_KEEPALIVE_SIZE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Re-entrant: the OpenAI client factories create the shared HTTP client under the same lock
+_lock = threading.RLock()
+_clients = {}
+
+# Filled by the httpcore trace hooks below
+STATS = {"requests": 0, "connections": 0, "tls_handshakes": 0}
+
+# Requests to this host are OpenAI calls and get per-call metrics
+OPENAI_BASE_URL = httpx.URL(os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1")
+OPENAI_COLLECTIONS = {"files", "vector_stores", "file_batches", "responses", "batches", "uploads"}
+OPENAI_ACTIONS = {"search", "content", "cancel", "input_items"}
+
+OPENAI_SECONDS = histogram("openai_request_seconds", "OpenAI API call latency",
+                           ["endpoint", "model", "status"])
+OPENAI_TOKENS = counter("openai_tokens_total", "OpenAI tokens by model and type (input, output, cached)",
+                        ["model", "type"])
+
+# Model calls, as opposed to file and vector store traffic
+LLM_ENDPOINTS = {"POST chat/completions", "POST responses"}
+# {endpoint: calls} for the email being handled; tasks started inside share the same dict
+llm_calls = ContextVar("llm_calls", default=None)
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=POOL_SIZE,
+        max_keepalive_connections=KEEPALIVE_SIZE,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+# ------------------------------------------------------
+# Connection accounting via httpcore trace events
+# ------------------------------------------------------
+def _count_event(name: str):
+    if name == "connection.connect_tcp.complete":
+        STATS["connections"] += 1
+    elif name == "connection.start_tls.complete":
+        STATS["tls_handshakes"] += 1
+
+
+def _trace(name, info):
+    _count_event(name)
+
+
+async def _atrace(name, info):
+    _count_event(name)
+
+
+def _on_request(request: httpx.Request):
+    STATS["requests"] += 1
+    request.extensions["trace"] = _trace
+    request.extensions["started"] = time.perf_counter()
+
+
+async def _on_request_async(request: httpx.Request):
+    STATS["requests"] += 1
+    request.extensions["trace"] = _atrace
+    request.extensions["started"] = time.perf_counter()
+
+
+# ------------------------------------------------------
+# Per-call OpenAI metrics (model, tokens, latency)
+# ------------------------------------------------------
+def _is_openai(request: httpx.Request) -> bool:
+    return request.url.host == OPENAI_BASE_URL.host and request.url.port == OPENAI_BASE_URL.port
+
+
+def _wants_body(response: httpx.Response) -> bool:
+    # Streams and file downloads are left alone; usage only comes back in JSON bodies
+    return response.headers.get("content-type", "").startswith("application/json")
+
+
+def _record_openai_call(response: httpx.Response):
+    request = response.request
+    path = request.url.path.removeprefix(OPENAI_BASE_URL.path.rstrip("/"))
+    model, usage = "", {}
+    if _wants_body(response):
+        try:
+            data = response.json()
+            model, usage = data.get("model") or "", data.get("usage") or {}
+        except ValueError:
+            pass
+
+    status = str(response.status_code)
+    endpoint = f"{request.method} {url_template(path, OPENAI_COLLECTIONS, OPENAI_ACTIONS)}"
+    observe(OPENAI_SECONDS, time.perf_counter() - request.extensions.get("started", time.perf_counter()),
+            status, endpoint=endpoint, model=model)
+
+    calls = llm_calls.get()
+    if calls is not None and endpoint in LLM_ENDPOINTS:
+        calls[endpoint] = calls.get(endpoint, 0) + 1
+
+    # Responses API: input/output_tokens; Chat Completions: prompt/completion_tokens
+    details = usage.get("input_tokens_details") or usage.get("prompt_tokens_details") or {}
+    for kind, value in (("input", usage.get("input_tokens", usage.get("prompt_tokens"))),
+                        ("output", usage.get("output_tokens", usage.get("completion_tokens"))),
+                        ("cached", details.get("cached_tokens"))):
+        if value:
+            OPENAI_TOKENS.inc(value, model=model, type=kind)
+
+
+def _on_response(response: httpx.Response):
+    if _is_openai(response.request):
+        if _wants_body(response):
+            response.read()
+        _record_openai_call(response)
+
+
+async def _on_response_async(response: httpx.Response):
+    if _is_openai(response.request):
+        if _wants_body(response):
+            await response.aread()
+        _record_openai_call(response)
+
+
+@contextmanager
+def counting_llm_calls():
+    """Count the chat/responses calls made inside the block, including by tasks it starts: yields {endpoint: n}."""
+    calls = {}
+    token = llm_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        llm_calls.reset(token)
+
+
+def _get_or_create(name: str, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+# ------------------------------------------------------
+# Shared clients
+# ------------------------------------------------------
+def get_async_http() -> httpx.AsyncClient:
+    """Process-wide pooled async HTTP client (keep-alive, bounded pool, timeouts)."""
+    return _get_or_create("async_http", lambda: httpx.AsyncClient(
+        timeout=_timeout(),
+        limits=_limits(),
+        event_hooks={"request": [_on_request_async], "response": [_on_response_async]},
+    ))
+
+
+def get_sync_http() -> httpx.Client:
+    """Process-wide pooled sync httpx client, used under the sync OpenAI client."""
+    return _get_or_create("sync_http", lambda: httpx.Client(
+        timeout=_timeout(),
+        limits=_limits(),
+        event_hooks={"request": [_on_request], "response": [_on_response]},
+    ))
+
+
+def get_async_openai() -> AsyncOpenAI:
+    """Shared AsyncOpenAI client riding on the pooled async HTTP client."""
+    return _get_or_create("async_openai", lambda: AsyncOpenAI(http_client=get_async_http(), timeout=_timeout()))
+
+
+def get_openai() -> OpenAI:
+    """Shared sync OpenAI client for background threads and scripts."""
+    return _get_or_create("openai", lambda: OpenAI(http_client=get_sync_http(), timeout=_timeout()))
+
+
+def get_requests_session() -> requests.Session:
+    """Pooled requests.Session for sync scripts such as the SLA cronjob."""
+    def factory():
+        session = requests.Session()
+        for prefix in ("http://", "https://"):
+            session.mount(prefix, HTTPAdapter(pool_connections=KEEPALIVE_SIZE, pool_maxsize=POOL_SIZE))
+        return session
+    return _get_or_create("requests", factory)
+
+
+def request_timeout() -> tuple:
+    """(connect, read) timeout tuple for requests calls."""
+    return (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+
+def pool_stats() -> dict:
+    """Requests issued vs connections opened — the difference is reused keep-alive connections."""
+    stats = dict(STATS)
+
+    session = _clients.get("requests")
+    if session is not None:
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+                if pool.scheme == "https":
+                    stats["tls_handshakes"] += pool.num_connections
+
+    stats["reused_connections"] = max(stats["requests"] - stats["connections"], 0)
+    stats["pool_size"] = POOL_SIZE
+    stats["keepalive_size"] = KEEPALIVE_SIZE
+    return stats
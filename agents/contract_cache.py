@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from normalizers import finance_terms_class, normalize_address, same_name
+
+CONTRACT_CACHE_DB = os.getenv("CONTRACT_CACHE_DB", "contract_cache.db")
+# Page extractions unused for this long are dropped
+CONTRACT_CACHE_RETENTION_DAYS = float(os.getenv("CONTRACT_CACHE_RETENTION_DAYS", "90"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_fields (
+    page_hash  TEXT PRIMARY KEY,
+    fields     TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_fields_last_used ON page_fields (last_used);
+
+CREATE TABLE IF NOT EXISTS contract_revisions (
+    address_key TEXT NOT NULL,
+    revision    INTEGER NOT NULL,
+    document    TEXT NOT NULL,
+    page_hashes TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    PRIMARY KEY (address_key, revision)
+);
+"""
+
+_init_lock = threading.Lock()
+_initialised = False
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(CONTRACT_CACHE_DB, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _ensure_schema():
+    global _initialised
+    if _initialised:
+        return
+    with _init_lock:
+        if _initialised:
+            return
+        with _connect() as conn:
+            conn.executescript(SCHEMA)
+        _initialised = True
+
+
+def page_hash(text: str, context: str = "") -> str:
+    """
+    Fingerprint of one page's text plus the end of the page before it
+    (whitespace-insensitive). The context is included because a field that
+    starts on the previous page is extracted with this one.
+    """
+    canonical = " ".join(context.split()) + "\f" + " ".join(text.split())
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------
+# Page extraction cache
+# ------------------------------------------------------
+def cached_pages(hashes: list) -> dict:
+    """{page_hash: fields} for the hashes already extracted."""
+    _ensure_schema()
+    found = {}
+    if hashes:
+        marks = ",".join("?" * len(hashes))
+        with _connect() as conn:
+            rows = conn.execute(f"SELECT page_hash, fields FROM page_fields WHERE page_hash IN ({marks})",
+                                hashes).fetchall()
+            conn.execute(f"UPDATE page_fields SET last_used = ? WHERE page_hash IN ({marks})",
+                         [time.time(), *hashes])
+        found = {h: json.loads(fields) for h, fields in rows}
+    return found
+
+
+def store_pages(fields_by_hash: dict):
+    """Save freshly extracted page fields and drop entries past the retention window."""
+    _ensure_schema()
+    now = time.time()
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT OR REPLACE INTO page_fields (page_hash, fields, created_at, last_used) VALUES (?, ?, ?, ?)",
+            [(h, json.dumps(fields), now, now) for h, fields in fields_by_hash.items()],
+        )
+        conn.execute("DELETE FROM page_fields WHERE last_used < ?",
+                     (now - CONTRACT_CACHE_RETENTION_DAYS * 86400,))
+        conn.execute("COMMIT")
+
+
+# ------------------------------------------------------
+# Contract revisions per property
+# ------------------------------------------------------
+def record_revision(property_address: str, document: str, page_hashes: dict) -> dict:
+    """
+    Store this revision's page fingerprints ({page number: hash}) and compare them with the
+    previous revision for the property. Returns {"revision", "changed_pages"}; every page
+    counts as changed in a first revision. A re-sent copy of the latest revision is not
+    stored again: its revision number comes back with no changed pages.
+    """
+    _ensure_schema()
+    key = normalize_address(property_address)
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT revision, page_hashes FROM contract_revisions WHERE address_key = ? "
+            "ORDER BY revision DESC LIMIT 1", (key,)).fetchone()
+        if row and json.loads(row[1]) == {str(page): h for page, h in page_hashes.items()}:
+            conn.execute("COMMIT")
+            return {"revision": row[0], "changed_pages": []}
+        revision = (row[0] if row else 0) + 1
+        previous = set(json.loads(row[1]).values()) if row else set()
+        conn.execute("INSERT INTO contract_revisions VALUES (?, ?, ?, ?, ?)",
+                     (key, revision, document, json.dumps(page_hashes), time.time()))
+        conn.execute("COMMIT")
+    return {"revision": revision, "changed_pages": [page for page, h in page_hashes.items() if h not in previous]}
+
+
+# ------------------------------------------------------
+# Merging per-page fields into one contract
+# ------------------------------------------------------
+def _merge_purchasers(pages: list) -> list:
+    """Purchasers from every page, joined by name; nameless entries fill the last named purchaser."""
+    merged = []
+    for fields in pages:
+        for purchaser in fields.get("Purchaser") or []:
+            first, last = purchaser.get("First_Name"), purchaser.get("Last_Name")
+            target = None
+            if first or last:
+                target = next((p for p in merged if same_name(p.get("First_Name") or "", first or "")
+                               and same_name(p.get("Last_Name") or "", last or "")), None)
+                if target is None:
+                    merged.append(dict(purchaser))
+                    continue
+            elif merged:
+                target = merged[-1]
+            if target is not None:
+                for key, value in purchaser.items():
+                    if value and not target.get(key):
+                        target[key] = value
+    return merged
+
+
+def merge_pages(pages: list) -> dict:
+    """
+    One ContractExtractedModel dict from per-page extractions, in page order.
+    The first page stating a field wins, except Finance_Terms: any page that
+    makes the contract subject to finance decides it.
+    """
+    merged = {"Purchaser": _merge_purchasers(pages)}
+    for fields in pages:
+        for key, value in fields.items():
+            if key == "Purchaser" or value in (None, ""):
+                continue
+            if key == "Finance_Terms" and finance_terms_class(value) == "subject":
+                merged[key] = value
+            merged.setdefault(key, value)
+    return merged
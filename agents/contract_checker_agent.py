@@ -1,31 +1,26 @@
 import os
 import json
-import requests
-from openai import OpenAI
-from typing import Optional, List
-from pydantic import BaseModel
+import asyncio
 from search_vs import search_vector_store
 from vendor import add_vendor
-
-class IncorrectField(BaseModel):
-    Field: str
-    EOI_Value: Optional[str]  # Some fields may be empty in the EOI
-    Contract_Value: Optional[str]  # null allowed when missing from contract
-
-
-class ContractValidationModel(BaseModel):
-    Contract_Validation: bool
-    Incorrect_Fields: List[IncorrectField]
-
-def upload_file_to_openai(client, file_path: str):
-    with open(file_path, "rb") as f:
-        uploaded = client.files.create(
-            file=f,
-            purpose="assistants"   # required for responses API
-        )
-    return uploaded.id
-
-def contract_checker(state):
+from file_registry import attachment_name, upload_file_to_openai
+from clients import get_async_openai
+from mailer import send_email
+from documents import pdf_attachments, process_documents
+from contract_pages import PAGE_FILTER_MODE, describe, estimate_tokens, select_pages, write_pages
+from contract_diff import ContractExtractedModel, ContractPagesModel, diff_contract
+from contract_cache import cached_pages, merge_pages, page_hash, record_revision, store_pages
+from metrics import counter
+
+# Cache per-page extractions by page hash, so a revised contract only re-extracts the pages that changed
+CONTRACT_PAGE_CACHE = os.getenv("CONTRACT_PAGE_CACHE", "true").lower() == "true"
+
+CONTRACT_TOKENS = counter("contract_checker_text_tokens_total",
+                          "Estimated contract text tokens: whole documents vs what was sent", ["kind"])
+CONTRACT_CACHE_PAGES = counter("contract_checker_cached_pages_total",
+                               "Relevant contract pages served from the page cache vs re-extracted", ["result"])
+
+async def contract_checker(state):
     print("\n📌 Detected contract email — activating CONTRACT CHECKER agent...\n")
 
     email = state["email"]
@@ -35,130 +30,202 @@ def contract_checker(state):
     email_body   = email.get("body")
     vendor_email = email.get("from")
 
-    client = OpenAI()
-
-    for attachment in attachments:
-        pdf_path = attachment
-
-    # 1️⃣ Upload file first → get file_id
-    file_id = upload_file_to_openai(client, pdf_path)
-    os.remove(pdf_path)
-
-    CONTRACT_CHECKER_PROMPT = """
-You are a Contract Validation AI Agent working for OneCorp Australia. Your job is to compare Contract of Sale values against the correct values extracted from an Expression of Interest (EOI).
-
-The EOI JSON below contains authoritative values:
----
-{eoi_json}
----
-
-Important Validation Rules (follow EXACTLY):
-
-1. A mismatch MUST be reported **only if BOTH of the following are true**:
-    a. The EOI field has a real, non-empty value  
-       (meaning: NOT null, NOT "", NOT " ", NOT missing)  
-    b. The Contract contains a value for the same field AND it conflicts with the EOI value.
-
-2. If the EOI value is empty (null, "", or whitespace), then:
-    - EVEN IF the contract contains a value → **IGNORE this field completely**  
-    - It must NOT be included in Incorrect_Fields.
-
-3. If the contract does not mention a field at all:
-    - DO NOT count it as a mismatch (missing contract fields are allowed).
-
-4. Subtle contradictions MUST still be flagged.
-   Example:
-   EOI Finance_Terms = "Not Subject to Finance"
-   Contract clause implies responsibility for securing finance approval.
-   → Treat this as a mismatch in Finance_Terms.
-
-5. Only detect mismatches for fields appearing in BOTH:
-    - EOI has a real value
-    - Contract explicitly states a different value
-
-6. NEVER output mismatches where:
-    - EOI value is empty/null  
-    - EOI value is missing  
-    - Contract has additional details not present in EOI  
-
-### Extract from the contract:
-- Purchaser Names
-- Purchaser Emails
-- Purchaser Mobiles
-- Residential Address (if present)
-- Lot Number
-- Property Address
-- Project Name
-- Total Price
-- Land Price
-- Build Price
-- Finance Terms
-- Solicitor Name
-- Solicitor Email
-- Finance Provider (optional)
-
-Then apply the rules above.
-
-### OUTPUT FORMAT (strict)
-
-Return ONLY this JSON:
-
-{{
-  "Contract_Validation": <true_or_false>,
-  "Incorrect_Fields": [
-      {{
-        "Field": "<Field_Name>",
-        "EOI_Value": "<Value_From_EOI>",
-        "Contract_Value": "<Value_From_Contract>"
-      }}
-  ]
-}}
+    client = get_async_openai()
+
+    pdf_paths = pdf_attachments(attachments)
+    if not pdf_paths:
+        print("⚠️ No PDF attached — nothing to validate.")
+        return {"documents": []}
+
+    CONTRACT_EXTRACTION_PROMPT = """
+You are a contract data extraction AI working for OneCorp Australia. You will be given a Contract of Sale
+(or the relevant pages of one).
+
+Extract these fields exactly as the contract states them:
+- Purchaser: one entry per purchaser with First_Name, Last_Name, Purchaser_Email, Purchaser_Mobile
+- Residential_Address (the purchasers' own address, if present)
+- Lot_Number
+- Property_Address
+- Project_Name
+- Total_Price
+- Land_Price
+- Build_Price
+- Finance_Terms
+- Solicitor_Name
+- Solicitor_Email
+- Finance_Provider
 
 Rules:
-- If **no mismatches** exist → return:
-{{
-  "Contract_Validation": true,
-  "Incorrect_Fields": []
-}}
-
-- Otherwise:
-{{
-  "Contract_Validation": false,
-  "Incorrect_Fields": [...]
-}}
-
-- Do NOT include fields where EOI_Value was empty/null.
-- Do NOT include fields missing in the contract.
-- No explanations, no markdown, no comments.
+1. Use null for any field the contract does not state. Never guess or copy from elsewhere.
+2. Finance_Terms must be "Subject to Finance" or "Not Subject to Finance", reflecting the contract's
+   effective position. A clause that makes the purchasers responsible for securing finance approval means
+   "Subject to Finance" even where another clause says otherwise. Use null if finance is not mentioned.
+3. Copy amounts, phone numbers and emails as written; formatting is normalised later.
+4. Return only the JSON. No explanation or markdown.
+    """
+
+    PAGES_PROMPT = """
+5. The contract is given page by page, each under "=== Page N ===". Return one entry per page in Pages,
+   with Page = N and Fields holding only what that page states (null and an empty Purchaser list otherwise).
+   Text under "[End of previous page]" is context only: use it to complete a field that continues onto
+   the page, never on its own.
     """
 
 
-    eoi_json = search_vector_store(email_body)
-    prompt = CONTRACT_CHECKER_PROMPT.format(eoi_json=eoi_json)
+    eoi_json = await search_vector_store(email_body, state.get("understanding"))
 
     print("🤖 Validating Contract of Sale against EOI values...")
 
     # Persisting Vendor
-    add_vendor(eoi_json["Property_Address"],vendor_email)
-
-    # 2️⃣ Reference the file via file_id in the input
-    response = client.responses.parse(
-        model="gpt-4.1",
-        input=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "input_text", "text": prompt},
-                    {"type": "input_file", "file_id": file_id}
-                ]
-            }
-        ],
-        text_format=ContractValidationModel  # Pydantic automatic validation!
-    )
-
-    response = json.loads(response.output_text)
+    # Log append, compaction and flock are blocking file I/O; keep them off the event loop
+    await asyncio.to_thread(add_vendor, eoi_json["Property_Address"], vendor_email)
+
+    async def select(pdf_path: str):
+        """Relevant-page selection, or None when the filter is off or the PDF is scanned."""
+        if PAGE_FILTER_MODE == "off":
+            return None
+        selection = await asyncio.to_thread(select_pages, pdf_path)
+        if selection["scanned"] or not selection["kept"]:
+            return None
+        print(f"📄 {attachment_name(pdf_path)}: {describe(selection)}")
+        CONTRACT_TOKENS.inc(selection["full_tokens"], kind="full")
+        return selection
+
+    async def contract_input(pdf_path: str, selection) -> dict:
+        """The contract part of the prompt: relevant pages only, unless the filter is off or the PDF is scanned."""
+        if selection is None:
+            file_id = await upload_file_to_openai(client, pdf_path)
+            return {"type": "input_file", "file_id": file_id}
+
+        CONTRACT_TOKENS.inc(selection["kept_tokens"], kind="sent")
+        if PAGE_FILTER_MODE == "pdf":
+            reduced = await asyncio.to_thread(write_pages, pdf_path, selection["kept"])
+            try:
+                file_id = await upload_file_to_openai(client, reduced)
+            finally:
+                os.remove(reduced)
+            return {"type": "input_file", "file_id": file_id}
+
+        text = f"Contract of Sale — relevant pages only:\n\n{selection['text']}"
+        return {"type": "input_text", "text": text}
+
+    async def extract(contract: dict) -> dict:
+        # The model only extracts; the prompt holds no EOI data, so it is identical for every deal
+        response = await client.responses.parse(
+            model="gpt-4.1",
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": CONTRACT_EXTRACTION_PROMPT},
+                        contract
+                    ]
+                }
+            ],
+            text_format=ContractExtractedModel  # Pydantic automatic validation!
+        )
+        return json.loads(response.output_text)
+
+    async def extract_pages(pages: list) -> dict:
+        """{page number: fields} for the given kept pages, in one request."""
+        text = "\n\n".join(
+            f"=== Page {p['page']} ===\n"
+            + (f"[End of previous page]\n{p['context']}\n[Page {p['page']}]\n" if p["context"] else "")
+            + p["text"]
+            for p in pages
+        )
+        CONTRACT_TOKENS.inc(estimate_tokens(text), kind="sent")
+        response = await client.responses.parse(
+            model="gpt-4.1",
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": CONTRACT_EXTRACTION_PROMPT + PAGES_PROMPT},
+                        {"type": "input_text", "text": f"Contract of Sale — changed pages only:\n\n{text}"}
+                    ]
+                }
+            ],
+            text_format=ContractPagesModel
+        )
+        extracted = {p["Page"]: p["Fields"] for p in json.loads(response.output_text)["Pages"]}
+        missing = [p["page"] for p in pages if p["page"] not in extracted]
+        if missing:
+            raise RuntimeError(f"Page extraction skipped page(s) {missing}")
+        return extracted
+
+    async def extract_cached(pdf_path: str, selection: dict) -> tuple:
+        """Fields merged from cached and freshly extracted pages, plus the revision/cache report."""
+        pages = selection["kept_pages"]
+        hashes = {p["page"]: page_hash(p["text"], p["context"]) for p in pages}
+        cached = await asyncio.to_thread(cached_pages, list(hashes.values()))
+
+        changed = [p for p in pages if hashes[p["page"]] not in cached]
+        if changed:
+            extracted = await extract_pages(changed)
+            fresh = {hashes[number]: fields for number, fields in extracted.items() if number in hashes}
+            await asyncio.to_thread(store_pages, fresh)
+            cached.update(fresh)
+        CONTRACT_CACHE_PAGES.inc(len(pages) - len(changed), result="hit")
+        CONTRACT_CACHE_PAGES.inc(len(changed), result="extracted")
+
+        fields = merge_pages([cached[hashes[p["page"]]] for p in pages])
+        revision = await asyncio.to_thread(record_revision, eoi_json["Property_Address"],
+                                           attachment_name(pdf_path), hashes)
+        report = {
+            **revision,
+            "pages_cached": len(pages) - len(changed),
+            "pages_extracted": [p["page"] for p in changed],
+            # This contract's pages served from the cache
+            "hit_ratio": round((len(pages) - len(changed)) / len(pages), 3) if pages else 0.0,
+        }
+        print(f"🧩 {attachment_name(pdf_path)}: revision {report['revision']}, "
+              f"re-extracted {len(changed)} of {len(pages)} page(s), "
+              f"cache hit ratio {report['hit_ratio']:.0%}")
+        return fields, report
+
+    async def validate(pdf_path: str) -> dict:
+        # 1️⃣ Relevant pages as text (or an uploaded file_id for scanned PDFs)
+        selection = await select(pdf_path)
+
+        # 2️⃣ Fields: per page through the cache for text selections, else one whole-contract extraction
+        cache = None
+        if selection is not None and PAGE_FILTER_MODE == "text" and CONTRACT_PAGE_CACHE:
+            fields, cache = await extract_cached(pdf_path, selection)
+        else:
+            fields = await extract(await contract_input(pdf_path, selection))
+
+        # 3️⃣ Validation rules applied locally (contract_diff.py)
+        result = diff_contract(eoi_json, fields)
+        result["Contract_Fields"] = fields
+        if selection is not None:
+            result["Pages"] = {k: selection[k] for k in ("pages", "kept", "full_tokens", "kept_tokens", "reduction")}
+        if cache is not None:
+            result["Cache"] = cache
+        return result
+
+    # The contract and every annexure are validated concurrently
+    documents = await process_documents(pdf_paths, validate)
+    failed = [d for d in documents if d["status"] == "error"]
+    if failed:
+        # Approving a contract with an unchecked document is worse than retrying the email
+        raise RuntimeError(f"{len(failed)} of {len(documents)} attachment(s) could not be validated: "
+                           f"{failed[0]['error']}")
     print("📥 Contract validation complete.")
 
+    # Merge per-document results: valid only if every document is
+    incorrect = []
+    for document in documents:
+        for field in document["output"]["Incorrect_Fields"]:
+            field = {**field, "Document": document["attachment"]}
+            if not any(f["Field"] == field["Field"] and f["Contract_Value"] == field["Contract_Value"]
+                       for f in incorrect):
+                incorrect.append(field)
+    response = {
+        "Contract_Validation": all(d["output"]["Contract_Validation"] for d in documents) and not incorrect,
+        "Incorrect_Fields": incorrect,
+    }
+
     purchasers = ""
     for i in eoi_json["Purchaser"]:
         purchasers += f"{i['First_Name']} {i['Last_Name']} & "
@@ -183,15 +250,7 @@ Kind regards,
 OneCorp"""
         to_email = eoi_json["Solicitor_Email"]
 
-        API_URL = "http://localhost:4000/send-email"
-
-        payload = {
-            "recipient": to_email,
-            "subject": subject,
-            "body": body
-        }
-
-        requests.post(API_URL, json=payload)
+        await send_email(to_email, subject, body)
         print("📤 Solicitor notified successfully.\n")
 
     else:
@@ -199,7 +258,8 @@ OneCorp"""
         # Construct revision email to Vendor and internal team
         incorrect_fields = ""
         for field in response["Incorrect_Fields"]:
-            incorrect_fields += f"- {field['Field']}: EOI Value = '{field['EOI_Value']}', Contract Value ='{field['Contract_Value']}'\n"
+            source = f" ({field['Document']})" if len(documents) > 1 else ""
+            incorrect_fields += f"- {field['Field']}{source}: EOI Value = '{field['EOI_Value']}', Contract Value ='{field['Contract_Value']}'\n"
         subject = f"Contract of Sale Discrepancies for {purchasers} - {address}"
         body = f"""
 Greetings,
@@ -214,26 +274,12 @@ OneCorp Support Team"""
         to_email = vendor_email
         to_email_internal = "myvostro925@gmail.com"
 
-        API_URL = "http://localhost:4000/send-email"
-
-        payload_1 = {
-            "recipient": to_email,
-            "subject": subject,
-            "body": body
-        }
-
-        payload_2 = {
-            "recipient": to_email_internal,
-            "subject": subject,
-            "body": body
-        }
-
-        requests.post(API_URL, json=payload_1)
+        # One message: vendor in To, internal team in CC
+        await send_email(to_email, subject, body, cc=[to_email_internal])
         print("📧 Sending discrepancy report to vendor:", vendor_email)
-        requests.post(API_URL, json=payload_2)
-        print("📧 Sending internal notification...")
+        print("📧 Sending internal notification (CC)...")
     print("🎯 Contract Validator AGENT complete.\n")
-    return state
+    return {"documents": documents}
 
 
 
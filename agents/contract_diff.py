@@ -0,0 +1,158 @@
+from typing import Optional, List
+from pydantic import BaseModel
+from normalizers import (
+    finance_terms_class, normalize_address, normalize_amount, normalize_email, normalize_lot,
+    normalize_phone, normalize_text, same_name,
+)
+
+
+# ------------------------------------------------------
+# Schemas
+# ------------------------------------------------------
+class IncorrectField(BaseModel):
+    Field: str
+    EOI_Value: Optional[str]  # Some fields may be empty in the EOI
+    Contract_Value: Optional[str]  # null allowed when missing from contract
+
+
+class ContractValidationModel(BaseModel):
+    Contract_Validation: bool
+    Incorrect_Fields: List[IncorrectField]
+
+
+class ContractPurchaserModel(BaseModel):
+    First_Name: Optional[str] = None
+    Last_Name: Optional[str] = None
+    Purchaser_Email: Optional[str] = None
+    Purchaser_Mobile: Optional[str] = None
+
+
+class ContractExtractedModel(BaseModel):
+    """Mirrors EOIExtractedModel; None wherever the contract does not state the field."""
+    Purchaser: List[ContractPurchaserModel]
+    Residential_Address: Optional[str] = None
+    Lot_Number: Optional[str] = None
+    Property_Address: Optional[str] = None
+    Project_Name: Optional[str] = None
+    Total_Price: Optional[str] = None
+    Land_Price: Optional[str] = None
+    Build_Price: Optional[str] = None
+    Finance_Terms: Optional[str] = None
+    Solicitor_Name: Optional[str] = None
+    Solicitor_Email: Optional[str] = None
+    Finance_Provider: Optional[str] = None
+
+
+class ContractPageModel(BaseModel):
+    Page: int
+    Fields: ContractExtractedModel
+
+
+class ContractPagesModel(BaseModel):
+    """Per-page extraction, so each page's fields can be cached by page hash."""
+    Pages: List[ContractPageModel]
+
+
+# ------------------------------------------------------
+# Field comparison
+# ------------------------------------------------------
+def _project_key(value: str) -> str:
+    return normalize_text(value).removesuffix(" estate")
+
+
+# Field → normalizer; values are equal when their normalised forms are
+FIELD_NORMALIZERS = {
+    "Residential_Address": normalize_address,
+    "Lot_Number": normalize_lot,
+    "Property_Address": normalize_address,
+    "Project_Name": _project_key,
+    "Total_Price": normalize_amount,
+    "Land_Price": normalize_amount,
+    "Build_Price": normalize_amount,
+    "Finance_Terms": finance_terms_class,
+    "Solicitor_Email": normalize_email,
+    "Finance_Provider": normalize_text,
+}
+PURCHASER_NORMALIZERS = {
+    "Purchaser_Email": normalize_email,
+    "Purchaser_Mobile": normalize_phone,
+}
+
+
+def _present(value) -> bool:
+    return value is not None and str(value).strip() != ""
+
+
+def _full_name(purchaser: dict) -> str:
+    return f"{purchaser.get('First_Name') or ''} {purchaser.get('Last_Name') or ''}".strip()
+
+
+def _same_purchaser(eoi_p: dict, contract_p: dict) -> bool:
+    """
+    Compare normalised full names, so a name the contract puts entirely in
+    First_Name (or in the other order) still matches. A part the contract
+    leaves empty is unknown, not different.
+    """
+    return same_name(_full_name(eoi_p), _full_name(contract_p))
+
+
+def _mismatch(field: str, eoi_value, contract_value) -> dict:
+    return {"Field": field, "EOI_Value": eoi_value, "Contract_Value": contract_value}
+
+
+def _compare(field: str, eoi_value, contract_value, normalizer) -> list:
+    # Rules 1-3: only a real EOI value that the contract states differently is a mismatch
+    if not _present(eoi_value) or not _present(contract_value):
+        return []
+    if normalizer(eoi_value) == normalizer(contract_value):
+        return []
+    return [_mismatch(field, eoi_value, contract_value)]
+
+
+def _compare_purchasers(eoi_purchasers: list, contract_purchasers: list) -> list:
+    """Pair purchasers by name (then by position), report wrong names and each pair's contact details."""
+    contract_purchasers = [p for p in contract_purchasers if _present(_full_name(p))]
+    unmatched = list(contract_purchasers)
+    incorrect = []
+
+    for index, eoi_p in enumerate(eoi_purchasers):
+        name = _full_name(eoi_p)
+        if not name:
+            continue
+        match = next((p for p in unmatched if _same_purchaser(eoi_p, p)), None)
+        if match is None and unmatched:
+            # Not named in the contract: compare with the purchaser in the same position
+            match = unmatched[min(index, len(unmatched) - 1)]
+            incorrect.append(_mismatch("Purchaser_Name", name, _full_name(match)))
+        elif match is None:
+            if contract_purchasers:
+                listed = " & ".join(_full_name(p) for p in contract_purchasers)
+                incorrect.append(_mismatch("Purchaser_Name", name, listed))
+            continue
+        unmatched.remove(match)
+
+        for field, normalizer in PURCHASER_NORMALIZERS.items():
+            incorrect += _compare(f"{field} ({name})", eoi_p.get(field), match.get(field), normalizer)
+    return incorrect
+
+
+def diff_contract(eoi: dict, contract: dict) -> dict:
+    """
+    Apply the contract checker's validation rules to extracted contract fields.
+
+    - EOI fields that are empty are ignored, whatever the contract says.
+    - Fields the contract does not state are not mismatches.
+    - Values are compared after normalisation (amounts, AU phone numbers,
+      names, emails, addresses, finance terms), so formatting never counts.
+    Returns a ContractValidationModel dict.
+    """
+    incorrect = _compare_purchasers(eoi.get("Purchaser") or [], contract.get("Purchaser") or [])
+    for field, normalizer in FIELD_NORMALIZERS.items():
+        incorrect += _compare(field, eoi.get(field), contract.get(field), normalizer)
+
+    # Names compare by words, not equality
+    eoi_solicitor, contract_solicitor = eoi.get("Solicitor_Name"), contract.get("Solicitor_Name")
+    if _present(eoi_solicitor) and _present(contract_solicitor) and not same_name(eoi_solicitor, contract_solicitor):
+        incorrect.append(_mismatch("Solicitor_Name", eoi_solicitor, contract_solicitor))
+
+    return ContractValidationModel(Contract_Validation=not incorrect, Incorrect_Fields=incorrect).model_dump()
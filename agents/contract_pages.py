@@ -0,0 +1,121 @@
+import os
+import re
+import heapq
+import tempfile
+from pypdf import PdfReader, PdfWriter
+
+# text: send only the relevant pages' text; pdf: upload a PDF of just those pages; off: whole PDF
+PAGE_FILTER_MODE = os.getenv("CONTRACT_PAGE_FILTER", "text").lower()
+# A page is relevant when its field score reaches this
+PAGE_MIN_SCORE = float(os.getenv("CONTRACT_PAGE_MIN_SCORE", "2"))
+# Upper bound on pages kept from very long contracts (the best-scoring ones, in page order)
+PAGE_MAX_KEPT = int(os.getenv("CONTRACT_PAGE_MAX_KEPT", "12"))
+# Average characters per page below which the PDF is treated as scanned and sent whole
+MIN_TEXT_CHARS_PER_PAGE = int(os.getenv("CONTRACT_MIN_TEXT_CHARS", "40"))
+# End of the previous page kept with each page, for fields that run across a page break
+PAGE_CONTEXT_CHARS = int(os.getenv("CONTRACT_PAGE_CONTEXT_CHARS", "300"))
+
+# ------------------------------------------------------
+# Field signals, one group per field of ContractExtractedModel.
+# A page scores the best weight matched in each group, summed over groups,
+# so a page of repeated dollar amounts does not outrank the particulars.
+# ------------------------------------------------------
+FIELD_SIGNALS = {
+    "Purchaser_Names": [(r"\bpurchasers?\s*(names?)?\s*:", 2), (r"^\s*\d+(\.\d+)*\s+purchasers?\b", 2),
+                        (r"\bpurchasers?\b", 0.5)],
+    "Purchaser_Emails": [(r"[\w.+-]+@[\w-]+(\.[\w-]+)+", 1), (r"\be-?mail\s*:", 1)],
+    "Purchaser_Mobiles": [(r"\b(mobile|phone|tel)\s*:", 1), (r"(\+61\s?|\b0)4\d{2}\s?\d{3}\s?\d{3}\b", 1)],
+    "Residential_Address": [(r"\bresidential address\b", 2)],
+    "Lot_Number": [(r"\blot\s*(number|no\.?|#)?\s*:?\s*\d+", 2)],
+    "Property_Address": [(r"\b(property|address)\s*:", 2), (r"\b(VIC|NSW|QLD|SA|WA|TAS|ACT|NT)\s+\d{4}\b", 1)],
+    "Project_Name": [(r"\b(project|estate)\s*:", 2)],
+    "Prices": [(r"\b(total|land|build)\s+(purchase\s+)?price\b", 2), (r"\$\s?\d[\d,]*", 1)],
+    "Finance_Terms": [(r"\bsubject to finance\b", 3), (r"\bfinance\b", 1.5)],
+    "Solicitor": [(r"\bsolicitor\b", 2), (r"\bconveyanc", 1)],
+    "Finance_Provider": [(r"\b(lender|finance provider|mortgagee|broker)\b", 1)],
+}
+_SIGNALS = {
+    field: [(re.compile(pattern, re.IGNORECASE | re.MULTILINE), weight) for pattern, weight in signals]
+    for field, signals in FIELD_SIGNALS.items()
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough OpenAI token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def score_page(text: str) -> tuple:
+    """(score, fields matched) for one page of contract text."""
+    score, fields = 0.0, []
+    for field, signals in _SIGNALS.items():
+        best = max((weight for regex, weight in signals if regex.search(text)), default=0)
+        if best:
+            score += best
+            fields.append(field)
+    return score, fields
+
+
+def select_pages(pdf_path: str, min_score: float = PAGE_MIN_SCORE, max_kept: int = PAGE_MAX_KEPT) -> dict:
+    """
+    Read the text layer page by page and keep the pages that carry contract fields.
+
+    Only the text of the best `max_kept` pages is held at any time, so memory
+    stays bounded however long the contract is. Returns:
+      {"pages", "kept" (1-based page numbers), "kept_pages" ([{"page", "text", "context"}]),
+       "fields", "text", "full_tokens", "kept_tokens", "reduction", "scanned"}
+    where "context" is the end of the preceding page.
+    """
+    reader = PdfReader(pdf_path)
+    best = []               # min-heap of (score, -page, text, fields, context)
+    total_chars = full_tokens = 0
+    pages = len(reader.pages)
+    previous = ""
+
+    for index in range(pages):
+        text = (reader.pages[index].extract_text() or "").strip()
+        context, previous = previous[-PAGE_CONTEXT_CHARS:], text
+        total_chars += len(text)
+        full_tokens += estimate_tokens(text)
+        score, fields = score_page(text)
+        # The first page carries the particulars of sale in every template we have seen
+        if score < min_score and index != 0:
+            continue
+        item = (score, -index, text, fields, context)
+        if len(best) < max_kept:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    kept = sorted(best, key=lambda item: -item[1])
+    text = "\n\n".join(f"--- Page {-item[1] + 1} of {pages} ---\n{item[2]}" for item in kept)
+    kept_tokens = estimate_tokens(text)
+    return {
+        "pages": pages,
+        "kept": [-item[1] + 1 for item in kept],
+        "kept_pages": [{"page": -item[1] + 1, "text": item[2], "context": item[4]} for item in kept],
+        "fields": sorted({f for item in kept for f in item[3]}),
+        "text": text,
+        "full_tokens": full_tokens,
+        "kept_tokens": kept_tokens,
+        "reduction": round(1 - kept_tokens / full_tokens, 3) if full_tokens else 0.0,
+        "scanned": pages > 0 and total_chars / pages < MIN_TEXT_CHARS_PER_PAGE,
+    }
+
+
+def write_pages(pdf_path: str, page_numbers: list) -> str:
+    """Copy the given 1-based pages into a temporary PDF and return its path (caller removes it)."""
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for number in page_numbers:
+        writer.add_page(reader.pages[number - 1])
+    fd, path = tempfile.mkstemp(prefix="contract-pages-", suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def describe(selection: dict) -> str:
+    return (f"pages {','.join(map(str, selection['kept']))} of {selection['pages']}, "
+            f"~{selection['full_tokens']} → ~{selection['kept_tokens']} tokens "
+            f"(-{selection['reduction']:.0%})")
@@ -0,0 +1,237 @@
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from deadline_store import DATETIME_FORMAT, MELBOURNE
+
+# No time stated → 09:00 local
+DEFAULT_TIME = time(9, 0)
+# Reminder: appointment date + REMINDER_DAYS, at REMINDER_TIME local
+REMINDER_DAYS = 2
+REMINDER_TIME = time(9, 0)
+# A time belongs to the nearest date on the same line, at most this many characters away
+TIME_WINDOW = 60
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tues": 1, "tue": 1, "wednesday": 2, "weds": 2, "wed": 2,
+    "thursday": 3, "thurs": 3, "thur": 3, "thu": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+# Abbreviations that are also everyday words only count next to an explicit date
+STANDALONE_WEEKDAYS = [w for w in WEEKDAYS if w not in ("sat", "sun", "wed")]
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sept": 9, "sep": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12,
+}
+
+
+def _alternation(words) -> str:
+    return "|".join(sorted(words, key=len, reverse=True))
+
+
+_WD, _MON = _alternation(WEEKDAYS), _alternation(MONTHS)
+_WEEKDAY_PREFIX = rf"(?:(?P<wd>{_WD})\.?,?\s+)?"
+_YEAR = r"(?:,?\s+(?P<year>(?:19|20)\d{2})\b)?"
+# "3/12 Smith Street" is a unit number, not the 3rd of December
+_NOT_STREET = (r"(?!\s+(?:[a-z]+\s+){1,2}(?:street|st|road|rd|avenue|ave|drive|dr|court|ct|place|pl|lane|ln|way"
+               r"|crescent|cres|boulevard|blvd|parade|pde|close|cl|rise|terrace|tce|highway|hwy)\b)")
+
+# Explicit dates, most specific first: "Thursday 14th of March 2026", "March 14, 2026", "14/03/2026", "2026-03-14"
+DATE_PATTERNS = [
+    re.compile(rf"\b{_WEEKDAY_PREFIX}(?:the\s+)?(?P<day>\d{{1,2}})(?:st|nd|rd|th)?(?:\s+of)?\s+(?P<mon>{_MON})\b\.?{_YEAR}",
+               re.IGNORECASE),
+    re.compile(rf"\b{_WEEKDAY_PREFIX}(?P<mon>{_MON})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\b{_YEAR}", re.IGNORECASE),
+    re.compile(r"\b(?P<year>\d{4})-(?P<mon>\d{1,2})-(?P<day>\d{1,2})\b"),
+    re.compile(rf"\b{_WEEKDAY_PREFIX}(?P<day>\d{{1,2}})[/.-](?P<mon>\d{{1,2}})[/.-](?P<year>\d{{4}}|\d{{2}})\b", re.IGNORECASE),
+    re.compile(rf"\b{_WEEKDAY_PREFIX}(?P<day>\d{{1,2}})/(?P<mon>\d{{1,2}})\b(?![/.-]\d){_NOT_STREET}", re.IGNORECASE),
+]
+RELATIVE_RE = re.compile(r"\b(?P<rel>(?:the\s+)?day after tomorrow|tomorrow|today)\b", re.IGNORECASE)
+WEEKDAY_RE = re.compile(rf"\b(?:(?P<which>this|next|coming|this coming)\s+)?(?P<wd>{_alternation(STANDALONE_WEEKDAYS)})\b\.?",
+                        re.IGNORECASE)
+
+TIME_PATTERNS = [
+    re.compile(r"\b(?P<h>\d{1,2})(?:[:.](?P<m>[0-5]\d))?\s*(?P<ampm>[ap])\.?m\b\.?", re.IGNORECASE),
+    re.compile(r"\b(?P<h>[01]?\d|2[0-3]):(?P<m>[0-5]\d)\b(?!\s*[ap]\.?m\b)", re.IGNORECASE),
+    re.compile(r"\b(?P<h>[01]\d|2[0-3])(?P<m>[0-5]\d)\s*(?:hrs|hours|h)\b", re.IGNORECASE),
+    re.compile(r"\b(?P<noon>noon|midday)\b", re.IGNORECASE),
+]
+# "10am - 11am", "10:00 to 11:00": the appointment starts at the first time
+RANGE_JOIN_RE = re.compile(r"^\s*(?:-|–|—|to|until|till)\s*$", re.IGNORECASE)
+BETWEEN_RE = re.compile(r"\bbetween\s*$", re.IGNORECASE)
+
+# Quoted replies and forwarded headers repeat older dates
+QUOTE_START_RE = re.compile(r"^\s*(?:On .{0,200}wrote:|-{2,}\s*Original Message|From:\s)", re.IGNORECASE | re.MULTILINE)
+
+
+# ------------------------------------------------------
+# Melbourne wall-clock arithmetic
+# ------------------------------------------------------
+def local_datetime(day: date, at: time) -> datetime:
+    """
+    Australia/Melbourne wall-clock time on `day`. A time that does not exist
+    because the clocks went forward (02:00–03:00 on the first Sunday of
+    October) moves forward an hour, as a clock on the wall would.
+    """
+    moment = datetime.combine(day, at, tzinfo=MELBOURNE)
+    return moment.astimezone(timezone.utc).astimezone(MELBOURNE)
+
+
+def appointment_fields(appointment: datetime) -> dict:
+    """SigningAppointment dict: the appointment and its reminder (date + 2 days, 09:00), both local."""
+    reminder = local_datetime(appointment.date() + timedelta(days=REMINDER_DAYS), REMINDER_TIME)
+    return {
+        "appointment_datetime": appointment.strftime(DATETIME_FORMAT),
+        "reminder_datetime": reminder.strftime(DATETIME_FORMAT),
+    }
+
+
+# ------------------------------------------------------
+# Parsing
+# ------------------------------------------------------
+def _mask(text: str, start: int, end: int) -> str:
+    return text[:start] + " " * (end - start) + text[end:]
+
+
+def _year(value: str | None, month: int, day: int, today: date) -> int | None:
+    """Stated year (2-digit → 20xx), or the year of the next occurrence of day/month."""
+    if value:
+        return int(value) + 2000 if len(value) == 2 else int(value)
+    try:
+        return today.year if date(today.year, month, day) >= today else today.year + 1
+    except ValueError:
+        return today.year + 1 if month == 2 and day == 29 else None
+
+
+def _weekday_date(weekday: int, which: str | None, today: date) -> date:
+    """
+    "Thursday" / "this Thursday": the next Thursday, today included.
+    "next Thursday": the Thursday of next week (Monday start).
+    """
+    if (which or "").lower() == "next":
+        next_monday = today + timedelta(days=7 - today.weekday())
+        return next_monday + timedelta(days=weekday)
+    return today + timedelta(days=(weekday - today.weekday()) % 7)
+
+
+def _find_dates(text: str, today: date) -> tuple:
+    """
+    ([(start, end, date or None), ...], text with the dates blanked out).
+    None marks a date that does not exist, such as 31/11.
+    """
+    found = []
+    for pattern in DATE_PATTERNS:
+        for m in pattern.finditer(text):
+            mon = m.group("mon")
+            month = MONTHS[mon.lower().rstrip(".")] if not mon.isdigit() else int(mon)
+            day = int(m.group("day"))
+            if not 1 <= month <= 12:
+                text = _mask(text, m.start(), m.end())     # "12/45 Smith St": not a date at all
+                continue
+            year = _year(m.groupdict().get("year"), month, day, today)
+            try:
+                value = date(year, month, day) if year else None
+            except ValueError:
+                value = None
+            found.append((m.start(), m.end(), value))
+            # A weekday that disagrees with the date leaves two readings
+            wd = m.groupdict().get("wd")
+            if value and wd and WEEKDAYS[wd.lower()] != value.weekday():
+                found.append((m.start(), m.end(), _weekday_date(WEEKDAYS[wd.lower()], None, today)))
+            text = _mask(text, m.start(), m.end())
+
+    for m in RELATIVE_RE.finditer(text):
+        rel = m.group("rel").lower()
+        offset = 0 if rel == "today" else 1 if rel == "tomorrow" else 2
+        found.append((m.start(), m.end(), today + timedelta(days=offset)))
+        text = _mask(text, m.start(), m.end())
+
+    for m in WEEKDAY_RE.finditer(text):
+        found.append((m.start(), m.end(), _weekday_date(WEEKDAYS[m.group("wd").lower()], m.group("which"), today)))
+        text = _mask(text, m.start(), m.end())
+    return sorted(found, key=lambda item: item[0]), text
+
+
+def _find_times(text: str) -> list:
+    """[(start, end, time), ...] in text order, dropping the end of "10am - 11am" / "between 2 and 3pm" ranges."""
+    found = []
+    for pattern in TIME_PATTERNS:
+        for m in pattern.finditer(text):
+            if m.groupdict().get("noon"):
+                value = time(12, 0)
+            else:
+                hour, minute = int(m.group("h")), int(m.group("m") or 0)
+                ampm = (m.groupdict().get("ampm") or "").lower()
+                if ampm and not 1 <= hour <= 12:
+                    continue
+                if ampm == "p" and hour != 12:
+                    hour += 12
+                elif ampm == "a" and hour == 12:
+                    hour = 0
+                value = time(hour, minute)
+            found.append((m.start(), m.end(), value))
+            text = _mask(text, m.start(), m.end())
+    found.sort(key=lambda item: item[0])
+
+    kept = []
+    for item in found:
+        if kept:
+            join = text[kept[-1][1]:item[0]]
+            if RANGE_JOIN_RE.match(join) or (join.strip().lower() == "and"
+                                             and BETWEEN_RE.search(text[:kept[-1][0]])):
+                continue
+        kept.append(item)
+    return kept
+
+
+def _line_of(text: str, position: int) -> int:
+    return text.count("\n", 0, position)
+
+
+def parse_appointment(text: str, now: datetime | None = None) -> dict:
+    """
+    Find the signing appointment in an email's text, in Australia/Melbourne time.
+
+    Understands explicit dates (day first), today/tomorrow, weekdays with
+    "this"/"next", am/pm and 24-hour times, noon; no time means 09:00. Dates
+    before today (a contract's date, say) are not candidates, and quoted
+    replies are ignored. Returns {"appointment", "candidates", "reason"}:
+    "appointment" is a datetime only when exactly one candidate is found,
+    and "reason" is "ok", "no_date" or "ambiguous".
+    """
+    now = (now or datetime.now(MELBOURNE)).astimezone(MELBOURNE)
+    today = now.date()
+    quote = QUOTE_START_RE.search(text or "")
+    text = "\n".join(line for line in (text or "")[:quote.start() if quote else None].splitlines()
+                     if not line.lstrip().startswith(">"))
+
+    dates, rest = _find_dates(text, today)
+    times = _find_times(rest)
+
+    # Each time attaches to the nearest date mention on its line
+    attached = {index: [] for index in range(len(dates))}
+    for t_start, t_end, value in times:
+        nearby = [(min(abs(t_start - d_end), abs(d_start - t_end)), index)
+                  for index, (d_start, d_end, _) in enumerate(dates)
+                  if _line_of(text, d_start) == _line_of(text, t_start)]
+        closest = min((distance for distance, _ in nearby), default=None)
+        if closest is not None and closest <= TIME_WINDOW:
+            # Two readings of one mention ("Thursday 17 October") share its time
+            for distance, index in nearby:
+                if distance == closest:
+                    attached[index].append(value)
+
+    candidates, invalid = [], False
+    for index, (_, _, day) in enumerate(dates):
+        if day is None:
+            invalid = True
+            continue
+        if day < today:
+            continue
+        for at in sorted(set(attached[index])) or [DEFAULT_TIME]:
+            moment = local_datetime(day, at)
+            if moment not in candidates:
+                candidates.append(moment)
+
+    # A date that does not exist (31/11) is a typo the LLM may be able to read
+    reason = "ok" if len(candidates) == 1 and not invalid else "ambiguous" if candidates or invalid else "no_date"
+    return {"appointment": candidates[0] if reason == "ok" else None, "candidates": candidates, "reason": reason}
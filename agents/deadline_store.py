@@ -0,0 +1,228 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from contextlib import contextmanager
+from normalizers import normalize_address
+
+DEADLINES_DB = os.getenv("DEADLINES_DB", "deadlines.db")
+DEADLINES_DIR = "deadlines"   # legacy one-file-per-address store, migrated on first use
+MELBOURNE = ZoneInfo("Australia/Melbourne")
+DATETIME_FORMAT = "%d-%m-%Y %H:%M"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deadlines (
+    address_key          TEXT PRIMARY KEY,
+    property_address     TEXT NOT NULL,
+    appointment_datetime TEXT,
+    reminder_datetime    TEXT NOT NULL,
+    reminder_at          REAL NOT NULL,
+    payload              TEXT NOT NULL,
+    updated_at           REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deadlines_reminder_at ON deadlines (reminder_at);
+"""
+
+_init_lock = threading.Lock()
+_initialised = False
+
+# callback(address_key, reminder_at or None) after every write in this process (the SLA scheduler)
+_listeners = []
+
+
+@contextmanager
+def _connect():
+    conn = sqlite3.connect(DEADLINES_DB, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _ensure_schema():
+    global _initialised
+    if _initialised:
+        return
+    with _init_lock:
+        if _initialised:
+            return
+        with _connect() as conn:
+            conn.executescript(SCHEMA)
+        _initialised = True
+    migrate_json_dir()
+
+
+def parse_local_datetime(value: str) -> datetime:
+    """Parse "dd-mm-yyyy HH:MM" as Australia/Melbourne wall-clock time."""
+    return datetime.strptime(value, DATETIME_FORMAT).replace(tzinfo=MELBOURNE)
+
+
+def _row_to_record(row) -> dict:
+    return json.loads(row[0])
+
+
+def subscribe(callback):
+    """Call `callback(address_key, reminder_at)` after each upsert, and with None after each delete."""
+    _listeners.append(callback)
+
+
+def _notify(address_key: str, reminder_at: float | None):
+    for callback in _listeners:
+        callback(address_key, reminder_at)
+
+
+# ------------------------------------------------------
+# Writes
+# ------------------------------------------------------
+def upsert_deadline(record: dict):
+    """
+    Insert or replace the deadline for record["Property_Address"] in one atomic statement.
+    The record keeps the legacy JSON shape (appointment_datetime, reminder_datetime,
+    Property_Address, Purchaser).
+    """
+    _ensure_schema()
+    address = record["Property_Address"]
+    reminder_at = parse_local_datetime(record["reminder_datetime"]).timestamp()
+
+    with _connect() as conn:
+        conn.execute(
+            """
+            INSERT INTO deadlines (address_key, property_address, appointment_datetime,
+                                   reminder_datetime, reminder_at, payload, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (address_key) DO UPDATE SET
+                property_address     = excluded.property_address,
+                appointment_datetime = excluded.appointment_datetime,
+                reminder_datetime    = excluded.reminder_datetime,
+                reminder_at          = excluded.reminder_at,
+                payload              = excluded.payload,
+                updated_at           = excluded.updated_at
+            """,
+            (
+                normalize_address(address),
+                address,
+                record.get("appointment_datetime"),
+                record["reminder_datetime"],
+                reminder_at,
+                json.dumps(record),
+                datetime.now().timestamp(),
+            ),
+        )
+    _notify(normalize_address(address), reminder_at)
+
+
+def delete_deadline(property_address: str) -> bool:
+    """Stop tracking a property. Returns True if a deadline was removed."""
+    _ensure_schema()
+    key = normalize_address(property_address)
+    with _connect() as conn:
+        cur = conn.execute("DELETE FROM deadlines WHERE address_key = ?", (key,))
+    if cur.rowcount > 0:
+        _notify(key, None)
+    return cur.rowcount > 0
+
+
+def delete_deadline_if(address_key: str, reminder_at: float) -> bool:
+    """Delete the deadline only if its reminder has not been moved since it was read."""
+    _ensure_schema()
+    with _connect() as conn:
+        cur = conn.execute("DELETE FROM deadlines WHERE address_key = ? AND reminder_at = ?",
+                           (address_key, reminder_at))
+    if cur.rowcount > 0:
+        _notify(address_key, None)
+    return cur.rowcount > 0
+
+
+# ------------------------------------------------------
+# Reads
+# ------------------------------------------------------
+def get_deadline(property_address: str) -> dict | None:
+    """Look up a deadline by (normalised) property address."""
+    _ensure_schema()
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT payload FROM deadlines WHERE address_key = ?",
+            (normalize_address(property_address),),
+        ).fetchone()
+    return _row_to_record(row) if row else None
+
+
+def list_addresses() -> list:
+    """Property addresses of every open deadline."""
+    _ensure_schema()
+    with _connect() as conn:
+        return [r[0] for r in conn.execute("SELECT property_address FROM deadlines")]
+
+
+def list_address_keys() -> list:
+    """(normalised key, property address) of every open deadline."""
+    _ensure_schema()
+    with _connect() as conn:
+        return conn.execute("SELECT address_key, property_address FROM deadlines").fetchall()
+
+
+def scheduled_reminders() -> list:
+    """(reminder_at, address_key) of every open deadline, for the SLA scheduler's heap."""
+    _ensure_schema()
+    with _connect() as conn:
+        return conn.execute("SELECT reminder_at, address_key FROM deadlines").fetchall()
+
+
+def due_record(address_key: str, reminder_at: float) -> dict | None:
+    """The deadline, if it is still scheduled for `reminder_at`."""
+    _ensure_schema()
+    with _connect() as conn:
+        row = conn.execute("SELECT payload FROM deadlines WHERE address_key = ? AND reminder_at = ?",
+                           (address_key, reminder_at)).fetchone()
+    return _row_to_record(row) if row else None
+
+
+def due_before(moment: datetime) -> list:
+    """Deadlines whose reminder is at or before `moment`, oldest first (index range scan)."""
+    _ensure_schema()
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT payload FROM deadlines WHERE reminder_at <= ? ORDER BY reminder_at",
+            (moment.timestamp(),),
+        ).fetchall()
+    return [_row_to_record(r) for r in rows]
+
+
+# ------------------------------------------------------
+# One-time migration from deadlines/*.json
+# ------------------------------------------------------
+def migrate_json_dir(directory: str = DEADLINES_DIR) -> int:
+    """
+    Import legacy deadlines/<address>.json files into the store.
+    Each imported file is renamed to *.json.migrated so it is never imported twice.
+    """
+    if not os.path.isdir(directory):
+        return 0
+
+    migrated = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+            record.setdefault("Property_Address", name[:-len(".json")])
+            upsert_deadline(record)
+        except Exception as e:
+            print(f"⚠️ Could not migrate {name}:", e)
+            continue
+        os.replace(path, path + ".migrated")
+        migrated += 1
+
+    if migrated:
+        print(f"📦 Migrated {migrated} deadline file(s) into {DEADLINES_DB}")
+    return migrated
+
+
+if __name__ == "__main__":
+    _ensure_schema()
+    print(f"{len(list_addresses())} open deadline(s) in {DEADLINES_DB}")
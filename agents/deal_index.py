@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import heapq
+import threading
+from collections import defaultdict
+from normalizers import expand_street_types, normalize_address, normalize_name, normalize_text, trigrams
+
+DEAL_INDEX_FILE = "deal_index.jsonl"
+
+# A match is trusted when it scores at least MATCH_THRESHOLD and beats
+# the runner-up by more than AMBIGUITY_MARGIN.
+MATCH_THRESHOLD = float(os.getenv("DEAL_MATCH_THRESHOLD", "0.75"))
+AMBIGUITY_MARGIN = float(os.getenv("DEAL_AMBIGUITY_MARGIN", "0.1"))
+
+# Candidate generation skips trigrams shared by too many deals (" vic", "300" ...)
+MAX_POSTING_FRACTION = 0.02
+MIN_POSTING_CAP = 50
+MAX_CANDIDATES = 50
+
+ADDRESS_WEIGHT = 0.6
+NAMES_WEIGHT = 0.3
+LOT_WEIGHT = 0.1
+
+
+class DealIndex:
+    """
+    In-process index of ingested EOI JSON, keyed by normalised property address,
+    lot number and purchaser names, with trigram matching against free email text.
+    """
+
+    def __init__(self, path: str | None = DEAL_INDEX_FILE):
+        self.path = path
+        self.deals = {}       # deal key → EOI dict
+        self.keys = {}        # deal key → (address trigrams, [name trigrams], lot)
+        self.postings = defaultdict(set)
+        self.sources = {}     # sha256 of the EOI PDF → EOI dict extracted from it
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def load(self):
+        """Replay the append-only JSONL file; later lines win."""
+        with self.lock:
+            if self.loaded:
+                return
+            if self.path and os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            eoi = json.loads(line)
+                            source = eoi.pop("_source", None)
+                            self._index(eoi)
+                            if source:
+                                self.sources[source] = eoi
+            self.loaded = True
+
+    def add(self, eoi: dict, persist: bool = True, source: str | None = None) -> bool:
+        """
+        Upsert a deal by property address and append it to the JSONL file.
+        `source` is the sha256 of the PDF it was extracted from (see `ingested`).
+        Returns False, writing nothing, when the same deal is already indexed.
+        """
+        self.load()
+        with self.lock:
+            changed = self.deals.get(normalize_address(eoi.get("Property_Address", ""))) != eoi
+            new_source = bool(source) and source not in self.sources
+            if changed:
+                self._index(eoi)
+            if source:
+                self.sources[source] = eoi
+            if (changed or new_source) and persist and self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({**eoi, "_source": source} if source else eoi) + "\n")
+            return changed
+
+    def ingested(self, source: str) -> dict | None:
+        """The EOI already extracted from the PDF with this sha256, if any."""
+        self.load()
+        with self.lock:
+            return self.sources.get(source)
+
+    def remove(self, eoi: dict):
+        """Drop a deal from the in-memory index unless it was re-indexed since (the JSONL file is left as is)."""
+        key = normalize_address(eoi.get("Property_Address", ""))
+        with self.lock:
+            if self.deals.get(key) is eoi:
+                self._unindex(key)
+
+    def __len__(self) -> int:
+        return len(self.deals)
+
+    def _index(self, eoi: dict):
+        key = normalize_address(eoi.get("Property_Address", ""))
+        if not key:
+            return
+        if key in self.keys:
+            self._unindex(key)
+
+        address_grams = trigrams(key)
+        name_grams = [
+            trigrams(normalize_name(f"{p.get('First_Name', '')} {p.get('Last_Name', '')}"))
+            for p in eoi.get("Purchaser") or []
+        ]
+        lot = normalize_text(str(eoi.get("Lot_Number") or ""))
+
+        self.deals[key] = eoi
+        self.keys[key] = (address_grams, name_grams, lot)
+        for gram in address_grams.union(*name_grams):
+            self.postings[gram].add(key)
+
+    def _unindex(self, key: str):
+        address_grams, name_grams, _ = self.keys.pop(key)
+        for gram in address_grams.union(*name_grams):
+            self.postings[gram].discard(key)
+        self.deals.pop(key, None)
+
+    # --------------------------------------------------
+    # Search
+    # --------------------------------------------------
+    def search(self, text: str, limit: int = 5) -> list:
+        """Return up to `limit` (score, EOI dict) candidates, best first."""
+        self.load()
+        query = expand_street_types(normalize_text(text))
+        query_grams = trigrams(query)
+
+        with self.lock:
+            cap = max(MIN_POSTING_CAP, int(len(self.deals) * MAX_POSTING_FRACTION))
+            hits = defaultdict(int)
+            for gram in query_grams:
+                keys = self.postings.get(gram)
+                if keys and len(keys) <= cap:
+                    for key in keys:
+                        hits[key] += 1
+
+            candidates = heapq.nlargest(MAX_CANDIDATES, hits, key=hits.get)
+            scored = [(self._score(key, query, query_grams), key) for key in candidates]
+            scored = heapq.nlargest(limit, scored)
+            return [(round(score, 3), self.deals[key]) for score, key in scored]
+
+    def _score(self, key: str, query: str, query_grams: set) -> float:
+        address_grams, name_grams, lot = self.keys[key]
+
+        address = len(address_grams & query_grams) / len(address_grams)
+        weights, total = ADDRESS_WEIGHT, ADDRESS_WEIGHT * address
+
+        if name_grams:
+            names = sum(len(g & query_grams) / len(g) for g in name_grams) / len(name_grams)
+            weights += NAMES_WEIGHT
+            total += NAMES_WEIGHT * names
+
+        if lot:
+            weights += LOT_WEIGHT
+            if re.search(rf"\blot #? ?{re.escape(lot)}\b", query):
+                total += LOT_WEIGHT
+
+        return total / weights
+
+    def find(self, text: str):
+        """
+        Resolve an email to a single deal.
+        Returns (eoi, candidates); eoi is None on a miss or an ambiguous match.
+        """
+        candidates = self.search(text)
+        if not candidates or candidates[0][0] < MATCH_THRESHOLD:
+            return None, candidates
+        if len(candidates) > 1 and candidates[1][0] > candidates[0][0] - AMBIGUITY_MARGIN:
+            return None, candidates
+        return candidates[0][1], candidates
+
+
+DEAL_INDEX = DealIndex()
+
+
+def add_deal(eoi: dict, source: str | None = None) -> bool:
+    """Add an extracted EOI to the shared local index; False if it was already there."""
+    return DEAL_INDEX.add(eoi, source=source)
+
+
+def ingested_deal(source: str) -> dict | None:
+    """The EOI already ingested from the PDF with this sha256, if any."""
+    return DEAL_INDEX.ingested(source)
+
+
+def find_deal(text: str):
+    """Look up the deal an email refers to in the shared local index."""
+    return DEAL_INDEX.find(text)
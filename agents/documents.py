@@ -0,0 +1,50 @@
+import os
+import time
+import asyncio
+from file_registry import attachment_name, release_attachment
+
+# Attachments of one email uploaded/extracted at the same time
+ATTACHMENT_CONCURRENCY = int(os.getenv("ATTACHMENT_CONCURRENCY", "4"))
+
+
+def pdf_attachments(attachments) -> list:
+    """The PDF attachment paths of an email, in order."""
+    return [a for a in attachments or [] if attachment_name(a).lower().endswith(".pdf")]
+
+
+async def process_documents(paths: list, handler, limit: int = ATTACHMENT_CONCURRENCY) -> list:
+    """
+    Run `handler(path)` for every attachment with at most `limit` in flight.
+
+    Returns one record per attachment, in input order:
+      {"attachment", "path", "status": "ok" | "error", "output", "error", "seconds"}
+    A failing attachment is recorded, not raised, so the others still finish.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(path: str) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            record = {"attachment": attachment_name(path), "path": path,
+                      "status": "ok", "output": None, "error": None}
+            try:
+                record["output"] = await handler(path)
+            except Exception as e:
+                record["status"], record["error"] = "error", repr(e)
+            finally:
+                release_attachment(path)
+            record["seconds"] = round(time.perf_counter() - start, 3)
+
+        icon = "✅" if record["status"] == "ok" else "❌"
+        print(f"{icon} {record['attachment']} processed in {record['seconds']:.2f}s"
+              + (f": {record['error']}" if record["error"] else ""))
+        return record
+
+    return list(await asyncio.gather(*(run(path) for path in paths)))
+
+
+def raise_if_any_failed(documents: list):
+    """Surface a failure to the caller (and the mail queue's retry) when any attachment failed."""
+    errors = [d["error"] for d in documents if d["status"] == "error"]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(documents)} attachment(s) failed: {errors[0]}")
@@ -0,0 +1,87 @@
+import re
+from normalizers import normalize_address, trigrams
+
+# A fuzzy match is trusted when it scores at least MATCH_THRESHOLD and beats
+# the runner-up by more than AMBIGUITY_MARGIN.
+MATCH_THRESHOLD = 0.8
+AMBIGUITY_MARGIN = 0.1
+
+# Candidates handed to the LLM when no single match clears the threshold
+LLM_CANDIDATE_LIMIT = 20
+
+DOCUMENT_LINE_RE = re.compile(r"document\s*:|contract of sale", re.IGNORECASE)
+LABEL_RE = re.compile(r"(document\s*:|contract of sale(\s+of real estate)?)\s*[–—:\-]*\s*", re.IGNORECASE)
+POSTCODE_RE = re.compile(r"\b(\d{4})\b\s*$")
+
+
+# ------------------------------------------------------
+# DocuSign email parsing
+# ------------------------------------------------------
+def find_document_line(email_body: str) -> str | None:
+    """Return the line naming the contract, preferring an explicit "Document:" line."""
+    lines = [line.strip() for line in (email_body or "").splitlines() if line.strip()]
+    for line in lines:
+        if re.search(r"document\s*:", line, re.IGNORECASE):
+            return line
+    for line in lines:
+        if DOCUMENT_LINE_RE.search(line):
+            return line
+    return None
+
+
+def core_property_string(document_line: str) -> str:
+    """
+    Strip the "Document:" / "Contract of Sale –" labels and the "Lot N" prefix.
+    "Document: Contract of Sale – Lot 95 Fake Rise VIC 3336" → "Fake Rise VIC 3336"
+    """
+    labels = list(LABEL_RE.finditer(document_line))
+    text = document_line[labels[-1].end():] if labels else document_line
+    text = re.sub(r"^\s*lot\s*#?\s*\d+[a-z]?\s*[,–—\-]?\s*", "", text, flags=re.IGNORECASE)
+    return text.strip(" ,.–—-")
+
+
+def extract_property(email_body: str) -> str | None:
+    """Core property string of a DocuSign email, or None if no contract line is found."""
+    line = find_document_line(email_body)
+    if line is None:
+        return None
+    return core_property_string(line) or None
+
+
+# ------------------------------------------------------
+# Address matching
+# ------------------------------------------------------
+def _dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def match_address(core: str, candidates: list) -> tuple[str | None, list]:
+    """
+    Match a core property string against (address_key, property_address) pairs.
+    Returns (property_address, ranked) where ranked is [(score, property_address), ...]
+    best first; property_address is None when nothing clears the threshold or
+    the best two are too close to call.
+    """
+    key = normalize_address(core)
+
+    # Exact normalised match — the common case
+    exact = [address for candidate_key, address in candidates if candidate_key == key]
+    if len(exact) == 1:
+        return exact[0], [(1.0, exact[0])]
+
+    # Postcodes must agree when both sides have one
+    postcode = POSTCODE_RE.search(key)
+    if postcode:
+        same = [c for c in candidates if c[0].endswith(postcode.group(1))]
+        candidates = same or candidates
+
+    query = trigrams(key)
+    ranked = sorted(
+        ((round(_dice(query, trigrams(candidate_key)), 3), address) for candidate_key, address in candidates),
+        reverse=True,
+    )
+    if not ranked or ranked[0][0] < MATCH_THRESHOLD:
+        return None, ranked
+    if len(ranked) > 1 and ranked[1][0] > ranked[0][0] - AMBIGUITY_MARGIN:
+        return None, ranked
+    return ranked[0][1], ranked
@@ -1,8 +1,19 @@
-import os
-from openai import OpenAI
+import asyncio
 from pydantic import BaseModel
 from typing import List, Optional
 from dotenv import load_dotenv
+from file_registry import attachment_name, attachment_sha256, upload_file_to_openai
+from documents import pdf_attachments, process_documents, raise_if_any_failed
+from deal_index import add_deal, ingested_deal
+from vs_ingest import ingest_eoi
+from clients import get_async_openai
+from eoi_local_extractor import (
+    SHADOW_MODE,
+    extract_eoi_local,
+    low_confidence_fields,
+    merge_with_llm,
+    record_shadow_comparison,
+)
 
 load_dotenv()
 
@@ -28,48 +39,10 @@ class EOIExtractedModel(BaseModel):
     Finance_Provider: Optional[str] = None
 
 
-def upload_file_to_openai(client, file_path: str):
-    with open(file_path, "rb") as f:
-        uploaded = client.files.create(
-            file=f,
-            purpose="assistants"   # required for responses API
-        )
-    return uploaded.id
-
-def ingest_eoi_to_vector_store(EOI_JSON, sender_email):
-    client = OpenAI()
-    vector_store_id = os.getenv("OPENAI_VS_ID")
-    with open("temp.txt", "w", encoding="utf-8") as f:
-        f.write(EOI_JSON)
-    response = client.vector_stores.files.upload_and_poll(vector_store_id=vector_store_id,
-                                                        file=open("temp.txt", "rb"),
-                                                        attributes=
-                                                            {
-                                                                "sender_email": sender_email,                                                  
-                                                            }
-                                                        ,                                                        
-                                                        poll_interval_ms=2000)
-    os.remove("temp.txt")
-    return response
-
-
-def eoi_extractor(state):
-    print("📌 Detected Expression of Interest email — activating EOI extraction agent...")
-
-    email = state["email"]
-
-    attachments = email.get("attachments")
-    from_email  = email.get("from")
-    body        = email.get("body")
-
-    client = OpenAI()
-
-    for attachment in attachments:
-        pdf_path = attachment
-
-    # 1️⃣ Upload file first → get file_id
-    file_id = upload_file_to_openai(client, pdf_path)
-    os.remove(pdf_path)
+async def llm_extract_eoi(client, pdf_path: str, body: str, uncertain: list) -> dict:
+    """Extract the EOI with GPT-4.1, steering it towards the fields we were unsure of."""
+    # Upload file first → get file_id
+    file_id = await upload_file_to_openai(client, pdf_path)
 
     PROMPT_TEMPLATE = """
     You are an expert document extraction AI. You will be given:
@@ -118,9 +91,11 @@ def eoi_extractor(state):
     """
 
     prompt = PROMPT_TEMPLATE.format(email_text=body)
+    if uncertain:
+        prompt += "\n    Pay particular attention to these fields: " + ", ".join(uncertain) + "\n"
 
-    # 2️⃣ Reference the file via file_id in the input
-    response = client.responses.parse(
+    # Reference the file via file_id in the input
+    response = await client.responses.parse(
         model="gpt-4.1",
         input=[
             {
@@ -133,8 +108,68 @@ def eoi_extractor(state):
         ],
         text_format=EOIExtractedModel  # Pydantic automatic validation!
     )
-    ingest_eoi_to_vector_store(response.output_text, from_email)
-    print("📥 Ingested extracted EOI JSON into vector store...")
-    print("🎯 EOI AGENT complete.\n")
-    return state
+    return response.output_parsed.model_dump()
+
+
+async def extract_eoi(client, pdf_path: str, body: str) -> dict:
+    """One EOI PDF → validated EOI fields: local template first, LLM only where unsure."""
+    # 1️⃣ Local fast path — read the OneCorp template without calling the LLM
+    try:
+        local_fields, confidence = await asyncio.to_thread(extract_eoi_local, pdf_path, body or "")
+    except Exception as e:
+        print("⚠️ Local EOI extraction failed, falling back to LLM:", e)
+        local_fields, confidence = {}, {field: 0.0 for field in EOIExtractedModel.model_fields}
+    uncertain = low_confidence_fields(confidence)
+
+    # 2️⃣ LLM only for low-confidence fields (or always, in shadow mode)
+    if uncertain or SHADOW_MODE:
+        if uncertain:
+            print("🤔 Low-confidence fields, asking the LLM:", ", ".join(uncertain))
+        llm_fields = await llm_extract_eoi(client, pdf_path, body, uncertain)
+        if SHADOW_MODE and local_fields:
+            record_shadow_comparison(pdf_path, local_fields, llm_fields, confidence)
+        fields = merge_with_llm(local_fields, llm_fields, uncertain)
+    else:
+        print("⚡ All EOI fields extracted locally — skipping LLM round trip.")
+        fields = local_fields
+
+    return EOIExtractedModel.model_validate(fields).model_dump()
+
+
+async def eoi_extractor(state):
+    print("📌 Detected Expression of Interest email — activating EOI extraction agent...")
+
+    email = state["email"]
+
+    attachments = email.get("attachments")
+    from_email  = email.get("from")
+    body        = email.get("body")
 
+    client = get_async_openai()
+
+    pdf_paths = pdf_attachments(attachments)
+    if not pdf_paths:
+        print("⚠️ No PDF attached — nothing to extract.")
+        return {"documents": []}
+
+    async def ingest(path: str) -> dict:
+        # A retried email skips the EOIs it already ingested, so only the failed ones run again
+        source = await asyncio.to_thread(attachment_sha256, path)
+        done = await asyncio.to_thread(ingested_deal, source)
+        if done is not None:
+            print(f"♻️ EOI from {attachment_name(path)} already ingested — skipping.")
+            return done
+        eoi = await extract_eoi(client, path, body)
+        if await asyncio.to_thread(add_deal, eoi, source):
+            # Indexed in the background; search_vs sees it locally until the vector store has it
+            ingest_eoi(eoi, from_email)
+            print(f"📥 Queued extracted EOI JSON from {attachment_name(path)} for the vector store...")
+        return eoi
+
+    # Every EOI in the email is extracted concurrently (bounded by ATTACHMENT_CONCURRENCY).
+    # Each is ingested as soon as it is extracted; if any failed the email is raised for retry.
+    documents = await process_documents(pdf_paths, ingest)
+    raise_if_any_failed(documents)
+
+    print("🎯 EOI AGENT complete.\n")
+    return {"documents": documents}
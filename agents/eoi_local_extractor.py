@@ -0,0 +1,320 @@
+import os
+import re
+import json
+import time
+from datetime import datetime
+from pypdf import PdfReader
+
+# Fields scoring below this are handed to the LLM for a second opinion.
+CONFIDENCE_THRESHOLD = float(os.getenv("EOI_LOCAL_CONFIDENCE", "0.8"))
+
+# Shadow mode: always call the LLM and record how often the local result agrees.
+SHADOW_MODE = os.getenv("EOI_SHADOW_MODE", "0") == "1"
+SHADOW_LOG_FILE = "eoi_shadow_log.jsonl"
+
+SHADOW_STATS = {"documents": 0, "fields": 0, "matches": 0, "full_matches": 0}
+
+# ------------------------------------------------------
+# OneCorp EOI template layout
+# ------------------------------------------------------
+SECTIONS = {
+    "INTRODUCER",
+    "PURCHASER",
+    "PROPERTY",
+    "SOLICITOR",
+    "FINANCE",
+    "CONTRACT DETAILS",
+    "EXPRESSION OF INTEREST PAYMENTS (EOI)",
+}
+
+# Longest labels first so "AGENCY NAME" wins over "NAME".
+LABELS = sorted([
+    "AGENCY NAME", "CONTACT PERSON", "PURCHASING ENTITY", "FIRST NAME/S",
+    "LAST NAME", "MOBILE", "EMAIL", "RESIDENTIAL ADDRESS", "PROJECT NAME",
+    "LOT #", "ADDRESS", "TOTAL PRICE", "LAND PRICE", "BUILD PRICE",
+    "Tenancy Split", "NAME", "CONTACT", "PHONE", "FINANCE TERMS",
+    "EOI LAND", "EOI BUILD", "Build Deposit Amount", "Balance Deposit Amount",
+], key=len, reverse=True)
+
+# Text after this line is boilerplate instructions, never field values.
+STOP_MARKER = "If you are initiating"
+
+# AcroForm field name (normalised) → EOIExtractedModel field
+ACROFORM_ALIASES = {
+    "residential address": "Residential_Address",
+    "lot": "Lot_Number",
+    "lot number": "Lot_Number",
+    "property address": "Property_Address",
+    "project name": "Project_Name",
+    "total price": "Total_Price",
+    "land price": "Land_Price",
+    "build price": "Build_Price",
+    "finance terms": "Finance_Terms",
+    "solicitor name": "Solicitor_Name",
+    "solicitor contact": "Solicitor_Name",
+    "solicitor email": "Solicitor_Email",
+    "finance name": "Finance_Provider",
+    "finance provider": "Finance_Provider",
+}
+
+ACROFORM_PURCHASER_ALIASES = {
+    "first name": "First_Name",
+    "first names": "First_Name",
+    "last name": "Last_Name",
+    "email": "Purchaser_Email",
+    "mobile": "Purchaser_Mobile",
+}
+
+EMAIL_RE = re.compile(r"^[\w.+-]+@[\w-]+(\.[\w-]+)+$")
+PRICE_RE = re.compile(r"^(AU)?\$\s?\d{1,3}(,\s?\d{3})*(\.\d{2})?$")
+MOBILE_RE = re.compile(r"^\+?[\d ]{8,15}$")
+NAME_RE = re.compile(r"^[A-Za-z][A-Za-z '\-]*$")
+LOT_RE = re.compile(r"^\d+[A-Za-z]?$")
+
+
+# ------------------------------------------------------
+# PDF readers
+# ------------------------------------------------------
+def _read_acroform(reader: PdfReader) -> dict:
+    """Return filled AcroForm values keyed by normalised field name."""
+    fields = reader.get_fields() or {}
+    values = {}
+    for name, field in fields.items():
+        value = field.get("/V")
+        if value is None or str(value).strip() == "":
+            continue
+        key = re.sub(r"[^a-z0-9 ]", "", name.lower().replace("_", " ")).strip()
+        values[key] = str(value).strip()
+    return values
+
+
+def _read_text_entries(reader: PdfReader) -> list:
+    """
+    Walk the text layer and return (section, label, value) entries.
+    Lines that carry no label are treated as continuations of the previous value.
+    """
+    lines = []
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        # Collapse non-breaking spaces and runs of whitespace the template is full of
+        lines.extend(re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+
+    entries = []
+    section = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if not line:
+            continue
+        if line.startswith(STOP_MARKER):
+            break
+
+        # "RESIDENTIAL" and "ADDRESS" are split over two lines in the template
+        if line == "RESIDENTIAL" and i < len(lines) and lines[i] == "ADDRESS":
+            entries.append([section, "RESIDENTIAL ADDRESS", ""])
+            i += 1
+            continue
+
+        if line in SECTIONS:
+            section = line
+            continue
+
+        for label in LABELS:
+            if line == label or line.startswith(label + " "):
+                entries.append([section, label, line[len(label):].strip()])
+                break
+        else:
+            if entries and entries[-1][0] == section:
+                entries[-1][2] = (entries[-1][2] + " " + line).strip()
+
+    return [tuple(e) for e in entries]
+
+
+# ------------------------------------------------------
+# Confidence scoring
+# ------------------------------------------------------
+def _score(field: str, value, found: bool) -> float:
+    """Heuristic confidence for a single locally extracted value."""
+    if not found:
+        return 0.0
+    if value is None or value == "":
+        # Label present in the template but left blank — usually genuinely empty.
+        return 0.8
+
+    checks = {
+        "Purchaser_Email": EMAIL_RE,
+        "Solicitor_Email": EMAIL_RE,
+        "Total_Price": PRICE_RE,
+        "Land_Price": PRICE_RE,
+        "Build_Price": PRICE_RE,
+        "Purchaser_Mobile": MOBILE_RE,
+        "First_Name": NAME_RE,
+        "Last_Name": NAME_RE,
+        "Lot_Number": LOT_RE,
+    }
+    if field in checks:
+        return 0.95 if checks[field].match(value) else 0.4
+    if field == "Finance_Terms":
+        return 0.95 if "finance" in value.lower() else 0.5
+    return 0.85
+
+
+# ------------------------------------------------------
+# Main entry point
+# ------------------------------------------------------
+def extract_eoi_local(pdf_path: str, email_text: str = "") -> tuple[dict, dict]:
+    """
+    Deterministically extract an EOI PDF into the EOIExtractedModel shape.
+    Returns (fields, confidence) where confidence maps each field name
+    (and "Purchaser") to a score between 0 and 1.
+    """
+    reader = PdfReader(pdf_path)
+    form = _read_acroform(reader)
+    entries = _read_text_entries(reader)
+
+    def lookup(section: str, label: str):
+        for sec, lab, value in entries:
+            if sec == section and lab == label:
+                return value, True
+        return "", False
+
+    fields = {}
+    confidence = {}
+
+    def put(field: str, value, found: bool):
+        fields[field] = value
+        confidence[field] = _score(field, value, found)
+
+    # ---- Purchasers: every "FIRST NAME/S" opens a new purchaser ----
+    purchasers = []
+    for sec, label, value in entries:
+        if sec != "PURCHASER":
+            continue
+        if label == "FIRST NAME/S":
+            purchasers.append({"First_Name": value})
+        elif purchasers and label == "LAST NAME":
+            purchasers[-1]["Last_Name"] = value
+        elif purchasers and label == "EMAIL":
+            purchasers[-1]["Purchaser_Email"] = value
+        elif purchasers and label == "MOBILE":
+            purchasers[-1]["Purchaser_Mobile"] = value
+
+    purchaser_scores = []
+    for purchaser in purchasers:
+        for key in ("First_Name", "Last_Name", "Purchaser_Email", "Purchaser_Mobile"):
+            found = key in purchaser
+            purchaser.setdefault(key, "")
+            purchaser_scores.append(_score(key, purchaser[key], found))
+    fields["Purchaser"] = purchasers
+    confidence["Purchaser"] = min(purchaser_scores) if purchaser_scores else 0.0
+
+    # ---- Single-valued fields ----
+    put("Residential_Address", *lookup("PURCHASER", "RESIDENTIAL ADDRESS"))
+    put("Lot_Number", *lookup("PROPERTY", "LOT #"))
+    put("Property_Address", *lookup("PROPERTY", "ADDRESS"))
+    put("Project_Name", *lookup("PROPERTY", "PROJECT NAME"))
+    put("Total_Price", *lookup("PROPERTY", "TOTAL PRICE"))
+    put("Land_Price", *lookup("PROPERTY", "LAND PRICE"))
+    put("Build_Price", *lookup("PROPERTY", "BUILD PRICE"))
+    put("Finance_Terms", *lookup("CONTRACT DETAILS", "FINANCE TERMS"))
+    put("Solicitor_Email", *lookup("SOLICITOR", "EMAIL"))
+
+    # Solicitor contact person is preferred over the firm name
+    contact, found = lookup("SOLICITOR", "CONTACT")
+    if not contact:
+        contact, found = lookup("SOLICITOR", "NAME")
+    put("Solicitor_Name", contact, found)
+
+    provider, found = lookup("FINANCE", "NAME")
+    put("Finance_Provider", provider or None, found)
+
+    # ---- AcroForm values override the text layer ----
+    for key, value in form.items():
+        if key in ACROFORM_ALIASES:
+            fields[ACROFORM_ALIASES[key]] = value
+            confidence[ACROFORM_ALIASES[key]] = 0.99
+            continue
+
+        # Purchaser fields are numbered per purchaser, e.g. "First Name 2"
+        match = re.match(r"^(.*?)\s*(\d*)$", key)
+        alias = ACROFORM_PURCHASER_ALIASES.get(match.group(1))
+        if alias:
+            index = int(match.group(2) or 1) - 1
+            while len(purchasers) <= index:
+                purchasers.append({k: "" for k in ACROFORM_PURCHASER_ALIASES.values()})
+            purchasers[index][alias] = value
+            confidence["Purchaser"] = max(confidence["Purchaser"], 0.9)
+
+    # A blank template field may still be answered in the email body
+    for field in ("Project_Name", "Residential_Address"):
+        if fields[field] == "" and field.split("_")[0].lower() in email_text.lower():
+            confidence[field] = 0.5
+
+    return fields, confidence
+
+
+def low_confidence_fields(confidence: dict) -> list:
+    """Field names whose local confidence falls below the threshold."""
+    return [f for f, score in confidence.items() if score < CONFIDENCE_THRESHOLD]
+
+
+def merge_with_llm(local: dict, llm: dict, fields: list) -> dict:
+    """Take the LLM's answer for the listed fields and keep the local values elsewhere."""
+    merged = dict(local)
+    for field in fields:
+        merged[field] = llm.get(field)
+    return merged
+
+
+# ------------------------------------------------------
+# Shadow mode
+# ------------------------------------------------------
+def _normalise(value):
+    if isinstance(value, list):
+        return [_normalise(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalise(v) for k, v in value.items()}
+    if value is None:
+        return ""
+    return re.sub(r"\s+", " ", str(value)).strip().lower()
+
+
+def record_shadow_comparison(pdf_path: str, local: dict, llm: dict, confidence: dict):
+    """Compare the local result with the LLM result and append the outcome to the shadow log."""
+    mismatches = [
+        field for field in llm
+        if _normalise(local.get(field)) != _normalise(llm.get(field))
+    ]
+
+    SHADOW_STATS["documents"] += 1
+    SHADOW_STATS["fields"] += len(llm)
+    SHADOW_STATS["matches"] += len(llm) - len(mismatches)
+    if not mismatches:
+        SHADOW_STATS["full_matches"] += 1
+
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "document": os.path.basename(pdf_path),
+        "mismatches": mismatches,
+        "confidence": confidence,
+    }
+    with open(SHADOW_LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+    rate = SHADOW_STATS["matches"] / SHADOW_STATS["fields"]
+    print(f"🕵️ Shadow mode: {len(llm) - len(mismatches)}/{len(llm)} fields match "
+          f"(running field match rate {rate:.1%})")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        fields, confidence = extract_eoi_local(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(json.dumps(fields, indent=4))
+        print("Low confidence:", low_confidence_fields(confidence))
+        print(f"Extracted in {elapsed:.1f} ms")
@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+
+REGISTRY_FILE = "file_registry.json"
+
+# Uploaded files older than this are deleted from the OpenAI account.
+RETENTION_HOURS = float(os.getenv("OPENAI_FILE_RETENTION_HOURS", "72"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("OPENAI_FILE_SWEEP_INTERVAL", "3600"))
+
+# Attachments spooled by mail_monitoring are named <sha256>__<original name>
+SPOOL_NAME_RE = re.compile(r"^([0-9a-f]{64})__(.+)$")
+
+_lock = threading.Lock()
+_sweeper = None
+
+STATS = {
+    "hits": 0,
+    "misses": 0,
+    "bytes_uploaded": 0,
+    "bytes_saved": 0,
+    "upload_seconds": 0.0,
+    "seconds_saved": 0.0,
+    "deleted": 0,
+}
+
+
+def load_registry() -> dict:
+    """Load the sha256 → file record map, return empty dict if file missing."""
+    if not os.path.exists(REGISTRY_FILE):
+        return {}
+    with open(REGISTRY_FILE, "r") as f:
+        return json.load(f)
+
+
+def save_registry(data: dict):
+    """Atomically save the registry so a crash never leaves half a file."""
+    tmp = REGISTRY_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, REGISTRY_FILE)
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash a file in chunks so large PDFs are never fully loaded."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def attachment_sha256(file_path: str) -> str:
+    """sha256 of an attachment: from the spool name when it has one, else by hashing the file."""
+    spooled = SPOOL_NAME_RE.match(os.path.basename(file_path))
+    return spooled.group(1) if spooled else file_sha256(file_path)
+
+
+def attachment_name(file_path: str) -> str:
+    """Original attachment filename, without the spool's content-hash prefix."""
+    name = os.path.basename(file_path)
+    match = SPOOL_NAME_RE.match(name)
+    return match.group(2) if match else name
+
+
+def release_attachment(file_path: str):
+    """
+    Done with an attachment. Spooled files may be shared by concurrent emails
+    with the same content, so they are left for the mail monitor's spool cleanup.
+    """
+    if not SPOOL_NAME_RE.match(os.path.basename(file_path)) and os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def _reuse(sha256: str, size: int) -> str | None:
+    """file_id of a live registry record for these bytes, marking it used."""
+    with _lock:
+        registry = load_registry()
+        record = registry.get(sha256)
+        # A record the sweeper is deleting is a miss: its file_id is about to disappear
+        if not record or record.get("deleting"):
+            return None
+        record["last_used"] = time.time()
+        save_registry(registry)
+        STATS["hits"] += 1
+        STATS["bytes_saved"] += size
+        STATS["seconds_saved"] += average_upload_seconds()
+        return record["file_id"]
+
+
+def _register(sha256: str, file_id: str, size: int, elapsed: float):
+    with _lock:
+        registry = load_registry()
+        registry[sha256] = {
+            "file_id": file_id,
+            "size": size,
+            "uploaded_at": time.time(),
+            "last_used": time.time(),
+        }
+        save_registry(registry)
+        STATS["misses"] += 1
+        STATS["bytes_uploaded"] += size
+        STATS["upload_seconds"] += elapsed
+
+
+async def upload_file_to_openai(client, file_path: str):
+    """
+    Upload a file for the Responses API with an AsyncOpenAI client,
+    reusing the existing file_id when the same bytes were uploaded before.
+    The file is streamed from disk, never read into memory whole.
+    """
+    sha256 = await asyncio.to_thread(attachment_sha256, file_path)
+    size = os.path.getsize(file_path)
+
+    # Registry reads and writes block on the file and the lock, so they stay off the event loop
+    file_id = await asyncio.to_thread(_reuse, sha256, size)
+    if file_id:
+        print(f"♻️ Reusing uploaded file {file_id} for {os.path.basename(file_path)}")
+        return file_id
+
+    start = time.perf_counter()
+    with open(file_path, "rb") as f:
+        uploaded = await client.files.create(
+            file=(attachment_name(file_path), f, "application/pdf"),
+            purpose="assistants"   # required for responses API
+        )
+    elapsed = time.perf_counter() - start
+
+    await asyncio.to_thread(_register, sha256, uploaded.id, size, elapsed)
+    return uploaded.id
+
+
+def average_upload_seconds() -> float:
+    """Mean observed upload time, used to estimate the time a cache hit saves."""
+    if STATS["misses"] == 0:
+        return 0.0
+    return STATS["upload_seconds"] / STATS["misses"]
+
+
+def registry_stats() -> dict:
+    """Hit/miss counters plus bytes and seconds saved by deduplication."""
+    stats = dict(STATS)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / total if total else 0.0
+    return stats
+
+
+# ------------------------------------------------------
+# Garbage collection
+# ------------------------------------------------------
+def sweep_expired_files(client, retention_hours: float = RETENTION_HOURS) -> int:
+    """Delete registry files not used within the retention window. Returns the number deleted."""
+    cutoff = time.time() - retention_hours * 3600
+
+    # Mark them first, so an upload racing the deletion treats them as a miss instead of reusing them
+    with _lock:
+        registry = load_registry()
+        expired = {h: dict(r) for h, r in registry.items() if r["last_used"] < cutoff}
+        for sha256 in expired:
+            registry[sha256]["deleting"] = True
+        if expired:
+            save_registry(registry)
+
+    deleted, failed = [], []
+    for sha256, record in expired.items():
+        try:
+            client.files.delete(record["file_id"])
+            deleted.append(sha256)
+        except Exception as e:
+            # Already gone on the OpenAI side — drop it from the registry too
+            if getattr(e, "status_code", None) == 404:
+                deleted.append(sha256)
+            else:
+                failed.append(sha256)
+                print(f"⚠️ Could not delete {record['file_id']}:", e)
+
+    if expired:
+        with _lock:
+            registry = load_registry()
+            for sha256 in deleted + failed:
+                current = registry.get(sha256)
+                # Re-uploaded meanwhile: the record now holds a new file_id, keep it
+                if not current or current["file_id"] != expired[sha256]["file_id"]:
+                    continue
+                if sha256 in deleted:
+                    registry.pop(sha256)
+                else:
+                    current.pop("deleting", None)   # retried next sweep
+            save_registry(registry)
+            STATS["deleted"] += len(deleted)
+    if deleted:
+        print(f"🧹 Deleted {len(deleted)} expired OpenAI file(s)")
+
+    return len(deleted)
+
+
+def start_sweeper(client_factory, interval_seconds: int = SWEEP_INTERVAL_SECONDS):
+    """Start the background sweeper thread once per process."""
+    global _sweeper
+
+    if _sweeper is not None:
+        return _sweeper
+
+    def run():
+        while True:
+            try:
+                sweep_expired_files(client_factory())
+            except Exception as e:
+                print("❌ File sweeper failed:", e)
+            time.sleep(interval_seconds)
+
+    _sweeper = threading.Thread(target=run, name="openai-file-sweeper", daemon=True)
+    _sweeper.start()
+    return _sweeper
@@ -0,0 +1,35 @@
+import os
+from clients import get_async_http, get_requests_session, request_timeout
+from metrics import CORRELATION_HEADER, correlation_id
+
+# The mail monitor's outbox endpoint; it queues and returns immediately
+SEND_EMAIL_URL = os.getenv("SEND_EMAIL_URL", "http://localhost:4000/send-email")
+
+
+def _payload(recipient: str, subject: str, body: str, cc: list | None) -> dict:
+    payload = {"recipient": recipient, "subject": subject, "body": body}
+    if cc:
+        payload["cc"] = cc
+    return payload
+
+
+def _headers() -> dict:
+    # Lets the outbox tie the sent mail back to the inbound email that caused it
+    cid = correlation_id.get()
+    return {CORRELATION_HEADER: cid} if cid else {}
+
+
+async def send_email(recipient: str, subject: str, body: str, cc: list | None = None) -> str:
+    """Queue an email on the mail monitor. Returns the request id for GET /send-email/{id}."""
+    resp = await get_async_http().post(SEND_EMAIL_URL, json=_payload(recipient, subject, body, cc),
+                                     headers=_headers())
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+
+def send_email_sync(recipient: str, subject: str, body: str, cc: list | None = None) -> str:
+    """send_email for sync scripts such as the SLA cronjob."""
+    resp = get_requests_session().post(SEND_EMAIL_URL, json=_payload(recipient, subject, body, cc),
+                                       headers=_headers(), timeout=request_timeout())
+    resp.raise_for_status()
+    return resp.json()["id"]
@@ -1,5 +1,9 @@
+import os
+import time
+import functools
+from datetime import datetime
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, Dict, Any, List, Literal, Optional
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 
@@ -9,29 +13,59 @@ from contract_checker_agent import contract_checker
 from signing_agent import signing_agent
 from sla_agent import sla_check
 from void_agent import void
+from pre_router import classify_email, log_route
+from date_parser import parse_appointment
+from deadline_store import DATETIME_FORMAT, MELBOURNE
+from file_registry import attachment_name
+from clients import get_async_http
+from metrics import correlation_id, histogram, span
+
+# Only the start of the body is needed to pick a route
+ROUTER_BODY_CHARS = int(os.getenv("ROUTER_BODY_CHARS", "1500"))
+# The LLM router also extracts address, lot, purchasers and dates for the downstream nodes
+EMAIL_UNDERSTANDING = os.getenv("EMAIL_UNDERSTANDING", "true").lower() == "true"
+
+NODE_SECONDS = histogram("langgraph_node_seconds", "LangGraph node run time", ["node", "status"])
 
 class RouterOutput(BaseModel):
-    route: str
+    route: Literal["EOI_EXTRACTOR", "CONTRACT_CHECKER", "SIGNING_DATE", "SIGNING_STATUS", "OTHER"]
+
+
+class EmailUnderstanding(RouterOutput):
+    """Route plus what the downstream nodes would otherwise ask the model for again."""
+    Property_Address: Optional[str]
+    Lot_Number: Optional[str]
+    Purchaser_Names: List[str]
+    Dates: List[str]    # "dd-mm-yyyy HH:MM", Australia/Melbourne
 
 # ------------------------------------------------------
 # Shared state structure
 # ------------------------------------------------------
-class MemoryState(TypedDict):
+class MemoryState(TypedDict, total=False):
     email: Dict[str, Any]
+    route: str
+    # EmailUnderstanding from the router (LLM) or its local equivalent (rules); fields may be None/empty
+    understanding: Dict[str, Any]
+    # One record per processed attachment: attachment, status, output, error, seconds
+    documents: List[Dict[str, Any]]
+
+
+def local_understanding(email: dict, route: str) -> dict:
+    """What a rule-routed email gives away without a model call: its route and the dates it states."""
+    parsed = parse_appointment(f"{email.get('subject') or ''}\n{email.get('body') or ''}")
+    return {"route": route, "Property_Address": None, "Lot_Number": None, "Purchaser_Names": [],
+            "Dates": [c.strftime(DATETIME_FORMAT) for c in parsed["candidates"]], "source": "rules"}
 
 # ------------------------------------------------------
 # Master agent node
 # ------------------------------------------------------
-def master_agent_node(state: MemoryState) -> MemoryState:
+async def master_agent_node(state: MemoryState) -> MemoryState:
     email = state["email"]
 
-    print("\n📨 MASTER AGENT RECEIVED EMAIL")
-    print("-----------------------------------")
-    print("From:", email.get("from"))
-    print("To:", email.get("to"))
-    print("Subject:", email.get("subject"))
-    print("Body:", email.get("body"))
-    print("-----------------------------------\n")   
+    # Bodies carry personal details and can be long; log only the envelope
+    print(f"📨 MASTER AGENT RECEIVED EMAIL [{correlation_id.get() or '-'}] "
+          f"from {email.get('from')} — {email.get('subject')!r} "
+          f"({len(email.get('body') or '')} chars, {len(email.get('attachments') or [])} attachment(s))")
 
     attachments = email.get("attachments")
     from_email  = email.get("from")
@@ -39,7 +73,17 @@ def master_agent_node(state: MemoryState) -> MemoryState:
     subject     = email.get("subject")
     body        = email.get("body")
 
-    llm = ChatOpenAI(model="gpt-4.1-mini")
+    start = time.perf_counter()
+
+    # Rules first — DocuSign notices, EOIs and contracts rarely need the LLM
+    route, _ = classify_email(email)
+    if route:
+        log_route(email, route, "rule", (time.perf_counter() - start) * 1000)
+        if not EMAIL_UNDERSTANDING:
+            return {"route": route}
+        return {"route": route, "understanding": local_understanding(email, route)}
+
+    llm = ChatOpenAI(model="gpt-4.1-mini", temperature=0, http_async_client=get_async_http())
 
     ROUTING_PROMPT = """
     You are the MASTER ROUTER AGENT for OneCorp Australia.
@@ -73,31 +117,54 @@ def master_agent_node(state: MemoryState) -> MemoryState:
     5. OTHER  
     - Anything that does NOT match the above.
 
-    Return a JSON object:
-
-    {
-    "route": "<EOI_EXTRACTOR | CONTRACT_CHECKER | SIGNING_DATE | SIGNING_STATUS | OTHER>"
-    }
+    Answer with exactly one route.
+    """
+    UNDERSTANDING_PROMPT = """
+    Also extract, using null or an empty list when the email does not say:
+    - Property_Address: the property the email is about, as written
+    - Lot_Number
+    - Purchaser_Names: each purchaser's full name
+    - Dates: every date (and time) the email gives for an appointment or deadline, as dd-mm-yyyy HH:MM
+      in Australia/Melbourne time (09:00 when no time is given). Today is {today}.
     """
+    attachment_names = ", ".join(attachment_name(a) for a in attachments or []) or "none"
+    schema = EmailUnderstanding if EMAIL_UNDERSTANDING else RouterOutput
+    if EMAIL_UNDERSTANDING:
+        ROUTING_PROMPT += UNDERSTANDING_PROMPT.format(today=datetime.now(MELBOURNE).strftime("%A %d-%m-%Y"))
     msgs = [
         {"role": "system", "content": ROUTING_PROMPT},
-        {"role": "user", "content": f"Email:\nSubject: {subject}\nBody: {body}"}
+        {"role": "user", "content": f"Email:\nFrom: {from_email}\nSubject: {subject}\n"
+                                    f"Attachments: {attachment_names}\n"
+                                    f"Body: {(body or '')[:ROUTER_BODY_CHARS]}"}
     ]
 
-    res = llm.invoke(msgs)
-    return RouterOutput.model_validate_json(res.content).dict()
+    # Structured output constrains the answer to the route enum
+    res = await llm.with_structured_output(schema).ainvoke(msgs)
+    log_route(email, res.route, "llm", (time.perf_counter() - start) * 1000)
+    if not EMAIL_UNDERSTANDING:
+        return {"route": res.route}
+    return {"route": res.route, "understanding": {**res.model_dump(), "source": "llm"}}
+
+
+def timed(name: str, node):
+    """Wrap a node so every run lands in langgraph_node_seconds and the span log."""
+    @functools.wraps(node)
+    async def run(state: MemoryState) -> MemoryState:
+        with span(NODE_SECONDS, node=name):
+            return await node(state)
+    return run
 
 
 # ------------------------------------------------------
 # Compile LangGraph
 # ------------------------------------------------------
 workflow = StateGraph(MemoryState)
-workflow.add_node("router", master_agent_node)
-workflow.add_node("EOI_EXTRACTOR", eoi_extractor)
-workflow.add_node("CONTRACT_CHECKER", contract_checker)
-workflow.add_node("SIGNING_DATE", signing_agent)
-workflow.add_node("SIGNING_STATUS", sla_check)
-workflow.add_node("OTHER", void)
+workflow.add_node("router", timed("router", master_agent_node))
+workflow.add_node("EOI_EXTRACTOR", timed("EOI_EXTRACTOR", eoi_extractor))
+workflow.add_node("CONTRACT_CHECKER", timed("CONTRACT_CHECKER", contract_checker))
+workflow.add_node("SIGNING_DATE", timed("SIGNING_DATE", signing_agent))
+workflow.add_node("SIGNING_STATUS", timed("SIGNING_STATUS", sla_check))
+workflow.add_node("OTHER", timed("OTHER", void))
 
 
 workflow.set_entry_point("router")
@@ -0,0 +1,117 @@
+import re
+
+# Street-type abbreviations expanded so "12 Rivergum Rd" matches "12 Rivergum Road"
+STREET_ABBREVIATIONS = {
+    "st": "street",
+    "rd": "road",
+    "ave": "avenue",
+    "av": "avenue",
+    "cres": "crescent",
+    "cr": "crescent",
+    "ct": "court",
+    "dr": "drive",
+    "pl": "place",
+    "hwy": "highway",
+    "pde": "parade",
+    "tce": "terrace",
+    "cl": "close",
+    "blvd": "boulevard",
+}
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, turn punctuation (including – and —) into spaces and collapse whitespace."""
+    text = (text or "").lower()
+    text = re.sub(r"[^\w@#]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical key for a property address.
+    "Lot 95, Fake Rise, VIC 3336" → "fake rise vic 3336"
+    """
+    text = normalize_text(address)
+    text = re.sub(r"^lot\s*#?\s*\d+[a-z]?\s+", "", text)
+    return expand_street_types(text)
+
+
+def expand_street_types(text: str) -> str:
+    """Expand street-type abbreviations in normalised text."""
+    return " ".join(STREET_ABBREVIATIONS.get(w, w) for w in text.split())
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a person's name and drop punctuation."""
+    return normalize_text(name)
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of already-normalised text, padded so word edges count."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ------------------------------------------------------
+# Contract vs EOI field values
+# ------------------------------------------------------
+# Commas or spaces only count as thousands separators before exactly three digits,
+# so "$550,000 3 bedrooms" stops at 550,000
+AMOUNT_RE = re.compile(r"((?:\d{1,3}(?:[,\s]\d{3})+(?!\d)|\d+)(?:\.\d+)?)\s*(k|m|million)?\b", re.IGNORECASE)
+
+
+def normalize_amount(value: str):
+    """
+    Dollar amount in cents, or None when no number is present.
+    "AU$ 550,000.00" → 55000000, "$550k" → 55000000, "1.2m" → 120000000
+    """
+    match = AMOUNT_RE.search(value or "")
+    if not match:
+        return None
+    number = float(re.sub(r"[,\s]", "", match.group(1)))
+    suffix = (match.group(2) or "").lower()
+    number *= {"k": 1_000, "m": 1_000_000, "million": 1_000_000}.get(suffix, 1)
+    return round(number * 100)
+
+
+def normalize_phone(value: str) -> str:
+    """
+    Australian phone number in national format, digits only.
+    "+61 411 222 333" / "+61 0411 222 333" → "0411222333", "(03) 9123 4567" → "0391234567"
+    """
+    digits = re.sub(r"\D", "", value or "")
+    # Country code first (an 8-digit local number may itself start with 61)
+    if digits.startswith("0061"):
+        digits = digits[4:]
+    elif digits.startswith("61") and len(digits) >= 11:
+        digits = digits[2:]
+    if len(digits) == 9 and not digits.startswith("0"):
+        digits = "0" + digits
+    return digits
+
+
+def normalize_email(value: str) -> str:
+    """Lowercase, without a mailto: prefix or surrounding <> and whitespace."""
+    value = (value or "").strip().strip("<>").lower()
+    return value.removeprefix("mailto:")
+
+
+def normalize_lot(value: str) -> str:
+    """"Lot 95" / "LOT #95" / "95" → "95"."""
+    return re.sub(r"^lot\s*#?\s*", "", normalize_text(value))
+
+
+def same_name(a: str, b: str) -> bool:
+    """Names match when one's words are all in the other ("John" vs "John Andrew")."""
+    a_words, b_words = set(normalize_name(a).split()), set(normalize_name(b).split())
+    return bool(a_words and b_words) and (a_words <= b_words or b_words <= a_words)
+
+
+def finance_terms_class(value: str) -> str:
+    """Collapse finance wording to "subject" / "not subject", or the normalised text when neither applies."""
+    text = normalize_text(value)
+    if re.search(r"\b(not|no longer|isn t|is not)\s+(be\s+)?subject to finance\b|\bunconditional\b|\bcash\b", text):
+        return "not subject"
+    if re.search(r"\bsubject to finance\b|\bfinance approval\b", text):
+        return "subject"
+    return text
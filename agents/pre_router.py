@@ -0,0 +1,97 @@
+import re
+import json
+from datetime import datetime
+from file_registry import attachment_name
+
+ROUTES = ["EOI_EXTRACTOR", "CONTRACT_CHECKER", "SIGNING_DATE", "SIGNING_STATUS", "OTHER"]
+
+# A rule decision is trusted when the best route scores at least this much
+# and the runner-up scores less than RULE_MARGIN × best.
+RULE_THRESHOLD = 1.0
+RULE_MARGIN = 0.5
+
+ROUTING_LOG_FILE = "routing_log.jsonl"
+ROUTING_STATS = {"rule": 0, "llm": 0}
+
+DOCUSIGN_DOMAINS = ("docusign.net", "docusign.com")
+
+# (route, weight, where, pattern)
+RULES = [
+    # DocuSign notifications
+    ("SIGNING_STATUS", 0.6, "subject", r"\bdocusign\b|\bcompleted:|\bsigned:"),
+    ("SIGNING_STATUS", 1.0, "body", r"buyer has completed signing|envelope (has been )?completed|all parties have signed"),
+    # Expressions of interest
+    ("EOI_EXTRACTOR", 1.0, "attachment", r"\beoi\b|eoi[_\- ]|expression[_\- ]of[_\- ]interest"),
+    ("EOI_EXTRACTOR", 0.6, "subject", r"\beoi\b|expression of interest|signed eoi"),
+    # Contracts of sale from vendors
+    # Only a contract-of-sale filename decides alone; any other "contract" PDF needs the subject to agree
+    ("CONTRACT_CHECKER", 1.0, "attachment", r"contract[_\- ]*(of[_\- ]*)?sale"),
+    ("CONTRACT_CHECKER", 0.5, "attachment", r"contract"),
+    ("CONTRACT_CHECKER", 0.6, "subject", r"contract of sale|contract request|^re: contract"),
+    # Solicitor confirming a signing date
+    ("SIGNING_DATE", 0.6, "body", r"signing appointment|appointment (is )?(booked|scheduled|confirmed)|booked in to sign"),
+    ("SIGNING_DATE", 0.5, "body", r"(completed|finished) (our |my |the )?review of the contract|reviewed the contract"),
+]
+
+
+def _domain(address: str) -> str:
+    return address.rsplit("@", 1)[-1].lower().strip("> ") if address else ""
+
+
+def _is_docusign(domain: str) -> bool:
+    """docusign.net or a subdomain of it; lookalikes such as evildocusign.com do not count."""
+    return any(domain == d or domain.endswith("." + d) for d in DOCUSIGN_DOMAINS)
+
+
+def classify_email(email: dict) -> tuple[str | None, dict]:
+    """
+    Score each route using sender domain, subject keywords and attachment filenames.
+    Returns (route, scores); route is None when no route is a clear winner.
+    """
+    subject = (email.get("subject") or "").lower()
+    body = (email.get("body") or "").lower()
+    names = [attachment_name(a).lower() for a in email.get("attachments") or []]
+    pdfs = [n for n in names if n.endswith(".pdf")]
+
+    scores = {route: 0.0 for route in ROUTES}
+
+    if _is_docusign(_domain(email.get("from"))):
+        scores["SIGNING_STATUS"] += 1.0
+
+    for route, weight, where, pattern in RULES:
+        if where == "attachment":
+            if any(re.search(pattern, name) for name in pdfs):
+                scores[route] += weight
+        elif re.search(pattern, subject if where == "subject" else body):
+            scores[route] += weight
+
+    # Document routes need a PDF to work on; signing routes never carry one to check
+    if not pdfs:
+        scores["EOI_EXTRACTOR"] = scores["CONTRACT_CHECKER"] = 0.0
+    elif scores["SIGNING_DATE"] and max(scores["EOI_EXTRACTOR"], scores["CONTRACT_CHECKER"]):
+        scores["SIGNING_DATE"] = 0.0
+
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    (best, best_score), (_, second_score) = ranked[0], ranked[1]
+    if best_score >= RULE_THRESHOLD and second_score < best_score * RULE_MARGIN:
+        return best, scores
+    return None, scores
+
+
+def log_route(email: dict, route: str, source: str, latency_ms: float):
+    """Record a routing decision so the rule hit rate can be measured."""
+    ROUTING_STATS[source] += 1
+    total = ROUTING_STATS["rule"] + ROUTING_STATS["llm"]
+
+    print(f"🧭 Routed to {route} via {source} in {latency_ms:.1f} ms "
+          f"(rule hit rate {ROUTING_STATS['rule'] / total:.0%})")
+
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "subject": email.get("subject"),
+        "route": route,
+        "source": source,
+        "latency_ms": round(latency_ms, 2),
+    }
+    with open(ROUTING_LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
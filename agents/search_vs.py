@@ -1,13 +1,50 @@
 import os
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+from deal_index import DEAL_INDEX
+from clients import get_async_openai
+from vs_ingest import VS_INGESTOR
+from normalizers import normalize_address
 
+# A vector store hit is trusted when it scores at least VS_MATCH_THRESHOLD and beats
+# the best hit for any other property by more than VS_AMBIGUITY_MARGIN.
+VS_MATCH_THRESHOLD = float(os.getenv("VS_MATCH_THRESHOLD", "0.5"))
+VS_AMBIGUITY_MARGIN = float(os.getenv("VS_AMBIGUITY_MARGIN", "0.05"))
+VS_MAX_RESULTS = 5
 
-def search_vector_store(email: str):
-    load_dotenv()
+
+def understood_query(understanding: dict | None) -> str | None:
+    """The search query the LLM would write, built from the router's understanding of the email."""
+    if not understanding or not understanding.get("Property_Address"):
+        return None
+    names = " & ".join(understanding.get("Purchaser_Names") or [])
+    address = understanding["Property_Address"]
+    if understanding.get("Lot_Number") and "lot" not in address.lower():
+        address = f"Lot {understanding['Lot_Number']} {address}"
+    return f"Purchaser(s) Name: {names}\nProperty Address: {address}"
+
+
+async def search_vector_store(email: str, understanding: dict | None = None):
+    # 1️⃣ Local deal index — no remote round trips on a confident match
+    eoi, candidates = DEAL_INDEX.find(str(email))
+    if eoi:
+        print(f"⚡ Local deal index hit (score {candidates[0][0]}): {eoi['Property_Address']}")
+        return eoi
+    if candidates:
+        print("⚠️ No confident local deal match, candidates:",
+              ", ".join(f"{c['Property_Address']} ({score})" for score, c in candidates[:3]))
+
+    # The router already pulled purchasers and address out of the email
+    search_query = understood_query(understanding)
+    if search_query:
+        eoi, candidates = DEAL_INDEX.find(search_query)
+        if eoi:
+            print(f"⚡ Local deal index hit from the router's understanding (score {candidates[0][0]}): "
+                  f"{eoi['Property_Address']}")
+            return eoi
+
+    # 2️⃣ Remote vector store fallback
     vector_store_id = os.getenv("OPENAI_VS_ID")
-    client = OpenAI()
+    client = get_async_openai()
 
     query = """
     Extract the purchaser(s) name and property address from the following email regarding the Contract of Sale:
@@ -18,18 +55,48 @@ def search_vector_store(email: str):
     Purchaser(s) Name: <Full Name(s)>
     Property Address: <Full Address>
     """
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",   # or your preferred model
-        messages=[
-            {"role": "user", "content": query.format(email=email)}
-        ],
-        temperature=0.2
-    )
-
-    results = client.vector_stores.search(
+    if search_query is None:
+        response = await client.chat.completions.create(
+            model="gpt-4.1-mini",   # or your preferred model
+            messages=[
+                {"role": "user", "content": query.format(email=email)}
+            ],
+            temperature=0.2
+        )
+
+        search_query = response.choices[0].message.content
+
+    # 3️⃣ Read-your-writes: EOIs still being indexed remotely are only visible locally
+    eoi, _ = VS_INGESTOR.pending.find(search_query)
+    if eoi:
+        print(f"⚡ Matched an EOI still being indexed: {eoi['Property_Address']}")
+        return eoi
+
+    results = await client.vector_stores.search(
         vector_store_id=vector_store_id,
-        query=response.choices[0].message.content,
-        max_num_results=1)
+        query=search_query,
+        max_num_results=VS_MAX_RESULTS)
+
+    # Best hit per property: chunks or re-uploads of one EOI are not rivals
+    best = {}
+    for hit in results.data:
+        eoi = json.loads(hit.content[0].text)
+        key = normalize_address(eoi.get("Property_Address") or "") or hit.file_id
+        if key not in best or hit.score > best[key][0]:
+            best[key] = (hit.score, eoi)
+    ranked = sorted(best.values(), key=lambda item: item[0], reverse=True)
+
+    if not ranked:
+        raise LookupError("No matching EOI found in the vector store")
+    score, res = ranked[0]
+    print(f"🔎 Vector store match score: {score:.3f}")
+    if score < VS_MATCH_THRESHOLD:
+        raise LookupError(f"No confident EOI match in the vector store (best score {score:.3f} "
+                          f"for {res.get('Property_Address')})")
+    if len(ranked) > 1 and ranked[1][0] > score - VS_AMBIGUITY_MARGIN:
+        rivals = ", ".join(f"{e.get('Property_Address')} ({s:.3f})" for s, e in ranked[:3])
+        raise LookupError(f"Ambiguous EOI match in the vector store: {rivals}")
 
-    res = json.loads(results.data[0].content[0].text)
-    return res
\ No newline at end of file
+    # Warm the local index so the next email for this deal stays local
+    DEAL_INDEX.add(res)
+    return res
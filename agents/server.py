@@ -1,12 +1,53 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from master_agent import master_graph  # import the graph
+from file_registry import registry_stats, start_sweeper
+from clients import counting_llm_calls, get_openai, pool_stats
+from vs_ingest import VS_INGESTOR
+from sla_scheduler import SLA_SCHEDULER, SLA_SCHEDULER_ENABLED
+from metrics import CORRELATION_HEADER, correlated, counter, histogram, new_correlation_id, recent_spans, render, span
 
 
 app = FastAPI()
 
+EMAIL_SECONDS = histogram("incoming_email_seconds", "Full LangGraph run per incoming email", ["status"])
+# LLM calls per email by route = email_llm_calls_total / emails_processed_total
+EMAILS = counter("emails_processed_total", "Emails run through the graph, by route", ["route"])
+EMAIL_LLM_CALLS = counter("email_llm_calls_total", "Chat/responses calls made while handling emails, by route",
+                          ["route"])
+
+
+@app.middleware("http")
+async def correlation(request: Request, call_next):
+    # The mail monitor sends one per message; direct callers get a fresh id
+    with correlated(request.headers.get(CORRELATION_HEADER) or new_correlation_id()) as cid:
+        response = await call_next(request)
+    response.headers[CORRELATION_HEADER] = cid
+    return response
+
+
+@app.on_event("startup")
+def start_background_jobs():
+    # Delete uploaded OpenAI files once they fall out of the retention window
+    start_sweeper(get_openai)
+
+
+@app.on_event("startup")
+async def start_sla_scheduler():
+    # Fires SLA reminders at their exact time, catching up on any missed while down
+    if SLA_SCHEDULER_ENABLED:
+        await SLA_SCHEDULER.start()
+
+
+@app.on_event("shutdown")
+async def flush_vector_store_uploads():
+    # EOIs extracted just before shutdown would otherwise never reach the vector store
+    await VS_INGESTOR.drain()
+    await SLA_SCHEDULER.stop()
+
 # -----------------------------------------
 # Email Schema
 # -----------------------------------------
@@ -28,17 +69,65 @@ class EmailModel(BaseModel):
 async def incoming_email(email: EmailModel):
     print("🔥 Email received by FastAPI")
 
-    await master_graph.ainvoke({
-        "email": {
-            "from": email.from_email,
-            "to": email.to_email,
-            "subject": email.subject,
-            "body": email.body,
-            "attachments": email.attachments or []
-        }
+    with span(EMAIL_SECONDS), counting_llm_calls() as calls:
+        result = await master_graph.ainvoke({
+            "email": {
+                "from": email.from_email,
+                "to": email.to_email,
+                "subject": email.subject,
+                "body": email.body,
+                "attachments": email.attachments or []
+            }
+        })
+
+    route = result.get("route") or "-"
+    EMAILS.inc(route=route)
+    EMAIL_LLM_CALLS.inc(sum(calls.values()), route=route)
+
+    documents = [
+        {k: d[k] for k in ("attachment", "status", "error", "seconds")}
+        for d in result.get("documents") or []
+    ]
+    return {"status": "processed", "route": route, "llm_calls": sum(calls.values()), "documents": documents}
+
+
+@app.get("/file-registry/stats")
+def file_registry_stats():
+    return registry_stats()
+
+
+@app.get("/vector-store/ingestion")
+def vector_store_ingestion_stats():
+    return VS_INGESTOR.stats()
+
+
+@app.get("/sla-scheduler")
+def sla_scheduler_stats():
+    return SLA_SCHEDULER.stats()
+
+
+@app.get("/pool-stats")
+def http_pool_stats():
+    return pool_stats()
+
+
+# -----------------------------------------
+# Metrics
+# -----------------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return render({
+        "http_pool": pool_stats(),
+        "file_registry": registry_stats(),
+        "vector_store_ingestion": VS_INGESTOR.stats(),
+        "sla_scheduler": SLA_SCHEDULER.stats(),
     })
 
-    return {"status": "processed"}
+
+@app.get("/spans")
+def spans(correlation_id: str | None = None, limit: int = 200):
+    """Recent node and OpenAI spans, e.g. everything for one X-Correlation-ID."""
+    return recent_spans(correlation_id, limit)
 
 if __name__ == "__main__":
     print("Backend service running at http://localhost:2000")
@@ -1,21 +1,28 @@
 import json
-import requests
-
-from openai import OpenAI
+import asyncio
 from datetime import datetime
 from pydantic import BaseModel
 from search_vs import search_vector_store
 from vendor import get_vendor
+from deadline_store import MELBOURNE, parse_local_datetime, upsert_deadline
+from date_parser import appointment_fields, parse_appointment
+from clients import get_async_openai
+from mailer import send_email
+from metrics import counter
+
+DATE_PARSES = counter("signing_date_parses_total",
+                      "Signing appointment dates: parsed locally, from the router, or sent to the LLM (no_date, ambiguous)", ["result"])
 
 class SigningAppointment(BaseModel):
     appointment_datetime: str   # "dd-mm-yyyy HH:MM"
     reminder_datetime: str      # "dd-mm-yyyy HH:MM"
 
-def signing_agent(state):
+async def signing_agent(state):
     print("\n🖊️ Detected signing-status email — activating SIGNING AGENT...\n")
     email = state["email"]
+    understanding = state.get("understanding") or {}
     # Extract appointment date and set reminder
-    client = OpenAI()
+    client = get_async_openai()
 
     print("📩 Extracting appointment date and reminder from signing email...")
     APPOINTMENT_EXTRACTOR_PROMPT = """
@@ -39,8 +46,8 @@ def signing_agent(state):
     3. Return ONLY this JSON:
 
     {{
-    "appointment_datetime_aedt": "<dd-mm-yyyy HH:MM>",
-    "reminder_datetime_aedt": "<dd-mm-yyyy HH:MM>"
+    "appointment_datetime": "<dd-mm-yyyy HH:MM>",
+    "reminder_datetime": "<dd-mm-yyyy HH:MM>"
     }}
 
     Rules:
@@ -55,38 +62,53 @@ def signing_agent(state):
     ---
     """
 
-    current_date = datetime.now().strftime("%d-%m-%Y")
-    prompt = APPOINTMENT_EXTRACTOR_PROMPT.format(
-        current_date=current_date,
-        email_body=email
-    )
-
-    response = client.responses.parse(
-        model="gpt-4.1",
-        input=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "input_text", "text": prompt},
-                ]
-            }
-        ],
-        text_format=SigningAppointment  # Pydantic automatic validation!
-    )
-
+    # 1️⃣ Local parser first, then the router's reading of the email; the LLM only sees what is left
+    parsed = parse_appointment(f"{email.get('subject') or ''}\n{email.get('body') or ''}")
+    # Rule-routed emails only carry the parser's own candidates
+    understood = (understanding.get("Dates") or []) if understanding.get("source") == "llm" else []
+    if parsed["appointment"] is not None:
+        DATE_PARSES.inc(result="local")
+        response = appointment_fields(parsed["appointment"])
+        print(f"⚡ Appointment parsed locally: {response['appointment_datetime']}")
+    elif len(set(understood)) == 1:
+        DATE_PARSES.inc(result="router")
+        response = appointment_fields(parse_local_datetime(understood[0]))
+        print(f"⚡ Appointment taken from the router's understanding: {response['appointment_datetime']}")
+    else:
+        DATE_PARSES.inc(result=parsed["reason"])
+        print(f"🤔 Date parser found {len(parsed['candidates'])} candidate date(s) — asking the LLM...")
+        current_date = datetime.now(MELBOURNE).strftime("%A %d-%m-%Y")
+        prompt = APPOINTMENT_EXTRACTOR_PROMPT.format(
+            current_date=current_date,
+            email_body=email
+        )
+
+        response = await client.responses.parse(
+            model="gpt-4.1",
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "input_text", "text": prompt},
+                    ]
+                }
+            ],
+            text_format=SigningAppointment  # Pydantic automatic validation!
+        )
+
+        # The reminder is always recomputed locally (date + 2 days, 09:00 Melbourne)
+        response = appointment_fields(parse_local_datetime(json.loads(response.output_text)["appointment_datetime"]))
     print("📅 Appointment extracted successfully.")
-    response = json.loads(response.output_text)
-    eoi_json = search_vector_store(email)
+
+    eoi_json = await search_vector_store(email, understanding)
     
     print("🔎 Retrieved EOI from vectorstore for appointment association...")
 
     response["Property_Address"] = eoi_json["Property_Address"]
     response["Purchaser"] = eoi_json["Purchaser"]
 
-    filename = "deadlines/" + response["Property_Address"] + ".json"
-
-    with open(filename, "w") as f:
-        json.dump(response, f, indent=4)
+    # Atomic upsert keyed by normalised address — safe with concurrent writers
+    await asyncio.to_thread(upsert_deadline, response)
 
 
     address = eoi_json["Property_Address"]
@@ -106,17 +128,10 @@ Thanks,
 OneCorp
 """
     subject      = f"Contract Request: {address}"
-    vendor_email = get_vendor(eoi_json["Property_Address"])
-
-    API_URL = "http://localhost:4000/send-email"
-
-    payload = {
-        "recipient": vendor_email,
-        "subject": subject,
-        "body": email
-    }
+    # The vendor directory may block on its file lock; keep it off the event loop
+    vendor_email = await asyncio.to_thread(get_vendor, eoi_json["Property_Address"])
 
-    requests.post(API_URL, json=payload)
+    await send_email(vendor_email, subject, email)
     print("📤 Vendor notified to release contract via DocuSign.")
     return state
 
@@ -1,16 +1,53 @@
-import os
 import json
-from openai import OpenAI
+import asyncio
+from clients import get_async_openai
+from deadline_store import delete_deadline, get_deadline, list_address_keys
+from docusign_parser import extract_property, match_address, LLM_CANDIDATE_LIMIT
 
 
-
-def sla_check(state):
+async def sla_check(state):
     print("\n📨 Detected DocuSign completion email — activating SLA AGENT...\n")
-    client = OpenAI()
+    client = get_async_openai()
     email = state["email"]
     email_body   = email.get("body")
 
     print("🔍 Extracting property details from signing-completion email...")
+    # The router may already have read the property off the email
+    core = extract_property(email_body) or (state.get("understanding") or {}).get("Property_Address")
+
+    # ------------------------------------------------------
+    # Deterministic match first; the LLM only sees the shortlist
+    # ------------------------------------------------------
+    # Exact normalised address: one primary-key lookup, no table scan
+    record = await asyncio.to_thread(get_deadline, core) if core else None
+    if record:
+        print(f"🗑 Deleting: {record['Property_Address']} (matched locally from \"{core}\")")
+        print("CONTRACT PROCESSED SUCCESSFULLY!!!!!")
+        await asyncio.to_thread(delete_deadline, record["Property_Address"])
+        print("🎯 SLA AGENT complete.\n")
+        return state
+
+    candidates = await asyncio.to_thread(list_address_keys)
+    if not candidates:
+        print("⭕ No open deadlines — nothing to delete.")
+        print("🎯 SLA AGENT complete.\n")
+        return state
+
+    if core:
+        # Fuzzy scoring over every open deadline is CPU work; keep it off the event loop too
+        address, ranked = await asyncio.to_thread(match_address, core, candidates)
+        if address is not None:
+            print(f"🗑 Deleting: {address} (matched locally from \"{core}\")")
+            print("CONTRACT PROCESSED SUCCESSFULLY!!!!!")
+            await asyncio.to_thread(delete_deadline, address)
+            print("🎯 SLA AGENT complete.\n")
+            return state
+        shortlist = [address for _, address in ranked[:LLM_CANDIDATE_LIMIT]]
+        print(f"🤔 No unambiguous local match for \"{core}\" — asking the LLM about {len(shortlist)} candidate(s)")
+    else:
+        shortlist = [address for _, address in candidates]
+        print("🤔 Could not find the contract line — asking the LLM")
+
     DELETING_PROMPT = """
 You are a Contract Completion Agent for OneCorp Australia.
 
@@ -74,21 +111,16 @@ Very important:
 Now, using these rules, process the given email and filename list.
     """
 
-    DEADLINES_DIR = "deadlines"
-
     email_prompt = "DocuSign System Email is as follows: \n" + email_body + "\n\n"
-    # Get filenames
-    filenames = [
-        f for f in os.listdir(DEADLINES_DIR)
-        if f.endswith(".json")
-    ]
+    # Candidate deadlines, presented as the "<address>.json" names the prompt expects
+    filenames = [f"{address}.json" for address in shortlist]
 
     filenames_string = "Filenames are as follows: \n"
     # Convert to: "file1.json", "file2.json", "file3.json"
     filenames_string = filenames_string + ", ".join(f'"{name}"' for name in filenames)
 
 
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4.1-mini",   # or your preferred model
         messages=[
             {"role": "system", "content": DELETING_PROMPT},
@@ -99,10 +131,9 @@ Now, using these rules, process the given email and filename list.
 
     filename = json.loads(response.choices[0].message.content)["delete_filename"]
     if filename!= None:
-        path = os.path.join(DEADLINES_DIR, filename)
         print(f"🗑 Deleting: {filename}")
         print("CONTRACT PROCESSED SUCCESSFULLY!!!!!")
-        os.remove(path)
+        await asyncio.to_thread(delete_deadline, filename.removesuffix(".json"))
     else:
         print("⭕ No matching deadline file identified — nothing to delete.")
 
@@ -1,36 +1,23 @@
 import os
-import datetime
-import requests
-import json
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from mailer import send_email_sync
+from deadline_store import delete_deadline, due_before
 
-def load_json(path):
-    with open(path, "r") as f:
-        return json.load(f)
+SLA_ALERT_TO = os.getenv("SLA_ALERT_TO", "dr.prabhumane@gmail.com")
 
-def run_sla_check():
-    """
-    Runs daily at 9 AM AEDT via cron.
-    For each JSON file, compare reminder date to today's date.
-    If today's date matches, trigger an alert and delete the JSON file.
-    """
-    today = datetime.now(ZoneInfo("Australia/Melbourne")).strftime("%d-%m-%Y")
-    DEADLINES_DIR = "deadlines"
-    for file in os.listdir(DEADLINES_DIR):
-
-        path = os.path.join(DEADLINES_DIR, file)
-        data = load_json(path)
-        reminder_full = data["reminder_datetime"]  
-        reminder_date = reminder_full.split(" ")[0]  # Extract only dd-mm-yyyy
-
-        if reminder_date == today:
-            property_address = data.get("Property_Address")
-            appointment_datetime = data.get("appointment_datetime")
-            purchasers = ", ".join([f"{p['First_Name']} {p['Last_Name']}" for p in data.get("Purchaser")])
-
-            subject = f"SLA Alert: Contract Not Signed by {reminder_date} for {purchasers} - {property_address}"
-            email_body = f"""
+
+def sla_alert(data: dict) -> tuple:
+    """(subject, body) of the SLA alert for one deadline record."""
+    reminder_full = data["reminder_datetime"]
+    reminder_date = reminder_full.split(" ")[0]  # Extract only dd-mm-yyyy
+
+    property_address = data.get("Property_Address")
+    appointment_datetime = data.get("appointment_datetime")
+    purchasers = ", ".join([f"{p['First_Name']} {p['Last_Name']}" for p in data.get("Purchaser")])
+
+    subject = f"SLA Alert: Contract Not Signed by {reminder_date} for {purchasers} - {property_address}"
+    email_body = f"""
 Hi Team,
 
 This is an automated SLA alert from the contract workflow.
@@ -53,18 +40,28 @@ Please action this as soon as practical.
 Regards,
 OneCorp Contract Automation
 support@onecorpaustralia.com.au
-            """
-            
-            API_URL = "http://localhost:4000/send-email"
+        """
+    return subject, email_body
+
+
+def run_sla_check():
+    """
+    One-off sweep of every reminder already due (an indexed range query):
+    triggers an alert for each and removes it from the deadline store.
+    The agent server's SLA scheduler (sla_scheduler.py) fires reminders at
+    their exact time; run this only when the server is not running.
+    """
+    now = datetime.now(ZoneInfo("Australia/Melbourne"))
+    for data in due_before(now):
+        property_address = data.get("Property_Address")
+        subject, email_body = sla_alert(data)
+
+        # Queued on the outbox, which sends the day's alerts together through Graph $batch
+        send_email_sync(SLA_ALERT_TO, subject, email_body)
 
-            payload = {
-                "recipient": "dr.prabhumane@gmail.com",
-                "subject": subject,
-                "body": email_body
-            }
+        print(f"🗑 Deleting: {property_address}")
+        delete_deadline(property_address)
 
-            requests.post(API_URL, json=payload)
 
-            # sending email logic would go here
-            print(f"🗑 Deleting: {file}")
-            os.remove(path)
+if __name__ == "__main__":
+    run_sla_check()
@@ -0,0 +1,178 @@
+import os
+import time
+import heapq
+import asyncio
+import contextvars
+from mailer import send_email
+from sla_cronjob import SLA_ALERT_TO, sla_alert
+from deadline_store import delete_deadline_if, due_record, scheduled_reminders, subscribe
+from metrics import counter, histogram, observe
+
+# Run the scheduler inside the agent server (replaces the daily sla_cronjob.py run)
+SLA_SCHEDULER_ENABLED = os.getenv("SLA_SCHEDULER", "true").lower() == "true"
+# Upper bound on one sleep, so wall-clock jumps (NTP, suspend) are noticed within this long
+SLA_MAX_SLEEP_SECONDS = float(os.getenv("SLA_MAX_SLEEP_SECONDS", "300"))
+SLA_MAX_ATTEMPTS = int(os.getenv("SLA_MAX_ATTEMPTS", "5"))
+SLA_BACKOFF_SECONDS = float(os.getenv("SLA_BACKOFF_SECONDS", "60"))
+# Rebuild the heap once cancelled/moved entries outnumber live ones by this much
+SLA_COMPACT_SLACK = int(os.getenv("SLA_COMPACT_SLACK", "1024"))
+
+REMINDERS = counter("sla_reminders_total", "SLA reminders handled by the scheduler", ["result"])
+REMINDER_LAG = histogram("sla_reminder_lag_seconds", "Time from reminder_at to the alert being queued", ["status"])
+
+
+class SlaScheduler:
+    """
+    Fires each SLA reminder at its reminder time, in-process.
+
+    - Loads (reminder_at, address) for every open deadline into a min-heap
+      once at start; reminders already past due fire straight away, which is
+      the catch-up after a restart.
+    - deadline_store notifies it of every upsert/delete, so new, moved and
+      cancelled deadlines are picked up without rescanning. Cancelled or
+      moved entries stay in the heap and are skipped when they surface;
+      `current` holds the live reminder time per address.
+    - The worker sleeps until the earliest reminder (woken early when an
+      earlier one is added), re-reads the deadline, queues the alert and then
+      deletes the deadline only if its reminder was not moved meanwhile. A
+      crash between the two re-sends the alert after restart (at-least-once).
+    """
+
+    def __init__(self, send=None):
+        self.send = send or send_email
+        self.heap = []
+        self.current = {}
+        self.loop = None
+        self.wake = None
+        self.worker = None
+        self.subscribed = False
+        self.counters = {"loaded": 0, "added": 0, "cancelled": 0, "sent": 0, "stale": 0, "retried": 0, "failed": 0}
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+    async def start(self):
+        """Load the open deadlines and start firing. Must be called from the event loop."""
+        if self.worker is not None and not self.worker.done():
+            return
+        self.loop, self.wake = asyncio.get_running_loop(), asyncio.Event()
+        if not self.subscribed:
+            subscribe(self._on_change)
+            self.subscribed = True
+
+        # SQLite work runs in a thread so email handling on the loop never waits on it.
+        # Changes notified while it loads land in current/heap first and take precedence;
+        # a deadline deleted meanwhile is caught by the re-read at fire time.
+        self.current, self.heap = {}, []
+        rows = await asyncio.to_thread(scheduled_reminders)
+        for reminder_at, key in rows:
+            if key not in self.current:
+                self.current[key] = reminder_at
+                self.heap.append((reminder_at, key, reminder_at, 1))
+        heapq.heapify(self.heap)
+        self.counters["loaded"] = len(rows)
+        due = sum(1 for reminder_at, _ in rows if reminder_at <= time.time())
+        print(f"⏰ SLA scheduler loaded {len(rows)} reminder(s), {due} already due")
+        # Fresh context: a reminder belongs to no inbound email's correlation id
+        self.worker = self.loop.create_task(self._run(), context=contextvars.Context())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+    # --------------------------------------------------
+    # Changes from deadline_store
+    # --------------------------------------------------
+    def _on_change(self, address_key: str, reminder_at: float | None):
+        # Writes may come from worker threads; the heap is only touched on the loop
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._apply, address_key, reminder_at)
+
+    def _apply(self, address_key: str, reminder_at: float | None):
+        if reminder_at is None:
+            if self.current.pop(address_key, None) is not None:
+                self.counters["cancelled"] += 1
+            return
+        if self.current.get(address_key) == reminder_at:
+            return
+        self.current[address_key] = reminder_at
+        self.counters["added"] += 1
+        earliest = self.heap[0][0] if self.heap else None
+        heapq.heappush(self.heap, (reminder_at, address_key, reminder_at, 1))
+        if earliest is None or reminder_at < earliest:
+            self.wake.set()
+        if len(self.heap) > 2 * len(self.current) + SLA_COMPACT_SLACK:
+            self.heap = [entry for entry in self.heap if self.current.get(entry[1]) == entry[2]]
+            heapq.heapify(self.heap)
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+    async def _run(self):
+        while True:
+            while self.heap and self.current.get(self.heap[0][1]) != self.heap[0][2]:
+                heapq.heappop(self.heap)   # cancelled or moved
+            delay = self.heap[0][0] - time.time() if self.heap else SLA_MAX_SLEEP_SECONDS
+            if delay > 0:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), min(delay, SLA_MAX_SLEEP_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, address_key, reminder_at, attempt = heapq.heappop(self.heap)
+            await self._fire(address_key, reminder_at, attempt)
+
+    async def _fire(self, address_key: str, reminder_at: float, attempt: int):
+        record = await asyncio.to_thread(due_record, address_key, reminder_at)
+        if record is None:
+            # Deleted or moved by another process since it was loaded
+            if self.current.get(address_key) == reminder_at:
+                del self.current[address_key]
+            self.counters["stale"] += 1
+            REMINDERS.inc(result="stale")
+            return
+
+        subject, body = sla_alert(record)
+        try:
+            await self.send(SLA_ALERT_TO, subject, body)
+        except Exception as e:
+            if attempt >= SLA_MAX_ATTEMPTS:
+                # Left in the store: the next start (or sla_cronjob.py) retries it
+                self.current.pop(address_key, None)
+                self.counters["failed"] += 1
+                REMINDERS.inc(result="failed")
+                print(f"❌ SLA alert gave up for {record.get('Property_Address')}: {e!r}")
+                return
+            delay = SLA_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            heapq.heappush(self.heap, (time.time() + delay, address_key, reminder_at, attempt + 1))
+            self.counters["retried"] += 1
+            REMINDERS.inc(result="retried")
+            print(f"🔁 SLA alert failed (attempt {attempt}), retrying in {delay:.0f}s: {e!r}")
+            return
+
+        observe(REMINDER_LAG, max(time.time() - reminder_at, 0.0))
+        self.counters["sent"] += 1
+        REMINDERS.inc(result="sent")
+        print(f"🗑 Deleting: {record.get('Property_Address')}")
+        # Drop it first, so the store's delete notification is not counted as a cancellation
+        if self.current.get(address_key) == reminder_at:
+            del self.current[address_key]
+        await asyncio.to_thread(delete_deadline_if, address_key, reminder_at)
+
+    def stats(self) -> dict:
+        live = [entry[0] for entry in self.heap[:1] if self.current.get(entry[1]) == entry[2]]
+        return {
+            "scheduled": len(self.current),
+            "heap_entries": len(self.heap),
+            "next_due_in_seconds": round(live[0] - time.time(), 1) if live else -1,
+            **self.counters,
+        }
+
+
+SLA_SCHEDULER = SlaScheduler()
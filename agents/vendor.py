@@ -1,35 +1,229 @@
-import json
 import os
+import json
+import threading
+from contextlib import contextmanager
+from normalizers import normalize_address
+
+try:
+    import fcntl
+except ImportError:   # Windows: fall back to the in-process lock only
+    fcntl = None
 
 VENDOR_MAP_FILE = "vendor_details.json"
+VENDOR_LOG_FILE = "vendor_details.log"     # append-only writes since the last compaction
+VENDOR_LOCK_FILE = "vendor_details.lock"
 
+# Fold the log back into the JSON snapshot after this many appended entries
+COMPACT_EVERY = int(os.getenv("VENDOR_COMPACT_EVERY", "500"))
 
-def load_vendor_map() -> dict:
-    """Load the vendor map from file, return empty dict if file missing."""
-    if not os.path.exists(VENDOR_MAP_FILE):
-        return {}
-    with open(VENDOR_MAP_FILE, "r") as f:
-        return json.load(f)
 
+def _file_version(path: str):
+    """(inode, mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class VendorStore:
+    """
+    Property address → vendor email, cached in memory.
+
+    The JSON snapshot plus an append-only log are the source of truth. Every
+    call revalidates the cache against their mtimes, so writes from other
+    processes are picked up; writes take an exclusive cross-process file lock.
+    """
+
+    def __init__(self, snapshot_path: str = VENDOR_MAP_FILE, log_path: str = VENDOR_LOG_FILE,
+                 lock_path: str = VENDOR_LOCK_FILE, compact_every: int = COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.log_path = log_path
+        self.lock_path = lock_path
+        self.compact_every = compact_every
+
+        self.lock = threading.RLock()
+        self.vendors = {}        # property address → vendor email
+        self.keys = {}           # normalised address → property address
+        self.snapshot_version = None
+        self.log_version = None
+        self.log_offset = 0
+        self.log_entries = 0
+        self.loaded = False
+
+    # --------------------------------------------------
+    # Locking
+    # --------------------------------------------------
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --------------------------------------------------
+    # Cache maintenance
+    # --------------------------------------------------
+    def _apply(self, entry: dict):
+        address = entry["address"]
+        key = normalize_address(address)
+        previous = self.keys.pop(key, None)
+        if previous is not None:
+            self.vendors.pop(previous, None)
+        if entry.get("op") == "delete":
+            return
+        self.vendors[address] = entry["email"]
+        self.keys[key] = address
+
+    def _read_log(self, offset: int) -> int:
+        """Apply log entries from `offset`; returns the offset after the last complete line."""
+        if not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break   # partially written entry; picked up on the next refresh
+                offset += len(line)
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    print("⚠️ Skipping corrupt vendor log entry:", e)
+                self.log_entries += 1
+        return offset
+
+    def _refresh(self):
+        """Reload whatever changed on disk since the last call (caller holds the lock)."""
+        snapshot_version = _file_version(self.snapshot_path)
+        log_version = _file_version(self.log_path)
+        if self.loaded and snapshot_version == self.snapshot_version and log_version == self.log_version:
+            return
+
+        log_size = log_version[2] if log_version else 0
+        if not self.loaded or snapshot_version != self.snapshot_version or log_size < self.log_offset:
+            # Snapshot replaced (compaction elsewhere) or log truncated: full reload
+            self.vendors, self.keys = {}, {}
+            self.log_offset = self.log_entries = 0
+            if snapshot_version is not None:
+                with open(self.snapshot_path, "r") as f:
+                    for address, email in json.load(f).items():
+                        self._apply({"address": address, "email": email})
+
+        # Only the tail appended since the last refresh is read
+        self.log_offset = self._read_log(self.log_offset)
+        self.snapshot_version = snapshot_version
+        self.log_version = _file_version(self.log_path)
+        self.loaded = True
+
+    def _append(self, entries: list):
+        """Write entries to the log, apply them to the cache and compact if due (caller holds the lock)."""
+        payload = "".join(json.dumps(entry) + "\n" for entry in entries)
+        with open(self.log_path, "a") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        for entry in entries:
+            self._apply(entry)
+        self.log_entries += len(entries)
+        self.log_offset += len(payload.encode())
+        self.log_version = _file_version(self.log_path)
 
-def save_vendor_map(data: dict):
-    """Save vendor map to the JSON file."""
-    with open(VENDOR_MAP_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+        if self.log_entries >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the snapshot from the cache and start an empty log (caller holds the lock)."""
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.vendors, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        open(self.log_path, "w").close()
+
+        self.snapshot_version = _file_version(self.snapshot_path)
+        self.log_version = _file_version(self.log_path)
+        self.log_offset = self.log_entries = 0
+        print(f"🗜 Compacted vendor directory ({len(self.vendors)} vendors)")
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+    def get(self, property_address: str) -> str | None:
+        with self._file_lock(exclusive=False):
+            self._refresh()
+            address = self.keys.get(normalize_address(property_address))
+            return self.vendors.get(address) if address is not None else None
+
+    def set(self, property_address: str, vendor_email: str):
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            self._append([{"op": "set", "address": property_address, "email": vendor_email}])
+
+    def delete(self, property_address: str) -> bool:
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            if normalize_address(property_address) not in self.keys:
+                return False
+            self._append([{"op": "delete", "address": property_address}])
+            return True
+
+    def import_vendors(self, vendors: dict) -> int:
+        """Bulk add/update {property address: vendor email} under a single lock and fsync."""
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            self._append([{"op": "set", "address": a, "email": e} for a, e in vendors.items()])
+        return len(vendors)
+
+    def export_vendors(self, path: str | None = None) -> dict:
+        """Current directory as a dict; also written to `path` as JSON when given."""
+        with self._file_lock(exclusive=False):
+            self._refresh()
+            vendors = dict(self.vendors)
+        if path:
+            with open(path, "w") as f:
+                json.dump(vendors, f, indent=4)
+        return vendors
+
+    def compact(self):
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            self._compact()
+
+
+VENDORS = VendorStore()
+
+
+def load_vendor_map() -> dict:
+    """Snapshot of the vendor map."""
+    return VENDORS.export_vendors()
 
 
 def add_vendor(property_address: str, vendor_email: str):
     """
     Add or update vendor email for a property.
     """
-    vendor_map = load_vendor_map()
-    vendor_map[property_address] = vendor_email
-    save_vendor_map(vendor_map)
+    VENDORS.set(property_address, vendor_email)
 
 
 def get_vendor(property_address: str) -> str | None:
     """
     Retrieve vendor email for a property, or None if not found.
     """
-    vendor_map = load_vendor_map()
-    return vendor_map.get(property_address)
+    return VENDORS.get(property_address)
+
+
+def import_vendors(vendors: dict) -> int:
+    """Bulk add/update vendors, e.g. from a CRM export."""
+    return VENDORS.import_vendors(vendors)
+
+
+def export_vendors(path: str | None = None) -> dict:
+    """Dump the vendor directory, optionally to a JSON file."""
+    return VENDORS.export_vendors(path)
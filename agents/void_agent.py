@@ -1,3 +1,3 @@
-def void(state):
+async def void(state):
     print("Irrelevant Email, pass.")
     return state
\ No newline at end of file
@@ -0,0 +1,183 @@
+import os
+import io
+import json
+import time
+import uuid
+import asyncio
+import contextvars
+from deal_index import DealIndex
+from clients import get_async_openai
+
+# EOIs submitted within this window share one file_batches upload
+INGEST_LINGER_SECONDS = float(os.getenv("VS_INGEST_LINGER_SECONDS", "1"))
+INGEST_BATCH_MAX = int(os.getenv("VS_INGEST_BATCH_MAX", "100"))
+INGEST_POLL_MS = int(os.getenv("VS_INGEST_POLL_MS", "1000"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("VS_INGEST_MAX_ATTEMPTS", "5"))
+INGEST_BACKOFF_SECONDS = float(os.getenv("VS_INGEST_BACKOFF_SECONDS", "5"))
+
+
+class VectorStoreIngestor:
+    """
+    Background ingestion of EOI JSON into the OpenAI vector store.
+
+    - submit() returns immediately; a worker task groups bursts into one
+      file_batches upload and polls for indexing with asyncio sleeps.
+    - Payloads are uploaded from memory, never via a file in the CWD.
+    - Until the vector store has indexed an EOI it stays in `pending`, a local
+      index search_vs checks, so a contract arriving right behind its EOI
+      still finds it (read-your-writes).
+    """
+
+    def __init__(self, vector_store_id: str | None = None):
+        self.vector_store_id = vector_store_id
+        self.pending = DealIndex(path=None)
+        self.loop = None
+        self.queue = None
+        self.worker = None
+        self.tasks = set()
+        self.collecting = False
+        self.last_batch_seconds = 0.0
+        self.counters = {"submitted": 0, "batches": 0, "indexed": 0, "retried": 0, "failed": 0}
+
+    # --------------------------------------------------
+    # Producer side
+    # --------------------------------------------------
+    def submit(self, eoi: dict, sender_email: str):
+        """Queue an EOI for upload. Must be called from the event loop."""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # First use, or a new event loop (scripts and benchmarks call asyncio.run repeatedly)
+            self.loop, self.queue = loop, asyncio.Queue()
+            # Fresh context: batches mix EOIs from many emails, so no single correlation id applies
+            self.worker = loop.create_task(self._run(), context=contextvars.Context())
+        self.pending.add(eoi, persist=False)
+        # (eoi, sender, attempt, uploaded file or None): retries reuse the file already uploaded
+        self.queue.put_nowait((eoi, sender_email, 1, None))
+        self.counters["submitted"] += 1
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            self.collecting = True
+            deadline = self.loop.time() + INGEST_LINGER_SECONDS
+            while len(batch) < INGEST_BATCH_MAX:
+                timeout = deadline - self.loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Indexing can take a while; keep collecting the next burst meanwhile
+            task = self.loop.create_task(self._ingest(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            self.collecting = False
+
+    async def _upload(self, client, eoi: dict, sender_email: str, file: dict | None = None) -> dict:
+        if file is not None:
+            return file   # uploaded by an earlier attempt
+        payload = io.BytesIO(json.dumps(eoi).encode("utf-8"))
+        uploaded = await client.files.create(file=(f"eoi-{uuid.uuid4().hex}.txt", payload, "text/plain"),
+                                             purpose="assistants")
+        return {"file_id": uploaded.id, "attributes": {"sender_email": sender_email}}
+
+    async def _ingest(self, batch: list):
+        start = time.perf_counter()
+        client = get_async_openai()
+        vector_store_id = self.vector_store_id or os.getenv("OPENAI_VS_ID")
+
+        uploads = await asyncio.gather(*(self._upload(client, eoi, sender, file) for eoi, sender, _, file in batch),
+                                       return_exceptions=True)
+        batch = [(eoi, sender, attempt, None if isinstance(up, BaseException) else up)
+                 for (eoi, sender, attempt, _), up in zip(batch, uploads)]
+        failed_upload = next((up for up in uploads if isinstance(up, BaseException)), None)
+        try:
+            if failed_upload is not None:
+                raise failed_upload
+            files = [file for *_, file in batch]
+            result = await client.vector_stores.file_batches.create(vector_store_id, files=files)
+            result = await client.vector_stores.file_batches.poll(
+                result.id, vector_store_id=vector_store_id, poll_interval_ms=INGEST_POLL_MS)
+        except Exception as e:
+            # Files that did upload are kept on the items and reused by the retry
+            self._retry(batch, repr(e))
+            return
+
+        failed_ids = set()
+        if result.status != "completed" or result.file_counts.failed:
+            try:
+                failed = client.vector_stores.file_batches.list_files(
+                    result.id, vector_store_id=vector_store_id, filter="failed")
+                failed_ids = {f.id async for f in failed}
+            except Exception:
+                failed_ids = {f["file_id"] for f in files}
+
+        retry = []
+        for item, file in zip(batch, files):
+            if file["file_id"] in failed_ids:
+                # OpenAI could not process this upload; drop it and upload afresh next attempt
+                await self._delete_file(client, file["file_id"])
+                retry.append(item[:3] + (None,))
+            else:
+                self.pending.remove(item[0])
+                self.counters["indexed"] += 1
+        if retry:
+            self._retry(retry, f"{len(retry)} file(s) failed in batch {result.id} ({result.status})")
+
+        self.counters["batches"] += 1
+        self.last_batch_seconds = time.perf_counter() - start
+        print(f"📥 Indexed {len(batch) - len(retry)} EOI(s) into the vector store "
+              f"in one batch ({self.last_batch_seconds:.1f}s)")
+
+    async def _delete_file(self, client, file_id: str):
+        try:
+            await client.files.delete(file_id)
+        except Exception as e:
+            print(f"⚠️ Could not delete uploaded file {file_id}:", e)
+
+    def _retry(self, items: list, error: str):
+        for eoi, sender_email, attempt, file in items:
+            if attempt >= INGEST_MAX_ATTEMPTS:
+                # Still in the local deal index and `pending`, so lookups keep working
+                self.counters["failed"] += 1
+                print(f"❌ Vector store ingestion gave up for {eoi.get('Property_Address')}: {error}")
+                if file is not None:
+                    # Never indexed: do not leave the upload behind in OpenAI storage
+                    task = self.loop.create_task(self._delete_file(get_async_openai(), file["file_id"]))
+                    self.tasks.add(task)
+                    task.add_done_callback(self.tasks.discard)
+                continue
+            delay = INGEST_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            self.counters["retried"] += 1
+            print(f"🔁 Vector store ingestion failed (attempt {attempt}), retrying in {delay:.0f}s: {error}")
+            self.loop.call_later(delay, self.queue.put_nowait, (eoi, sender_email, attempt + 1, file))
+
+    async def drain(self, timeout: float = 30.0):
+        """Wait for queued and in-flight uploads, e.g. before shutdown."""
+        deadline = time.monotonic() + timeout
+        while self.queue is not None and (not self.queue.empty() or self.collecting or self.tasks):
+            if time.monotonic() > deadline:
+                print(f"⚠️ Shutting down with {self.queue.qsize() + len(self.tasks)} vector store upload(s) pending")
+                return
+            await asyncio.sleep(0.1)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "in_flight_batches": len(self.tasks),
+            "last_batch_seconds": round(self.last_batch_seconds, 3),
+            **self.counters,
+        }
+
+
+VS_INGESTOR = VectorStoreIngestor()
+
+
+def ingest_eoi(eoi: dict, sender_email: str):
+    """Queue an extracted EOI for the vector store; returns without waiting for indexing."""
+    VS_INGESTOR.submit(eoi, sender_email)
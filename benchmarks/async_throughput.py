@@ -0,0 +1,65 @@
+"""
+Concurrency benchmark for the agent server.
+
+Fires N copies of an email at /incoming-email at the same time and reports
+wall-clock time and emails per second for each N, so you can see whether
+throughput scales with concurrency or serialises behind one slow node.
+
+Usage (agent server running on :2000):
+    python benchmarks/async_throughput.py
+    python benchmarks/async_throughput.py --levels 1 4 16 32 --email my_email.json
+"""
+import json
+import time
+import asyncio
+import argparse
+import httpx
+
+DEFAULT_EMAIL = {
+    "subject": "Completed: Contract of Sale – Lot 95 Fake Rise VIC 3336",
+    "body": "All parties have signed.\nDocument: Contract of Sale – Lot 95 Fake Rise VIC 3336",
+    "from_email": "dse@docusign.net",
+    "to_email": "support@onecorpaustralia.com.au",
+    "attachments": [],
+}
+
+
+async def send_burst(url: str, email: dict, n: int) -> tuple[float, list]:
+    """Send n emails concurrently; return (wall seconds, per-request latencies)."""
+    async def one(client):
+        start = time.perf_counter()
+        resp = await client.post(url, json=email)
+        resp.raise_for_status()
+        return time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(client) for _ in range(n)))
+        return time.perf_counter() - start, sorted(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:2000/incoming-email")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--email", help="JSON file with an EmailModel payload")
+    args = parser.parse_args()
+
+    email = DEFAULT_EMAIL
+    if args.email:
+        with open(args.email) as f:
+            email = json.load(f)
+
+    print(f"{'N':>4} {'wall s':>8} {'emails/s':>9} {'p50 s':>7} {'max s':>7} {'speedup':>8}")
+    baseline = None
+    for n in args.levels:
+        wall, latencies = await send_burst(args.url, email, n)
+        rate = n / wall
+        baseline = baseline or rate
+        print(f"{n:>4} {wall:>8.2f} {rate:>9.2f} {latencies[len(latencies) // 2]:>7.2f} "
+              f"{latencies[-1]:>7.2f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Peak-memory benchmark for the attachment pipeline.
+
+Serves synthetic PDFs of increasing size from a local HTTP server, streams
+each one into the spool exactly like webhook.fetch_email does, then uploads
+it through file_registry.upload_file_to_openai against a local stand-in for
+the OpenAI files endpoint. Peak RSS is printed after every size — it should
+stay flat instead of growing with the attachment.
+
+Usage:
+    python benchmarks/attachment_spool_bench.py
+    python benchmarks/attachment_spool_bench.py --sizes 10 100 300
+    python benchmarks/attachment_spool_bench.py --legacy   # old .content download for comparison
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CHUNK = 64 * 1024
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """GET /<mb>.pdf streams that many MB; POST /v1/files drains the upload in chunks."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        size = int(float(self.path.strip("/").removesuffix(".pdf")) * 1024 * 1024)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        block = b"%PDF-1.7\n" + b"0" * (CHUNK - 9)
+        sent = 0
+        while sent < size:
+            piece = block[: min(CHUNK, size - sent)]
+            self.wfile.write(piece)
+            sent += len(piece)
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining:
+            remaining -= len(self.rfile.read(min(CHUNK, remaining)))
+        body = json.dumps({"id": f"file-{time.time_ns()}", "object": "file", "bytes": 0, "created_at": 0,
+                           "filename": "upload.pdf", "purpose": "assistants", "status": "processed"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 25, 100, 250], help="attachment sizes in MB")
+    parser.add_argument("--legacy", action="store_true", help="download with response.content like the old code")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    # Run from a scratch copy of the repo layout so the spool and registry stay out of the tree
+    scratch = tempfile.mkdtemp()
+    os.makedirs(os.path.join(scratch, "mail_monitoring"))
+    os.chdir(os.path.join(scratch, "mail_monitoring"))
+    os.environ["MAX_ATTACHMENT_MB"] = str(max(args.sizes) + 1)
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = base + "/v1"
+
+    sys.path.append(ROOT)   # common/, shared by both services
+    sys.path.insert(0, os.path.join(ROOT, "mail_monitoring"))
+    from convert_document import save_attachment_stream
+    from clients import get_http, request_timeout
+    sys.path.insert(0, os.path.join(ROOT, "agents"))
+    import file_registry
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI()
+    print(f"{'MB':>6} {'download s':>11} {'upload s':>9} {'peak RSS MB':>12}")
+    for mb in args.sizes:
+        start = time.perf_counter()
+        if args.legacy:
+            content = get_http().get(f"{base}/{mb}.pdf", timeout=request_timeout()).content
+            path = save_attachment_stream(f"{mb}.pdf", [content])
+            del content
+        else:
+            with get_http().get(f"{base}/{mb}.pdf", timeout=request_timeout(), stream=True) as resp:
+                path = save_attachment_stream(f"{mb}.pdf", resp.iter_content(CHUNK))
+        downloaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(file_registry.upload_file_to_openai(client, path))
+        uploaded = time.perf_counter() - start
+        print(f"{mb:>6g} {downloaded:>11.2f} {uploaded:>9.2f} {peak_rss_mb():>12.1f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Contract-vs-EOI diff benchmark.
+
+Reads the sample EOI (data/EOI_John_Jane-Smith.pdf) with the local EOI
+extractor. It takes the sample contracts' fields from their relevant pages,
+using the same "Label: value" reader the OpenAI stand-in answers with. It
+then prints each contract's discrepancies and how long contract_diff takes
+per comparison. V2 should validate and V1 should report the lot, prices,
+Jane's email and the finance terms.
+
+Usage:
+    python benchmarks/contract_diff_bench.py
+    python benchmarks/contract_diff_bench.py --iterations 100000
+"""
+import os
+import sys
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+from openai_standin import _contract_fields  # noqa: E402
+from contract_pages import select_pages  # noqa: E402
+from contract_diff import diff_contract  # noqa: E402
+from eoi_local_extractor import extract_eoi_local  # noqa: E402
+
+DATA = os.path.join(ROOT, "data")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    eoi, _ = extract_eoi_local(os.path.join(DATA, "EOI_John_Jane-Smith.pdf"), "")
+    for name in sorted(n for n in os.listdir(DATA) if n.startswith("CONTRACT")):
+        contract = _contract_fields(select_pages(os.path.join(DATA, name))["text"], [])
+        result = diff_contract(eoi, contract)
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            diff_contract(eoi, contract)
+        per_diff_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+        verdict = "valid" if result["Contract_Validation"] else f"{len(result['Incorrect_Fields'])} discrepancies"
+        print(f"\n{name}: {verdict}, {per_diff_us:.0f} µs per diff")
+        for field in result["Incorrect_Fields"]:
+            print(f"  - {field['Field']}: EOI {field['EOI_Value']!r} vs contract {field['Contract_Value']!r}")
+
+
+if __name__ == "__main__":
+    main()
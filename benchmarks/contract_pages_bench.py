@@ -0,0 +1,75 @@
+"""
+Relevant-page pre-filter benchmark for the contract checker.
+
+Runs contract_pages.select_pages over the sample contracts in data/ and over
+synthetic long contracts (the sample's boilerplate pages repeated), printing
+the pages kept, the estimated text tokens sent vs the whole document, the
+time taken and the peak Python memory. Peak memory should stay roughly flat
+as the contract grows, because only the kept pages' text is held.
+
+Usage:
+    python benchmarks/contract_pages_bench.py
+    python benchmarks/contract_pages_bench.py --pages 50 200 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pypdf import PdfReader, PdfWriter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+from contract_pages import select_pages  # noqa: E402
+
+SAMPLE = os.path.join(ROOT, "data", "CONTRACT_OF_SALE_OF_REAL_ESTATE_V2.pdf")
+
+
+def synthetic_contract(pages: int) -> str:
+    """The sample's particulars (pages 1-3) followed by its general conditions repeated to `pages`."""
+    reader = PdfReader(SAMPLE)
+    writer = PdfWriter()
+    for i in range(pages):
+        writer.add_page(reader.pages[i] if i < 3 else reader.pages[3 + i % 2])
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def measure(path: str) -> dict:
+    start = time.perf_counter()
+    selection = select_pages(path)
+    seconds = time.perf_counter() - start
+    # Separate pass: tracemalloc slows pypdf down several times
+    tracemalloc.start()
+    select_pages(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**selection, "seconds": seconds, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100, 300])
+    args = parser.parse_args()
+
+    cases = [(name, os.path.join(ROOT, "data", name), False)
+             for name in sorted(os.listdir(os.path.join(ROOT, "data"))) if name.startswith("CONTRACT")]
+    cases += [(f"synthetic {n} pages", synthetic_contract(n), True) for n in args.pages]
+
+    print(f"{'document':<48} {'pages':>5} {'kept':>5} {'full tok':>9} {'sent tok':>9} "
+          f"{'saved':>6} {'ms':>8} {'peak MB':>8}")
+    for name, path, temporary in cases:
+        try:
+            r = measure(path)
+        finally:
+            if temporary:
+                os.remove(path)
+        print(f"{name[:48]:<48} {r['pages']:>5} {len(r['kept']):>5} {r['full_tokens']:>9} {r['kept_tokens']:>9} "
+              f"{r['reduction']:>6.0%} {r['seconds'] * 1000:>8.1f} {r['peak_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
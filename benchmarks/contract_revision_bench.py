@@ -0,0 +1,103 @@
+"""
+Incremental contract revalidation benchmark.
+
+Plays a sequence of contract revisions for one property through the
+contract checker's page cache (contract_cache.py): V1, then V2, then V2 with
+V1's page 3 pasted back in, then V2 re-sent twice (the second copy repeats
+the latest revision, so no new revision is stored). Each revision is
+fingerprinted page by page. Pages the cache has not seen are "extracted" by
+the OpenAI stand-in's per-page responder, the fields are merged and diffed
+against the sample EOI. The script prints the pages re-extracted, the text
+tokens sent compared with a full re-extraction, the share of the contract's
+pages served from the cache, and the verdict.
+
+Usage:
+    python benchmarks/contract_revision_bench.py
+"""
+import os
+import sys
+import shutil
+import logging
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+SCRATCH = tempfile.mkdtemp(prefix="contract-revision-")
+os.environ.setdefault("CONTRACT_CACHE_DB", os.path.join(SCRATCH, "contract_cache.db"))
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+from openai_standin import _contract_fields  # noqa: E402
+from contract_pages import estimate_tokens, select_pages  # noqa: E402
+from contract_cache import cached_pages, merge_pages, page_hash, record_revision, store_pages  # noqa: E402
+from contract_diff import diff_contract  # noqa: E402
+from eoi_local_extractor import extract_eoi_local  # noqa: E402
+
+DATA = os.path.join(ROOT, "data")
+V1 = os.path.join(DATA, "CONTRACT_OF_SALE_OF_REAL ESTATE_V1_test.pdf")
+V2 = os.path.join(DATA, "CONTRACT_OF_SALE_OF_REAL_ESTATE_V2.pdf")
+# The sample PDFs have broken xref offsets that pypdf repairs noisily
+logging.getLogger("pypdf").setLevel(logging.ERROR)
+
+
+def spliced(base: str, donor: str, page: int) -> str:
+    """`base` with its 1-based `page` taken from `donor`."""
+    base_pages, donor_pages = PdfReader(base).pages, PdfReader(donor).pages
+    writer = PdfWriter()
+    for index, p in enumerate(base_pages):
+        writer.add_page(donor_pages[index] if index == page - 1 else p)
+    path = os.path.join(SCRATCH, f"spliced-{page}.pdf")
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def revalidate(eoi: dict, pdf_path: str) -> dict:
+    selection = select_pages(pdf_path)
+    pages = selection["kept_pages"]
+    hashes = {p["page"]: page_hash(p["text"], p["context"]) for p in pages}
+    cached = cached_pages(list(hashes.values()))
+
+    changed = [p for p in pages if hashes[p["page"]] not in cached]
+    fresh = {hashes[p["page"]]: _contract_fields(p["text"], []) for p in changed}
+    if fresh:
+        store_pages(fresh)
+        cached.update(fresh)
+
+    fields = merge_pages([cached[hashes[p["page"]]] for p in pages])
+    revision = record_revision(eoi["Property_Address"], os.path.basename(pdf_path), hashes)
+    return {
+        **revision,
+        "extracted": [p["page"] for p in changed],
+        "sent_tokens": sum(estimate_tokens(p["context"] + p["text"]) for p in changed),
+        "full_tokens": selection["kept_tokens"],
+        "hit_ratio": (len(pages) - len(changed)) / len(pages) if pages else 0.0,
+        "result": diff_contract(eoi, fields),
+    }
+
+
+def main():
+    eoi, _ = extract_eoi_local(os.path.join(DATA, "EOI_John_Jane-Smith.pdf"), "")
+    revisions = [
+        ("V1", V1),
+        ("V2", V2),
+        ("V2 with V1 page 3", spliced(V2, V1, 3)),
+        ("V2 re-sent", V2),
+        ("V2 re-sent again", V2),
+    ]
+
+    print(f"{'revision':<20} {'rev':>3} {'re-extracted':>12} {'tokens':>13} {'hit ratio':>9}  verdict")
+    for name, path in revisions:
+        r = revalidate(eoi, path)
+        extracted = ",".join(map(str, r["extracted"])) or "-"
+        verdict = ("valid" if r["result"]["Contract_Validation"]
+                   else ", ".join(f["Field"] for f in r["result"]["Incorrect_Fields"]))
+        print(f"{name:<20} {r['revision']:>3} {extracted:>12} {r['sent_tokens']:>6}/{r['full_tokens']:<6} "
+              f"{r['hit_ratio']:>9.0%}  {verdict}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
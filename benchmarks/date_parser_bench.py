@@ -0,0 +1,128 @@
+"""
+Signing appointment date parser: correctness and latency against the LLM.
+
+Checks agents/date_parser.py against the corpus in
+benchmarks/appointment_corpus.jsonl. Each line holds the reference time, the
+email text, the expected appointment ("dd-mm-yyyy HH:MM", or null) and the
+expected outcome ("ok", "no_date" or "ambiguous"). The script lists every
+disagreement and exits non-zero if there is one. It then compares the time
+per email of three paths:
+  - local: the parser alone
+  - llm: the signing agent's gpt-4.1 request, sent to the local OpenAI stand-in
+  - hybrid: what signing_agent does now, the parser with the LLM only for
+    the emails it could not settle
+
+Usage:
+    python benchmarks/date_parser_bench.py
+    python benchmarks/date_parser_bench.py --scale 1 --llm-emails 20
+    python benchmarks/date_parser_bench.py --openai-latency responses=lognormal:1800:0.4
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+sys.path.append(ROOT)   # common/, shared by both services
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+from openai import AsyncOpenAI  # noqa: E402
+from latency import parse_latencies  # noqa: E402
+from openai_standin import DEFAULT_LATENCIES, OpenAIStandIn  # noqa: E402
+from date_parser import appointment_fields, parse_appointment  # noqa: E402
+from signing_agent import SigningAppointment  # noqa: E402
+
+CORPUS = os.path.join(BENCH_DIR, "appointment_corpus.jsonl")
+
+
+def load_corpus(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def check(corpus: list) -> list:
+    """Cases where the parser's appointment or outcome differs from the corpus."""
+    failures = []
+    for case in corpus:
+        parsed = parse_appointment(case["text"], datetime.fromisoformat(case["now"]))
+        got = appointment_fields(parsed["appointment"])["appointment_datetime"] if parsed["appointment"] else None
+        if got != case["expected"] or parsed["reason"] != case["reason"]:
+            failures.append({**case, "got": got, "got_reason": parsed["reason"],
+                             "candidates": [c.strftime("%d-%m-%Y %H:%M") for c in parsed["candidates"]]})
+    return failures
+
+
+def time_local(corpus: list, rounds: int) -> float:
+    """Mean seconds per email for the parser alone."""
+    nows = [datetime.fromisoformat(case["now"]) for case in corpus]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for case, now in zip(corpus, nows):
+            parse_appointment(case["text"], now)
+    return (time.perf_counter() - start) / (rounds * len(corpus))
+
+
+async def time_llm(client: AsyncOpenAI, corpus: list) -> list:
+    """Seconds per email for the signing agent's LLM request, one email at a time."""
+    samples = []
+    for case in corpus:
+        start = time.perf_counter()
+        await client.responses.parse(
+            model="gpt-4.1",
+            input=[{"role": "user", "content": [{"type": "input_text", "text": case["text"]}]}],
+            text_format=SigningAppointment,
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--rounds", type=int, default=200, help="passes over the corpus when timing the parser")
+    parser.add_argument("--llm-emails", type=int, default=10, help="emails sent to the OpenAI stand-in")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiply every OpenAI latency sample")
+    parser.add_argument("--openai-latency", nargs="*", default=[], metavar="ENDPOINT=SPEC",
+                        help="override stand-in latencies, e.g. responses=lognormal:2500:0.45")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    failures = check(corpus)
+    outcomes = {reason: sum(1 for c in corpus if c["reason"] == reason) for reason in ("ok", "no_date", "ambiguous")}
+    print(f"Corpus: {len(corpus)} emails, {outcomes['ok']} parsed locally, "
+          f"{outcomes['no_date']} without a date, {outcomes['ambiguous']} ambiguous → LLM")
+    for f in failures:
+        print(f"  ✗ {f['text']!r}: expected {f['expected']} ({f['reason']}), "
+              f"got {f['got']} ({f['got_reason']}), candidates {f['candidates']}")
+    print(f"Correct: {len(corpus) - len(failures)}/{len(corpus)}")
+
+    local = time_local(corpus, args.rounds)
+
+    standin = OpenAIStandIn(latencies=parse_latencies(args.openai_latency, DEFAULT_LATENCIES,
+                                                      scale=args.scale, seed=args.seed)).start()
+    try:
+        client = AsyncOpenAI(base_url=standin.base_url, api_key="bench")
+        llm = asyncio.run(time_llm(client, corpus[:args.llm_emails]))
+    finally:
+        standin.stop()
+
+    llm_mean = statistics.mean(llm)
+    fallback = (outcomes["no_date"] + outcomes["ambiguous"]) / len(corpus)
+    hybrid = local + fallback * llm_mean
+    print(f"\n{'path':<8} {'ms per email':>13}")
+    print(f"{'local':<8} {local * 1000:>13.3f}")
+    print(f"{'llm':<8} {llm_mean * 1000:>13.1f}   (p95 {sorted(llm)[int(0.95 * (len(llm) - 1))] * 1000:.1f} ms, "
+          f"stand-in latency × {args.scale})")
+    print(f"{'hybrid':<8} {hybrid * 1000:>13.1f}   ({fallback:.0%} of emails fall back to the LLM)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
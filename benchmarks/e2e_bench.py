@@ -0,0 +1,526 @@
+"""
+Offline end-to-end benchmark of the mail pipeline.
+
+Starts the OpenAI and Graph stand-ins, the agent server (in this process, so
+LangGraph node timings are visible) and webhook.py (a subprocess, because it
+shares module names with the agents). It then replays emails built from the
+sample PDFs in data/: EOI, contract, solicitor signing date (plus a loosely
+worded one that needs the LLM router), DocuSign completion and an unrelated
+email for every deal. There are two modes:
+
+  graph    emails go straight into master_graph
+  webhook  messages are put in the Graph mailbox and announced with a change
+           notification, so each one goes queue → Graph fetch → spool →
+           agent server → outbox → sendMail
+
+For every concurrency level (emails in flight) it reports emails/s,
+end-to-end latency percentiles, per-node latency percentiles, OpenAI calls,
+LLM calls per email by route and peak memory. Run it with
+EMAIL_UNDERSTANDING=false to count the calls without the router's shared
+understanding of each email. --save-baseline stores the results. --baseline
+compares a run with a saved one and exits 1 when anything regressed by more
+than --tolerance.
+
+Usage:
+    python benchmarks/e2e_bench.py
+    python benchmarks/e2e_bench.py --mode graph --levels 1 4 16 --emails 40 --scale 0.05
+    python benchmarks/e2e_bench.py --openai-latency responses=lognormal:4000:0.6 --graph-latency normal:120:30
+    python benchmarks/e2e_bench.py --save-baseline e2e_baseline.json
+    python benchmarks/e2e_bench.py --baseline e2e_baseline.json --tolerance 0.25
+"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import shutil
+import asyncio
+import hashlib
+import argparse
+import resource
+import tempfile
+import subprocess
+from contextlib import nullcontext
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from latency import parse_latencies  # noqa: E402
+from graph_standin import GraphStandIn  # noqa: E402
+from openai_standin import DEFAULT_LATENCIES, OpenAIStandIn  # noqa: E402
+
+REF_RE = re.compile(r"Ref: (bench-\d+)")
+CONTRACTS = ["CONTRACT_OF_SALE_OF_REAL ESTATE_V1_test.pdf", "CONTRACT_OF_SALE_OF_REAL_ESTATE_V2.pdf"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)  # noqa: E731
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99)}
+
+
+def peak_rss_mb(pid: int | None = None) -> float:
+    """Peak resident memory of this process, or of `pid` (Linux /proc)."""
+    if pid is None:
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return 0.0
+
+
+# --------------------------------------------------
+# Timing hooks
+# --------------------------------------------------
+class Recorder:
+    """Per-node durations and end-of-graph signals, keyed by the Ref tag in each email body."""
+
+    def __init__(self):
+        self.nodes = defaultdict(list)
+        self.llm_calls = defaultdict(list)     # route → chat/responses calls per email
+        self.waiters = {}
+        self.errors = 0
+
+    def expect(self, ref: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[ref] = future
+        return future
+
+    def finish(self, body: str, error: Exception | None):
+        if error is not None:
+            self.errors += 1
+        m = REF_RE.search(body or "")
+        future = self.waiters.pop(m.group(1), None) if m else None
+        if future is not None and not future.done():
+            future.set_result(error)
+
+
+def node_timer(recorder: Recorder):
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class NodeTimer(BaseCallbackHandler):
+        """Times LangGraph node runs (a chain run named after its own langgraph_node)."""
+
+        def __init__(self):
+            self.started = {}
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None,
+                           **kwargs):
+            node = (metadata or {}).get("langgraph_node")
+            if node and kwargs.get("name") == node and any(t.startswith("graph:step") for t in tags or []):
+                self.started[run_id] = (node, time.perf_counter())
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            started = self.started.pop(run_id, None)
+            if started:
+                recorder.nodes[started[0]].append(time.perf_counter() - started[1])
+
+        on_chain_error = on_chain_end
+
+    return NodeTimer()
+
+
+class InstrumentedGraph:
+    """master_graph with node timing; stands in for server.master_graph too."""
+
+    def __init__(self, graph, recorder: Recorder):
+        self.graph, self.recorder = graph, recorder
+
+    async def ainvoke(self, state, config=None, **kwargs):
+        from clients import counting_llm_calls, llm_calls
+
+        config = {**(config or {}), "callbacks": [node_timer(self.recorder)]}
+        error = None
+        try:
+            # The agent server already counts the calls of emails it hands over
+            outer = llm_calls.get()
+            with nullcontext(outer) if outer is not None else counting_llm_calls() as calls:
+                result = await self.graph.ainvoke(state, config=config, **kwargs)
+            self.recorder.llm_calls[result.get("route") or "-"].append(sum(calls.values()))
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.recorder.finish(state["email"].get("body"), error)
+
+
+# --------------------------------------------------
+# Corpus
+# --------------------------------------------------
+def build_deals(data_dir: str) -> list:
+    """Property address and purchasers of each sample EOI, read with the local extractor."""
+    from eoi_local_extractor import extract_eoi_local
+
+    deals = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.startswith("EOI") and name.endswith(".pdf"):
+            fields, _ = extract_eoi_local(os.path.join(data_dir, name), "")
+            names = " & ".join(f"{p['First_Name']} {p['Last_Name']}".strip() for p in fields["Purchaser"])
+            deals.append({"eoi": name, "address": fields["Property_Address"], "names": names})
+    return deals
+
+
+def build_emails(deals: list) -> list:
+    """
+    One cycle per deal: EOI → contract → signing date → loosely worded signing date → DocuSign → unrelated.
+    The loose one gets past the routing rules and names two dates, so it needs the LLM router.
+    """
+    emails = []
+    day = (datetime.now() + timedelta(days=5)).strftime("%d/%m/%Y")
+    for i, deal in enumerate(deals):
+        address, names = deal["address"], deal["names"]
+        emails += [
+            {"kind": "eoi", "from": "agent@realty.example", "subject": f"Signed EOI - {address}",
+             "body": f"Hi team,\nPlease find the signed EOI for {names} attached.", "pdfs": [deal["eoi"]]},
+            {"kind": "contract", "from": f"contracts@builder{i}.example", "subject": f"Contract of Sale - {address}",
+             "body": f"Hi,\nPlease find the Contract of Sale for {names} - {address} attached.",
+             "pdfs": [CONTRACTS[i % len(CONTRACTS)]]},
+            {"kind": "signing_date", "from": "solicitor@law.example", "subject": f"RE: Contract review - {address}",
+             "body": f"Hi,\nWe have completed our review of the contract for {names} - {address}.\n"
+                     f"The signing appointment is booked for Thursday at 11:30am.", "pdfs": []},
+            {"kind": "signing_date_loose", "from": "solicitor@law.example", "subject": f"{names} - paperwork",
+             "body": f"Hi,\nAll sorted with the paperwork for {names} ({address}).\n"
+                     f"Their appointment to sign is {day} at 2pm, after they first suggested Friday.", "pdfs": []},
+            {"kind": "docusign", "from": "dse@docusign.net", "subject": f"Completed: Contract of Sale - {address}",
+             "body": f"All parties have signed.\nDocument: Contract of Sale - {address}", "pdfs": []},
+            {"kind": "other", "from": "news@portal.example", "subject": "Monthly market update",
+             "body": "Hello,\nHere is this month's property market newsletter.", "pdfs": []},
+        ]
+    return emails
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.seq = 0
+        self.scratch = tempfile.mkdtemp(prefix="e2e-bench-")
+        self.agents_dir = os.path.join(self.scratch, "agents")
+        self.mail_dir = os.path.join(self.scratch, "mail_monitoring")
+        self.spool = os.path.join(self.agents_dir, "data", "spool")
+        os.makedirs(self.spool)
+        os.makedirs(self.mail_dir)
+        self.data_dir = os.path.join(ROOT, "data")
+        self.pdf_bytes = {name: open(os.path.join(self.data_dir, name), "rb").read()
+                          for name in os.listdir(self.data_dir) if name.endswith(".pdf")}
+
+        self.openai = OpenAIStandIn(latencies=parse_latencies(args.openai_latency, DEFAULT_LATENCIES,
+                                                              args.scale, args.seed)).start()
+        self.graph = GraphStandIn(latency=args.graph_latency).start()
+        self.agent_port, self.webhook_port = free_port(), free_port()
+        self.webhook = None
+        self.recorder = Recorder()
+
+    # --------------------------------------------------
+    # Services
+    # --------------------------------------------------
+    def configure(self):
+        with open(os.path.join(self.mail_dir, ".env"), "w") as f:
+            f.write("REFRESH_TOKEN=bench-refresh\n")
+        os.environ.update({
+            "OPENAI_BASE_URL": self.openai.base_url,
+            "OPENAI_API_KEY": "standin",
+            "OPENAI_VS_ID": "vs_bench",
+            "VS_INGEST_POLL_MS": "200",
+            "GRAPH_BASE_URL": self.graph.base_url,
+            "TOKEN_URL": self.graph.base_url.removesuffix("/v1.0") + "/oauth2/v2.0/token",
+            "SEND_EMAIL_URL": f"http://127.0.0.1:{self.webhook_port}/send-email",
+            "AGENT_URL": f"http://127.0.0.1:{self.agent_port}/incoming-email",
+            "QUEUE_DB": os.path.join(self.mail_dir, "mail_queue.db"),
+            "QUEUE_WORKERS": str(self.args.workers),
+            "QUEUE_MAX_DEPTH": "100000",
+            "INGESTION_MODE": "webhook",
+            "WEBHOOK_URL": "",
+            "DELTA_SWEEP_SECONDS": "86400",
+        })
+        # Agents resolve their state files (deal index, registry, deadlines) against the CWD
+        os.chdir(self.agents_dir)
+        sys.path.insert(0, os.path.join(ROOT, "agents"))
+        sys.path.append(ROOT)   # common/, shared by both services
+
+    def start_webhook(self):
+        log = open(os.path.join(self.scratch, "webhook.log"), "w")
+        self.webhook = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "webhook:app", "--host", "127.0.0.1",
+             "--port", str(self.webhook_port), "--log-level", "warning"],
+            cwd=self.mail_dir, stdout=log, stderr=subprocess.STDOUT,
+            env={**os.environ, "PYTHONPATH": os.pathsep.join([os.path.join(ROOT, "mail_monitoring"), ROOT]), "PYTHONUNBUFFERED": "1"},
+        )
+
+    async def start_agent_server(self):
+        import uvicorn
+        import server
+
+        server.master_graph = InstrumentedGraph(server.master_graph, self.recorder)
+        config = uvicorn.Config(server.app, host="127.0.0.1", port=self.agent_port, log_level="warning")
+        self.agent_server = uvicorn.Server(config)
+        self.agent_task = asyncio.create_task(self.agent_server.serve())
+        self.graph_runner = server.master_graph
+
+    async def wait_ready(self, client, url: str, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.webhook is not None and self.webhook.poll() is not None:
+                raise RuntimeError(f"webhook exited, see {self.scratch}/webhook.log")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except Exception:
+                pass
+            await asyncio.sleep(0.2)
+        raise TimeoutError(f"{url} did not come up")
+
+    # --------------------------------------------------
+    # Replay
+    # --------------------------------------------------
+    def _ref(self) -> str:
+        self.seq += 1
+        return f"bench-{self.seq}"
+
+    def _spooled(self, name: str) -> str:
+        """Place a PDF the way mail_monitoring spools it, so agents never delete the sample copy."""
+        data = self.pdf_bytes[name]
+        path = os.path.join(self.spool, f"{hashlib.sha256(data).hexdigest()}__{name}")
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        return path
+
+    async def send_graph(self, template: dict, ref: str):
+        email = {"from": template["from"], "to": "support@onecorpaustralia.com.au",
+                 "subject": template["subject"], "body": f"{template['body']}\nRef: {ref}",
+                 "attachments": [self._spooled(name) for name in template["pdfs"]]}
+        await self.graph_runner.ainvoke({"email": email})
+
+    async def send_webhook(self, template: dict, ref: str, client):
+        self.graph.add_message(ref, template["subject"], f"{template['body']}\nRef: {ref}",
+                               [(name, self.pdf_bytes[name]) for name in template["pdfs"]],
+                               sender=template["from"])
+        notification = {"value": [{"resourceData": {"id": ref}}]}
+        resp = await client.post(f"http://127.0.0.1:{self.webhook_port}/webhook", json=notification)
+        resp.raise_for_status()
+
+    async def replay(self, mode: str, templates: list, level: int, count: int, client) -> dict:
+        self.recorder.nodes.clear()
+        self.recorder.llm_calls.clear()
+        errors_before = self.recorder.errors
+        openai_before = self.openai.stats()
+        semaphore = asyncio.Semaphore(level)
+        latencies, timeouts = [], 0
+
+        async def one(template):
+            nonlocal timeouts
+            async with semaphore:
+                ref = self._ref()
+                done = self.recorder.expect(ref)
+                start = time.perf_counter()
+                try:
+                    if mode == "graph":
+                        await self.send_graph(template, ref)
+                    else:
+                        await self.send_webhook(template, ref, client)
+                    await asyncio.wait_for(done, self.args.timeout)
+                except asyncio.TimeoutError:
+                    timeouts += 1
+                    return
+                except Exception:
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(templates[i % len(templates)]) for i in range(count)))
+        wall = time.perf_counter() - start
+
+        openai_after = self.openai.stats()
+        calls = {name: entry["requests"] - openai_before.get(name, {}).get("requests", 0)
+                 for name, entry in openai_after.items()}
+        return {
+            "emails": count,
+            "errors": self.recorder.errors - errors_before,
+            "timeouts": timeouts,
+            "wall_seconds": round(wall, 3),
+            "emails_per_second": round(len(latencies) / wall, 2) if wall else 0.0,
+            "e2e_ms": percentiles(latencies),
+            "nodes_ms": {node: percentiles(values) for node, values in sorted(self.recorder.nodes.items())},
+            "openai_calls": {k: v for k, v in sorted(calls.items()) if v},
+            "llm_calls_per_email": round(sum(map(sum, self.recorder.llm_calls.values())) / max(1, count), 2),
+            "llm_calls_by_route": {route: {"emails": len(v), "per_email": round(sum(v) / len(v), 2)}
+                                   for route, v in sorted(self.recorder.llm_calls.items())},
+            "peak_rss_mb": peak_rss_mb(),
+            "webhook_peak_rss_mb": peak_rss_mb(self.webhook.pid) if self.webhook else None,
+        }
+
+    async def run(self) -> dict:
+        import httpx
+
+        self.configure()
+        self.start_webhook()
+        deals = build_deals(self.data_dir)
+        templates = build_emails(deals)
+        await self.start_agent_server()
+
+        results = {}
+        async with httpx.AsyncClient(timeout=30) as client:
+            await self.wait_ready(client, f"http://127.0.0.1:{self.webhook_port}/queue/metrics")
+            await self.wait_ready(client, f"http://127.0.0.1:{self.agent_port}/pool-stats")
+
+            for mode in self.args.modes:
+                # One ordered pass per deal so contracts, signing dates and DocuSign mails find their deal
+                print(f"\n▶ {mode}: warm-up ({len(templates)} emails, sequential)")
+                await self.replay(mode, templates, 1, len(templates), client)
+                results[mode] = {}
+                for level in self.args.levels:
+                    count = self.args.emails or max(len(templates), level * 4)
+                    result = await self.replay(mode, templates, level, count, client)
+                    results[mode][str(level)] = result
+                    print(f"  concurrency {level:>3}: {result['emails_per_second']:>6.2f} emails/s, "
+                          f"p50 {result['e2e_ms']['p50']} ms, p95 {result['e2e_ms']['p95']} ms, "
+                          f"{result['errors']} error(s), {result['timeouts']} timeout(s)")
+
+            outbox = (await client.get(f"http://127.0.0.1:{self.webhook_port}/outbox/metrics")).json()
+
+        self.agent_server.should_exit = True
+        await self.agent_task
+        return {"results": results, "outbox": outbox, "graph_sent": len(self.graph.sent)}
+
+    def stop(self):
+        if self.webhook is not None:
+            self.webhook.terminate()
+            self.webhook.wait(timeout=10)
+        self.openai.stop()
+        self.graph.stop()
+        if not self.args.keep:
+            shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+def report(run: dict):
+    print("\n" + "=" * 100)
+    print(f"{'mode':<8} {'level':>5} {'emails':>6} {'err':>4} {'emails/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'rss MB':>7} {'webhook MB':>10}")
+    for mode, levels in run["results"].items():
+        for level, r in levels.items():
+            e2e = r["e2e_ms"]
+            print(f"{mode:<8} {level:>5} {r['emails']:>6} {r['errors'] + r['timeouts']:>4} "
+                  f"{r['emails_per_second']:>9.2f} {e2e['p50'] or 0:>8.0f} {e2e['p95'] or 0:>8.0f} "
+                  f"{e2e['p99'] or 0:>8.0f} {r['peak_rss_mb']:>7.0f} {r['webhook_peak_rss_mb'] or 0:>10.0f}")
+
+    for mode, levels in run["results"].items():
+        print(f"\nPer-node latency ({mode}), ms p50 / p95 / p99 (count)")
+        nodes = sorted({n for r in levels.values() for n in r["nodes_ms"]})
+        print(f"{'node':<18}" + "".join(f"{'c=' + level:>29}" for level in levels))
+        for node in nodes:
+            row = f"{node:<18}"
+            for r in levels.values():
+                p = r["nodes_ms"].get(node)
+                row += f"{p['p50']:>8.0f} /{p['p95']:>6.0f} /{p['p99']:>6.0f} ({p['count']:>2})" if p else f"{'-':>29}"
+            print(row)
+        last = list(levels.values())[-1]
+        print("OpenAI calls at highest level:", ", ".join(f"{k} {v}" for k, v in last["openai_calls"].items()))
+        print(f"LLM calls per email at highest level: {last.get('llm_calls_per_email', 0)} ("
+              + ", ".join(f"{route} {r['per_email']} x{r['emails']}"
+                          for route, r in last.get("llm_calls_by_route", {}).items()) + ")")
+
+    print(f"\nOutbox: {run['outbox'].get('sent', 0)} sent in {run['outbox'].get('batches', 0)} $batch call(s), "
+          f"{run['graph_sent']} message(s) delivered to the Graph stand-in")
+
+
+def compare(run: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of this run against a saved baseline, as printable lines."""
+    problems = []
+    for mode, levels in run["results"].items():
+        for level, r in levels.items():
+            base = baseline["results"].get(mode, {}).get(level)
+            if not base:
+                continue
+            where = f"{mode} c={level}"
+            if r["emails_per_second"] < base["emails_per_second"] * (1 - tolerance):
+                problems.append(f"{where}: throughput {r['emails_per_second']} < {base['emails_per_second']} emails/s")
+            for name, now, then in [("e2e p95", r["e2e_ms"]["p95"], base["e2e_ms"]["p95"])] + [
+                (f"{node} p95", r["nodes_ms"][node]["p95"], base["nodes_ms"][node]["p95"])
+                for node in r["nodes_ms"] if node in base["nodes_ms"]
+            ]:
+                if now is not None and then and now > then * (1 + tolerance):
+                    problems.append(f"{where}: {name} {now} ms > {then} ms")
+            for key in ("peak_rss_mb", "webhook_peak_rss_mb"):
+                if r.get(key) and base.get(key) and r[key] > base[key] * (1 + tolerance):
+                    problems.append(f"{where}: {key} {r[key]} > {base[key]}")
+            if r.get("llm_calls_per_email", 0) > base.get("llm_calls_per_email", float("inf")):
+                problems.append(f"{where}: {r['llm_calls_per_email']} LLM calls per email "
+                                f"(baseline {base['llm_calls_per_email']})")
+            if r["errors"] + r["timeouts"] > base["errors"] + base["timeouts"]:
+                problems.append(f"{where}: {r['errors'] + r['timeouts']} failures (baseline "
+                                f"{base['errors'] + base['timeouts']})")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["graph", "webhook", "both"], default="both")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--emails", type=int, default=0, help="emails per level (default: max(corpus, 4 x level))")
+    parser.add_argument("--workers", type=int, default=16, help="webhook QUEUE_WORKERS")
+    parser.add_argument("--scale", type=float, default=0.1, help="multiply every OpenAI latency sample")
+    parser.add_argument("--openai-latency", nargs="*", default=[], metavar="ENDPOINT=SPEC",
+                        help=f"endpoints: {', '.join(DEFAULT_LATENCIES)}")
+    parser.add_argument("--graph-latency", default="normal:60:15", help="Graph stand-in latency spec")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before an email counts as lost")
+    parser.add_argument("--baseline", help="compare with a saved run; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", help="write this run's results as JSON")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+    args.modes = ["graph", "webhook"] if args.mode == "both" else [args.mode]
+
+    bench = Bench(args)
+    print(f"Scratch directory: {bench.scratch}")
+    print("OpenAI stand-in:", ", ".join(f"{k} {v}" for k, v in bench.openai.latencies.items()))
+    print("Graph stand-in:", bench.graph.latency)
+    try:
+        run = asyncio.run(bench.run())
+    finally:
+        bench.stop()
+
+    run["config"] = {"levels": args.levels, "emails": args.emails, "scale": args.scale, "workers": args.workers,
+                     "openai_latency": args.openai_latency, "graph_latency": args.graph_latency, "seed": args.seed}
+    report(run)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != run["config"]:
+            print("\n⚠️ Baseline was recorded with different settings:", baseline.get("config"))
+        problems = compare(run, baseline, args.tolerance)
+        if problems:
+            print(f"\n❌ {len(problems)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in problems:
+                print("  -", line)
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
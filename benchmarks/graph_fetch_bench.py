@@ -0,0 +1,92 @@
+"""
+Round-trip and latency comparison for fetching an email from Graph.
+
+Runs the old fetch (message GET, attachment-list GET, then one download per
+attachment, one after another) and mail_monitoring/graph.fetch_message
+against the local Graph stand-in with a fixed per-request latency.
+
+Usage:
+    python benchmarks/graph_fetch_bench.py
+    python benchmarks/graph_fetch_bench.py --latency-ms 120 --runs 10
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from graph_standin import GraphStandIn  # noqa: E402
+
+
+def legacy_fetch(base: str, message_id: str, token: str):
+    """The pre-graph.py fetch_email access pattern."""
+    from clients import get_http, request_timeout
+    from convert_document import save_attachment_stream
+
+    headers = {"Authorization": f"Bearer {token}"}
+    data = get_http().get(f"{base}/me/messages/{message_id}", headers=headers, timeout=request_timeout()).json()
+    re.sub(r"<.*?>", "", data.get("body", {}).get("content", ""))
+    if data.get("hasAttachments"):
+        meta = get_http().get(f"{base}/me/messages/{message_id}/attachments",
+                              headers=headers, timeout=request_timeout()).json()
+        for att in meta.get("value", []):
+            resp = get_http().get(f"{base}/me/messages/{message_id}/attachments/{att['id']}/$value",
+                                  headers=headers, timeout=request_timeout())
+            save_attachment_stream(att["name"], [resp.content])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    standin = GraphStandIn(latency_ms=args.latency_ms).start()
+    small = b"%PDF-1.7\n" + b"0" * 150_000
+    large = b"%PDF-1.7\n" + b"0" * 3_000_000
+    cases = {
+        "no attachments": [],
+        "1 PDF": [("EOI.pdf", small)],
+        "4 small PDFs": [(f"Annexure_{i}.pdf", small) for i in range(4)],
+        "1 large + 3 small": [("Contract.pdf", large)] + [(f"Annexure_{i}.pdf", small) for i in range(3)],
+    }
+    for name, attachments in cases.items():
+        standin.add_message(name, name, "Body text", attachments)
+
+    # Keep the spool out of the repository
+    scratch = tempfile.mkdtemp()
+    os.makedirs(os.path.join(scratch, "mail_monitoring"))
+    os.chdir(os.path.join(scratch, "mail_monitoring"))
+    os.environ["GRAPH_BASE_URL"] = standin.base_url
+    os.environ["TOKEN_URL"] = standin.base_url.removesuffix("/v1.0") + "/oauth2/v2.0/token"
+    sys.path.append(ROOT)   # common/, shared by both services
+    sys.path.insert(0, os.path.join(ROOT, "mail_monitoring"))
+    from graph import fetch_message
+    from token_manager import TokenManager
+
+    tokens = TokenManager("client", "secret", "http://localhost/callback")
+    tokens.get_token()
+
+    print(f"Graph stand-in latency {args.latency_ms:g} ms/request, {args.runs} runs per case\n")
+    print(f"{'case':<20} {'old trips':>9} {'old ms':>8} {'new trips':>9} {'new ms':>8} {'speedup':>8}")
+    for name in cases:
+        results = []
+        for fetch in (lambda: legacy_fetch(standin.base_url, name, "token"),
+                      lambda: fetch_message(name, tokens)):
+            standin.reset_count()
+            start = time.perf_counter()
+            for _ in range(args.runs):
+                fetch()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.runs
+            results.append((standin.request_count / args.runs, elapsed_ms))
+        (old_trips, old_ms), (new_trips, new_ms) = results
+        print(f"{name:<20} {old_trips:>9g} {old_ms:>8.0f} {new_trips:>9g} {new_ms:>8.0f} {old_ms / new_ms:>7.1f}x")
+
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Local stand-in for the slice of Microsoft Graph the mail monitor uses.
+
+Serves messages (with $select/$expand and the Prefer text-body header),
+attachment metadata, raw attachment $value downloads, JSON $batch, the inbox
+delta query, subscriptions and the OAuth token endpoint, with an injectable
+per-request latency (fixed ms or a distribution, see latency.py) so round-trip
+savings show up in timings.
+Point the mail monitor at it with GRAPH_BASE_URL=http://127.0.0.1:<port>/v1.0
+and TOKEN_URL=http://127.0.0.1:<port>/oauth2/v2.0/token.
+
+Usage:
+    python benchmarks/graph_standin.py --port 8900 --latency-ms 80
+    python benchmarks/graph_standin.py --latency lognormal:80:0.3
+"""
+import re
+import json
+import time
+import calendar
+import base64
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from latency import Latency
+
+PREFIX = "/v1.0"
+TOKEN_PATH = "/oauth2/v2.0/token"
+
+
+class GraphStandIn:
+    """In-memory mailbox behind a threaded HTTP server."""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, latency=None):
+        """`latency` (a spec string or Latency) overrides the fixed `latency_ms`."""
+        self.latency = Latency.parse(latency if latency is not None else latency_ms)
+        self.messages = {}
+        self.seq = 0                  # change counter behind delta tokens
+        self.min_delta_token = 0      # older delta tokens answer 410 Gone
+        self.sent = []                # sendMail payloads, in delivery order
+        self.throttle = 0             # the next N sendMail calls answer 429
+        self.retry_after = 1
+        self.valid_tokens = None      # None accepts any bearer token; a set enforces 401s
+        self.token_requests = 0
+        self.token_lifetime = 3600
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{PREFIX}"
+
+    def add_message(self, message_id: str, subject: str, body: str, attachments=(),
+                    sender: str = "vendor@example.com", recipient: str = "support@onecorpaustralia.com.au",
+                    received: float | None = None):
+        """attachments: iterable of (name, bytes); received: epoch seconds (default now)."""
+        with self.lock:
+            self.seq += 1
+            seq = self.seq
+        self.messages[message_id] = {
+            "id": message_id,
+            "seq": seq,
+            "received": received or time.time(),
+            "subject": subject,
+            "body": body,
+            "from": sender,
+            "to": recipient,
+            "receivedDateTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(received or time.time())),
+            "attachments": [
+                {"id": f"att-{i}", "name": name, "content": content}
+                for i, (name, content) in enumerate(attachments)
+            ],
+        }
+
+    def touch_message(self, message_id: str):
+        """Simulate a change to an existing message (read flag, category) so delta reports it again."""
+        with self.lock:
+            self.seq += 1
+            self.messages[message_id]["seq"] = self.seq
+
+    def throttle_sends(self, count: int, retry_after: int = 1):
+        """Answer the next `count` sendMail calls with 429 and a Retry-After header."""
+        self.throttle, self.retry_after = count, retry_after
+
+    def require_auth(self, lifetime: int = 3600):
+        """Only accept access tokens issued by the token endpoint, valid for `lifetime` seconds."""
+        self.valid_tokens, self.token_lifetime = set(), lifetime
+
+    def revoke_tokens(self):
+        """Reject every access token issued so far with 401."""
+        with self.lock:
+            self.valid_tokens = set()
+
+    def _issue_token(self):
+        with self.lock:
+            self.token_requests += 1
+            token = f"access-{self.token_requests}"
+            if self.valid_tokens is not None:
+                self.valid_tokens.add(token)
+        payload = {"access_token": token, "refresh_token": f"refresh-{self.token_requests}",
+                   "expires_in": self.token_lifetime, "token_type": "Bearer"}
+        return 200, "application/json", json.dumps(payload).encode()
+
+    def expire_delta_tokens(self):
+        """Make every delta token issued so far answer 410 Gone."""
+        self.min_delta_token = self.seq + 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_count(self):
+        with self.lock:
+            self.request_count = 0
+
+    # --------------------------------------------------
+    # Graph resources
+    # --------------------------------------------------
+    def _attachment_meta(self, att: dict, with_content: bool) -> dict:
+        meta = {
+            "@odata.type": "#microsoft.graph.fileAttachment",
+            "id": att["id"],
+            "name": att["name"],
+            "size": len(att["content"]),
+            "contentType": "application/pdf",
+        }
+        if with_content:
+            meta["contentBytes"] = base64.b64encode(att["content"]).decode()
+        return meta
+
+    def _message_json(self, msg: dict, query: dict, prefer: str) -> dict:
+        text = 'outlook.body-content-type="text"' in prefer
+        data = {
+            "id": msg["id"],
+            "subject": msg["subject"],
+            "body": {
+                "contentType": "text" if text else "html",
+                "content": msg["body"] if text else "<html><body><p>" + msg["body"].replace("\n", "<br>") + "</p></body></html>",
+            },
+            "from": {"emailAddress": {"address": msg["from"]}},
+            "toRecipients": [{"emailAddress": {"address": msg["to"]}}],
+            "receivedDateTime": msg["receivedDateTime"],
+            "hasAttachments": bool(msg["attachments"]),
+        }
+        expand = query.get("$expand", [""])[0]
+        if expand.startswith("attachments"):
+            data["attachments"] = [
+                self._attachment_meta(a, with_content="$select=" not in expand or "contentBytes" in expand)
+                for a in msg["attachments"]
+            ]
+        return data
+
+    def _delta(self, query: dict, prefer: str):
+        """Delta pages over the change counter: skiptokens page, the final page carries a deltatoken."""
+        page_size = int(re.search(r"odata.maxpagesize=(\d+)", prefer).group(1)) if "maxpagesize" in prefer else 10
+        if "$skiptoken" in query:
+            base, offset, since = query["$skiptoken"][0].split("_")
+            base, offset, since = int(base), int(offset), float(since)
+        else:
+            base, offset, since = int(query.get("$deltatoken", ["0"])[0]), 0, 0.0
+            m = re.search(r"receivedDateTime ge (\S+)", query.get("$filter", [""])[0])
+            if m:
+                since = calendar.timegm(time.strptime(m.group(1), "%Y-%m-%dT%H:%M:%SZ"))
+            if "$deltatoken" in query and base < self.min_delta_token:
+                return 410, "application/json", b'{"error": {"code": "SyncStateNotFound"}}'
+
+        changed = sorted((m for m in self.messages.values() if m["seq"] > base and m["received"] >= since),
+                         key=lambda m: m["seq"])
+        page = changed[offset:offset + page_size]
+        data = {"value": [{"id": m["id"], "receivedDateTime": m["receivedDateTime"]} for m in page]}
+        link = f"{self.base_url}/me/mailFolders('inbox')/messages/delta"
+        if offset + page_size < len(changed):
+            data["@odata.nextLink"] = f"{link}?$skiptoken={base}_{offset + page_size}_{since}"
+        else:
+            data["@odata.deltaLink"] = f"{link}?$deltatoken={max([base] + [m['seq'] for m in changed])}"
+        return 200, "application/json", json.dumps(data).encode()
+
+    def route(self, method: str, path: str, query: dict, headers: dict, body: bytes):
+        """Returns (status, content_type, payload bytes)."""
+        if not path.startswith(PREFIX):
+            return 404, "application/json", b'{"error": "not found"}'
+        path = path[len(PREFIX):]
+
+        if method == "POST" and path == "/$batch":
+            responses = []
+            for sub in json.loads(body)["requests"]:
+                split = urlsplit(sub["url"])
+                status, content_type, payload = self.route(
+                    sub.get("method", "GET"), PREFIX + unquote(split.path), parse_qs(split.query),
+                    sub.get("headers", {}), json.dumps(sub.get("body", "")).encode(),
+                )
+                if content_type == "application/json":
+                    sub_body = json.loads(payload) if payload else None
+                else:
+                    sub_body = base64.b64encode(payload).decode()
+                sub_headers = {"Content-Type": content_type}
+                if status == 429:
+                    sub_headers["Retry-After"] = str(self.retry_after)
+                responses.append({"id": sub["id"], "status": status, "headers": sub_headers, "body": sub_body})
+            return 200, "application/json", json.dumps({"responses": responses}).encode()
+
+        if method == "GET" and path == "/me/mailFolders('inbox')/messages/delta":
+            return self._delta(query, headers.get("Prefer", ""))
+
+        m = re.fullmatch(r"/me/subscriptions/([^/]+)|/subscriptions/([^/]+)", path)
+        if method == "PATCH" and m:
+            return 200, "application/json", json.dumps({"id": m.group(1) or m.group(2),
+                                                        **json.loads(body or b"{}")}).encode()
+
+        m = re.fullmatch(r"/me/messages/([^/]+)(/attachments(?:/([^/]+)(/\$value)?)?)?", path)
+        if method == "GET" and m:
+            msg = self.messages.get(m.group(1))
+            if msg is None:
+                return 404, "application/json", b'{"error": {"code": "ErrorItemNotFound"}}'
+            if m.group(2) is None:
+                return 200, "application/json", json.dumps(
+                    self._message_json(msg, query, headers.get("Prefer", ""))).encode()
+            if m.group(3) is None:
+                with_content = "contentBytes" in query.get("$select", ["contentBytes"])[0]
+                value = [self._attachment_meta(a, with_content) for a in msg["attachments"]]
+                return 200, "application/json", json.dumps({"value": value}).encode()
+            att = next((a for a in msg["attachments"] if a["id"] == m.group(3)), None)
+            if att is None:
+                return 404, "application/json", b'{"error": {"code": "ErrorItemNotFound"}}'
+            if m.group(4):
+                return 200, "application/pdf", att["content"]
+            return 200, "application/json", json.dumps(self._attachment_meta(att, True)).encode()
+
+        if method == "POST" and path == "/me/sendMail":
+            with self.lock:
+                if self.throttle > 0:
+                    self.throttle -= 1
+                    return 429, "application/json", b'{"error": {"code": "ApplicationThrottled"}}'
+                self.sent.append(json.loads(body))
+            return 202, "application/json", b""
+
+        if method == "POST" and path == "/subscriptions":
+            return 201, "application/json", json.dumps({"id": "sub-standin", **json.loads(body or b"{}")}).encode()
+
+        return 404, "application/json", b'{"error": "not found"}'
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method: str):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                with standin.lock:
+                    standin.request_count += 1
+                delay = standin.latency.sample()
+                if delay:
+                    time.sleep(delay)
+
+                split = urlsplit(self.path)
+                token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+                if method == "POST" and split.path == TOKEN_PATH:
+                    status, content_type, payload = standin._issue_token()
+                elif standin.valid_tokens is not None and token not in standin.valid_tokens:
+                    status, content_type, payload = 401, "application/json", \
+                        b'{"error": {"code": "InvalidAuthenticationToken"}}'
+                else:
+                    status, content_type, payload = standin.route(
+                        method, unquote(split.path), parse_qs(split.query), dict(self.headers), body)
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", str(standin.retry_after))
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_PATCH(self):
+                self._serve("PATCH")
+
+        return Handler
+
+
+def demo_mailbox(standin: GraphStandIn):
+    """A few realistic messages: plain, one EOI PDF, a contract with several attachments."""
+    pdf = b"%PDF-1.7\n" + b"0" * 200_000
+    standin.add_message("msg-plain", "Question about settlement", "Hi team,\nWhen is settlement due?")
+    standin.add_message("msg-eoi", "EOI - Lot 95 Fake Rise", "Please find the EOI attached.",
+                        [("EOI_John_Smith.pdf", pdf)])
+    standin.add_message("msg-contract", "Contract of Sale - Lot 95 Fake Rise", "Contract and annexures attached.",
+                        [("Contract_of_Sale.pdf", pdf * 10), ("Annexure_A.pdf", pdf),
+                         ("Annexure_B.pdf", pdf), ("Plan.pdf", pdf)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--latency", help="distribution spec, overrides --latency-ms")
+    args = parser.parse_args()
+
+    standin = GraphStandIn(args.port, args.latency_ms, args.latency)
+    demo_mailbox(standin)
+    print(f"Graph stand-in at {standin.base_url} ({standin.latency} per request)")
+    print("Messages:", ", ".join(standin.messages))
+    standin.server.serve_forever()
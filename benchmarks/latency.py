@@ -0,0 +1,69 @@
+"""
+Latency distributions for the local stand-ins.
+
+A spec is a string:
+    "80"                  fixed 80 ms
+    "fixed:80"            fixed 80 ms
+    "uniform:40:120"      uniform between 40 and 120 ms
+    "normal:300:50"       normal, mean 300 ms, std dev 50 ms (never below 0)
+    "lognormal:1500:0.4"  lognormal with median 1500 ms and sigma 0.4 (long right tail)
+"""
+import math
+import random
+
+
+class Latency:
+    """Samples a delay in seconds from a parsed spec. `scale` multiplies every sample."""
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, scale: float = 1.0,
+                 rng: random.Random | None = None):
+        self.kind, self.a, self.b, self.scale = kind, a, b, scale
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def parse(cls, spec, scale: float = 1.0, rng: random.Random | None = None) -> "Latency":
+        if isinstance(spec, Latency):
+            return spec
+        if spec is None or str(spec).strip() in ("", "none", "0"):
+            return cls("fixed", 0.0, scale=scale, rng=rng)
+        parts = str(spec).split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]), scale=scale, rng=rng)
+        kind, args = parts[0].lower(), [float(p) for p in parts[1:]]
+        if kind == "fixed" and len(args) == 1:
+            return cls(kind, args[0], scale=scale, rng=rng)
+        if kind in ("uniform", "normal", "lognormal") and len(args) == 2:
+            return cls(kind, args[0], args[1], scale=scale, rng=rng)
+        raise ValueError(f"bad latency spec {spec!r}")
+
+    def sample(self) -> float:
+        """One delay, in seconds."""
+        if self.kind == "fixed":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = self.rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            ms = max(0.0, self.rng.normalvariate(self.a, self.b))
+        else:
+            ms = self.a * math.exp(self.rng.normalvariate(0.0, self.b))
+        return ms * self.scale / 1000
+
+    def __str__(self) -> str:
+        if self.kind == "fixed":
+            return f"{self.a:g}ms"
+        return f"{self.kind}:{self.a:g}:{self.b:g}" + (f" x{self.scale:g}" if self.scale != 1 else "")
+
+
+def parse_latencies(specs: list, defaults: dict, scale: float = 1.0, seed: int | None = None) -> dict:
+    """
+    Per-endpoint latencies from "name=spec" strings laid over `defaults`.
+    Unknown names are rejected so a typo does not silently fall back to the default.
+    """
+    rng = random.Random(seed)
+    merged = dict(defaults)
+    for item in specs or []:
+        name, _, spec = item.partition("=")
+        if name not in defaults:
+            raise ValueError(f"unknown endpoint {name!r}, expected one of {', '.join(defaults)}")
+        merged[name] = spec
+    return {name: Latency.parse(spec, scale, rng) for name, spec in merged.items()}
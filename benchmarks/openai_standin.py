@@ -0,0 +1,452 @@
+"""
+Local stand-in for the slice of the OpenAI API the agents use.
+
+Serves files (upload, retrieve, delete), responses.parse (structured output
+through a JSON schema), chat.completions (plain text, response_format
+json_schema and tool calls), and vector stores (file_batches, batch files,
+search). Each endpoint group sleeps for a sample from its own latency
+distribution (see latency.py), so the benchmarks see realistic, long-tailed
+model and indexing times without an account.
+
+Structured answers come from per-schema responders. The defaults know this
+repo's schemas and fill anything else from the JSON schema itself.
+Point the agents at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage:
+    python benchmarks/openai_standin.py --port 8901
+    python benchmarks/openai_standin.py --latency responses=lognormal:2000:0.5 --scale 0.1
+"""
+import re
+import json
+import time
+import uuid
+import argparse
+import threading
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from latency import parse_latencies
+
+PREFIX = "/v1"
+
+# Rough production timings; scale them down with --scale for quick runs
+DEFAULT_LATENCIES = {
+    "files": "normal:350:80",
+    "responses": "lognormal:2500:0.45",
+    "chat": "lognormal:900:0.35",
+    "vector_search": "normal:300:60",
+    "vector_batches": "normal:150:30",
+    "vector_index": "lognormal:4000:0.5",   # time until a file batch finishes indexing
+}
+
+
+# --------------------------------------------------
+# Answers
+# --------------------------------------------------
+def fill_schema(schema: dict, defs: dict | None = None):
+    """A minimal value that validates against `schema`."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return fill_schema(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        options = [s for s in schema["anyOf"] if s.get("type") != "null"]
+        return fill_schema(options[0], defs) if options else None
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {name: fill_schema(sub, defs) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fill_schema(schema.get("items", {}), defs)]
+    return {"string": "", "integer": 0, "number": 0, "boolean": True, "null": None}.get(kind, "")
+
+
+def _appointment(prompt: str, files: list) -> dict:
+    appointment = datetime.now() + timedelta(days=3)
+    reminder = appointment + timedelta(days=2)
+    return {"appointment_datetime": appointment.strftime("%d-%m-%Y 11:30"),
+            "reminder_datetime": reminder.strftime("%d-%m-%Y 09:00")}
+
+
+def _route(prompt: str, files: list) -> dict:
+    text = prompt.lower()
+    for route, pattern in (("SIGNING_STATUS", r"docusign|completed signing|all parties have signed"),
+                           ("EOI_EXTRACTOR", r"\beoi\b|expression of interest"),
+                           ("CONTRACT_CHECKER", r"contract of sale"),
+                           ("SIGNING_DATE", r"appointment|signing date")):
+        if re.search(pattern, text.split("email:", 1)[-1]):
+            return {"route": route}
+    return {"route": "OTHER"}
+
+
+def _understanding(prompt: str, files: list) -> dict:
+    """EmailUnderstanding: the route plus address, lot, purchasers and explicit dd/mm/yyyy dates."""
+    email = prompt[prompt.lower().find("email:"):]
+    address = re.search(r"(?<!Lot )(?<!\d)((?:\d+\s+)?[A-Z][A-Za-z ]+?,?\s+(?:VIC|NSW|QLD|SA|WA|TAS|ACT|NT),?\s+\d{4})\b", email)
+    lot = re.search(r"\bLot\s+(\d+)", email)
+    names = re.search(r"\bfor ([A-Z][\w-]+(?: [A-Z][\w-]+)*(?: & [A-Z][\w-]+(?: [A-Z][\w-]+)*)*)", email)
+    dates = []
+    for d, m, y, h, mi, ampm in re.findall(
+            r"\b(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+at\s+(\d{1,2})(?::(\d{2}))?\s*([ap]m))?", email, re.IGNORECASE):
+        hour = (int(h) % 12 + (12 if ampm.lower() == "pm" else 0)) if h else 9
+        dates.append(f"{int(d):02d}-{int(m):02d}-{y} {hour:02d}:{int(mi or 0):02d}")
+    return {
+        **_route(prompt, files),
+        "Property_Address": address.group(1).strip() if address else None,
+        "Lot_Number": lot.group(1) if lot else None,
+        "Purchaser_Names": names.group(1).split(" & ") if names else [],
+        "Dates": dates,
+    }
+
+
+def _chat_text(messages: list) -> str:
+    """Plain chat answers: the SLA filename pick, otherwise the search rewrite."""
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+    user = (messages[-1].get("content") or "") if messages else ""
+    if "delete_filename" in system:
+        names = re.findall(r'"([^"]+\.json)"', user)
+        words = set(re.findall(r"\w+", user.split("Filenames are as follows", 1)[0].lower()))
+        best = max(names, key=lambda n: len(words & set(re.findall(r"\w+", n.lower()))), default=None)
+        return json.dumps({"delete_filename": best})
+    return user
+
+
+def _contract_fields(prompt: str, files: list) -> dict:
+    """ContractExtractedModel from "Label: value" lines of contract text (null when only a file was sent)."""
+    def label(pattern):
+        m = re.search(rf"^\s*(?:{pattern})\s*:\s*(.+?)\s*$", prompt, re.IGNORECASE | re.MULTILINE)
+        return m.group(1) if m else None
+
+    names = re.split(r"\s*&\s*|\s+and\s+", label("Purchasers") or "")
+    emails = re.findall(r"^\s*Email:\s*(\S+)", prompt, re.MULTILINE)
+    mobiles = re.findall(r"^\s*Mobile:\s*(.+?)\s*$", prompt, re.MULTILINE)
+    purchasers = [{"First_Name": n.split()[0], "Last_Name": " ".join(n.split()[1:]) or None,
+                   "Purchaser_Email": emails[i] if i < len(emails) else None,
+                   "Purchaser_Mobile": mobiles[i] if i < len(mobiles) else None}
+                  for i, n in enumerate(x for x in names if x.strip())]
+    solicitor = prompt.split("Solicitor for Purchaser", 1)[-1] if "Solicitor for Purchaser" in prompt else ""
+    finance = None
+    if re.search(r"not subject to finance", prompt, re.IGNORECASE):
+        finance = "Not Subject to Finance"
+    if re.search(r"is subject to finance|securing finance approval", prompt, re.IGNORECASE):
+        finance = "Subject to Finance"
+    return {
+        "Purchaser": purchasers,
+        "Residential_Address": label("Residential Address"),
+        "Lot_Number": label("Lot Number"),
+        "Property_Address": label("Address"),
+        "Project_Name": label("Estate|Project"),
+        "Total_Price": label("Total (?:Purchase )?Price"),
+        "Land_Price": label("Land Price"),
+        "Build_Price": label("Build Price"),
+        "Finance_Terms": finance,
+        "Solicitor_Name": (re.search(r"Solicitor:\s*(.+)", solicitor) or [None, None])[1],
+        "Solicitor_Email": (re.search(r"Email:\s*(\S+)", solicitor) or [None, None])[1],
+        "Finance_Provider": None,
+    }
+
+
+def _contract_pages(prompt: str, files: list) -> dict:
+    """ContractPagesModel: _contract_fields on each "=== Page N ===" section, ignoring the previous-page context."""
+    sections = re.split(r"^=== Page (\d+) ===$", prompt, flags=re.MULTILINE)
+    pages = []
+    for number, text in zip(sections[1::2], sections[2::2]):
+        text = re.split(rf"^\[Page {number}\]$", text, maxsplit=1, flags=re.MULTILINE)[-1]
+        pages.append({"Page": int(number), "Fields": _contract_fields(text, files)})
+    return {"Pages": pages}
+
+
+DEFAULT_RESPONDERS = {
+    "ContractExtractedModel": _contract_fields,
+    "ContractPagesModel": _contract_pages,
+    "SigningAppointment": _appointment,
+    "RouterOutput": _route,
+    "EmailUnderstanding": _understanding,
+}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class OpenAIStandIn:
+    """In-memory OpenAI account behind a threaded HTTP server."""
+
+    def __init__(self, port: int = 0, latencies: dict | None = None, responders: dict | None = None):
+        self.latencies = latencies or parse_latencies([], DEFAULT_LATENCIES)
+        self.responders = {**DEFAULT_RESPONDERS, **(responders or {})}
+        self.files = {}              # file id → {"filename", "bytes", "purpose"}
+        self.vector_stores = {}      # store id → {file id → {"attributes", "text", "ready_at"}}
+        self.batches = {}            # batch id → {"store", "file_ids", "ready_at", "created_at"}
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{PREFIX}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name: str, tokens: int = 0):
+        with self.lock:
+            entry = self.counters.setdefault(name, {"requests": 0, "prompt_tokens": 0})
+            entry["requests"] += 1
+            entry["prompt_tokens"] += tokens
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {name: dict(entry) for name, entry in self.counters.items()}
+
+    def _sleep(self, group: str):
+        delay = self.latencies[group].sample()
+        if delay:
+            time.sleep(delay)
+
+    # --------------------------------------------------
+    # Endpoints
+    # --------------------------------------------------
+    def _upload(self, content_type: str, body: bytes):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        fields, upload = {}, None
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                upload = (part.get_filename(), part.get_payload(decode=True))
+            else:
+                fields[name] = part.get_content().strip()
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            self.files[file_id] = {"filename": upload[0], "bytes": upload[1], "purpose": fields.get("purpose")}
+        self._sleep("files")
+        self._count("files.create")
+        return 200, self._file_json(file_id)
+
+    def _file_json(self, file_id: str) -> dict:
+        record = self.files[file_id]
+        return {"id": file_id, "object": "file", "bytes": len(record["bytes"]), "created_at": int(time.time()),
+                "filename": record["filename"], "purpose": record["purpose"], "status": "processed"}
+
+    def _structured(self, name: str, schema: dict, prompt: str, files: list) -> dict:
+        responder = self.responders.get(name)
+        return responder(prompt, files) if responder else fill_schema(schema)
+
+    def _responses(self, request: dict):
+        prompt, files = "", []
+        for item in request.get("input") or []:
+            content = item.get("content")
+            if isinstance(content, str):
+                prompt += content
+                continue
+            for part in content or []:
+                if part.get("type") == "input_text":
+                    prompt += part["text"]
+                elif part.get("type") == "input_file":
+                    files.append(self.files.get(part.get("file_id"), {}))
+        tokens = _tokens(prompt) + sum(len(f.get("bytes", b"")) // 40 for f in files)
+
+        fmt = (request.get("text") or {}).get("format") or {}
+        if fmt.get("type") == "json_schema":
+            text = json.dumps(self._structured(fmt.get("name"), fmt.get("schema", {}), prompt, files))
+        else:
+            text = prompt[:200]
+        self._sleep("responses")
+        self._count("responses", tokens)
+
+        response_id = f"resp_{uuid.uuid4().hex[:24]}"
+        return 200, {
+            "id": response_id, "object": "response", "created_at": int(time.time()),
+            "model": request.get("model", "gpt-4.1"), "status": "completed",
+            "output": [{"id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+                        "status": "completed",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+            "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+            "usage": {"input_tokens": tokens, "output_tokens": _tokens(text), "total_tokens": tokens + _tokens(text),
+                      "input_tokens_details": {"cached_tokens": 0},
+                      "output_tokens_details": {"reasoning_tokens": 0}},
+        }
+
+    def _chat(self, request: dict):
+        messages = request.get("messages") or []
+        prompt = "\n".join(m.get("content") if isinstance(m.get("content"), str) else json.dumps(m.get("content"))
+                           for m in messages)
+        message = {"role": "assistant", "content": None, "refusal": None}
+        finish = "stop"
+
+        fmt = request.get("response_format") or {}
+        tools = request.get("tools") or []
+        if fmt.get("type") == "json_schema":
+            spec = fmt["json_schema"]
+            message["content"] = json.dumps(self._structured(spec.get("name"), spec.get("schema", {}), prompt, []))
+        elif tools:
+            fn = tools[0]["function"]
+            arguments = self._structured(fn["name"], fn.get("parameters", {}), prompt, [])
+            message["tool_calls"] = [{"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                                      "function": {"name": fn["name"], "arguments": json.dumps(arguments)}}]
+            finish = "tool_calls"
+        else:
+            message["content"] = _chat_text(messages)
+
+        self._sleep("chat")
+        self._count("chat.completions", _tokens(prompt))
+        completion = _tokens(message["content"] or "")
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion", "created": int(time.time()),
+            "model": request.get("model", "gpt-4.1-mini"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish, "logprobs": None}],
+            "usage": {"prompt_tokens": _tokens(prompt), "completion_tokens": completion,
+                      "total_tokens": _tokens(prompt) + completion},
+        }
+
+    def _batch_json(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        done = time.time() >= batch["ready_at"]
+        count = len(batch["file_ids"])
+        return {
+            "id": batch_id, "object": "vector_store.files_batch", "created_at": int(batch["created_at"]),
+            "vector_store_id": batch["store"], "status": "completed" if done else "in_progress",
+            "file_counts": {"in_progress": 0 if done else count, "completed": count if done else 0,
+                            "failed": 0, "cancelled": 0, "total": count},
+        }
+
+    def _create_batch(self, store: str, request: dict):
+        entries = request.get("files") or [{"file_id": f, "attributes": request.get("attributes")}
+                                           for f in request.get("file_ids") or []]
+        ready_at = time.time() + self.latencies["vector_index"].sample()
+        batch_id = f"vsfb_{uuid.uuid4().hex[:24]}"
+        with self.lock:
+            files = self.vector_stores.setdefault(store, {})
+            for entry in entries:
+                raw = self.files.get(entry["file_id"], {}).get("bytes", b"")
+                files[entry["file_id"]] = {"attributes": entry.get("attributes") or {},
+                                           "text": raw.decode("utf-8", "replace"), "ready_at": ready_at}
+            self.batches[batch_id] = {"store": store, "file_ids": [e["file_id"] for e in entries],
+                                      "ready_at": ready_at, "created_at": time.time()}
+        self._sleep("vector_batches")
+        self._count("vector_stores.file_batches")
+        return 200, self._batch_json(batch_id)
+
+    def _search(self, store: str, request: dict):
+        query = request.get("query") or ""
+        if isinstance(query, list):
+            query = " ".join(query)
+        now, wanted = time.time(), _words(query)
+        with self.lock:
+            indexed = [(fid, f) for fid, f in self.vector_stores.get(store, {}).items() if f["ready_at"] <= now]
+        scored = sorted(((len(wanted & _words(f["text"])) / (len(wanted) or 1), fid, f) for fid, f in indexed),
+                        key=lambda item: item[0], reverse=True)
+        data = [{"file_id": fid, "filename": self.files.get(fid, {}).get("filename", ""), "score": round(score, 4),
+                 "attributes": f["attributes"], "content": [{"type": "text", "text": f["text"]}]}
+                for score, fid, f in scored[:int(request.get("max_num_results") or 10)] if score > 0]
+        self._sleep("vector_search")
+        self._count("vector_stores.search", _tokens(query))
+        return 200, {"object": "vector_store.search_results.page", "search_query": [query],
+                     "data": data, "has_more": False, "next_page": None}
+
+    def route(self, method: str, path: str, query: dict, headers: dict, body: bytes):
+        """Returns (status, JSON-able payload)."""
+        if not path.startswith(PREFIX):
+            return 404, {"error": {"message": "not found"}}
+        path = path[len(PREFIX):]
+
+        if method == "POST" and path == "/files":
+            return self._upload(headers.get("Content-Type", ""), body)
+        m = re.fullmatch(r"/files/([^/]+)", path)
+        if m and m.group(1) in self.files:
+            if method == "DELETE":
+                with self.lock:
+                    self.files.pop(m.group(1), None)
+                self._count("files.delete")
+                return 200, {"id": m.group(1), "object": "file", "deleted": True}
+            return 200, self._file_json(m.group(1))
+        if m:
+            return 404, {"error": {"message": f"No such File object: {m.group(1)}", "type": "invalid_request_error"}}
+
+        if method == "POST" and path == "/responses":
+            return self._responses(json.loads(body))
+        if method == "POST" and path == "/chat/completions":
+            return self._chat(json.loads(body))
+
+        m = re.fullmatch(r"/vector_stores/([^/]+)/file_batches(?:/([^/]+)(/files)?)?", path)
+        if m and method == "POST" and m.group(2) is None:
+            return self._create_batch(m.group(1), json.loads(body or b"{}"))
+        if m and m.group(2) in self.batches:
+            if m.group(3):
+                # Indexing never fails here
+                return 200, {"object": "list", "data": [], "first_id": None, "last_id": None, "has_more": False}
+            return 200, self._batch_json(m.group(2))
+        m = re.fullmatch(r"/vector_stores/([^/]+)/search", path)
+        if m and method == "POST":
+            return self._search(m.group(1), json.loads(body or b"{}"))
+
+        return 404, {"error": {"message": f"{method} {path} not supported by the stand-in"}}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method: str):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                split = urlsplit(self.path)
+                try:
+                    status, payload = standin.route(method, split.path, parse_qs(split.query),
+                                                    dict(self.headers), body)
+                except Exception as e:
+                    status, payload = 500, {"error": {"message": repr(e)}}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", nargs="*", default=[], metavar="ENDPOINT=SPEC",
+                        help=f"per-endpoint latency, endpoints: {', '.join(DEFAULT_LATENCIES)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every latency sample")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    standin = OpenAIStandIn(args.port, parse_latencies(args.latency, DEFAULT_LATENCIES, args.scale, args.seed))
+    print(f"OpenAI stand-in at {standin.base_url}")
+    for name, latency in standin.latencies.items():
+        print(f"  {name:<15} {latency}")
+    standin.server.serve_forever()
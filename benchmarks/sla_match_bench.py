@@ -0,0 +1,97 @@
+"""
+Benchmark for the SLA agent's local address matcher.
+
+Fills a throwaway deadline store with N synthetic open deadlines, then times
+parsing + matching DocuSign emails against it the way sla_agent does: a
+primary-key lookup of the normalised address, and a fuzzy scan of every open
+deadline only on a miss (exact, abbreviated and unknown addresses) and compares the old prompt size — every deadline filename sent
+to the LLM — with the shortlist the LLM now sees on a miss.
+
+Usage:
+    python benchmarks/sla_match_bench.py
+    python benchmarks/sla_match_bench.py --deadlines 10000 --queries 500
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agents"))
+
+STREETS = ["Fake Rise", "Pineview Crescent", "Rivergum Road", "Wattle Street", "Banksia Drive",
+           "Ironbark Avenue", "Acacia Court", "Bluegum Parade", "Saltbush Lane", "Kurrajong Place"]
+STATES = [("VIC", 3000), ("NSW", 2000), ("QLD", 4000)]
+SHORT = {"Crescent": "Cres", "Road": "Rd", "Street": "St", "Drive": "Dr", "Avenue": "Ave",
+         "Court": "Ct", "Parade": "Pde", "Lane": "Ln", "Place": "Pl"}
+
+
+def synthetic_addresses(n: int, rng: random.Random) -> list:
+    addresses = set()
+    while len(addresses) < n:
+        state, base = rng.choice(STATES)
+        addresses.add(f"{rng.randint(1, 400)} {rng.choice(STREETS)} {state} {base + rng.randint(0, 999)}")
+    return sorted(addresses)
+
+
+def docusign_email(address: str, lot: int, abbreviate: bool) -> str:
+    if abbreviate:
+        for word, short in SHORT.items():
+            address = address.replace(f" {word} ", f" {short} ")
+    return ("Hello,\nAll parties have completed signing.\n"
+            f"Document: Contract of Sale – Lot {lot} {address}\nThanks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--deadlines", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["DEADLINES_DB"] = os.path.join(tmp, "deadlines.db")
+    os.chdir(tmp)   # keep the legacy deadlines/ migrator away from real data
+
+    from deadline_store import get_deadline, upsert_deadline, list_address_keys
+    from docusign_parser import extract_property, match_address, LLM_CANDIDATE_LIMIT
+
+    rng = random.Random(7)
+    addresses = synthetic_addresses(args.deadlines, rng)
+    for address in addresses:
+        upsert_deadline({"Property_Address": address, "appointment_datetime": "01-01-2026 10:00",
+                         "reminder_datetime": "03-01-2026 09:00", "Purchaser": "Test"})
+
+    cases = {
+        "exact": [docusign_email(a, rng.randint(1, 200), False) for a in rng.sample(addresses, args.queries)],
+        "abbreviated": [docusign_email(a, rng.randint(1, 200), True) for a in rng.sample(addresses, args.queries)],
+        "unknown": [docusign_email(f"999 Nowhere Boulevard TAS {7000 + i}", 1, False) for i in range(args.queries)],
+    }
+
+    print(f"{args.deadlines} open deadlines, {args.queries} emails per case\n")
+    print(f"{'case':<12} {'matched':>8} {'ms/email':>9} {'llm candidates':>15}")
+    for name, emails in cases.items():
+        matched = 0
+        shortlist = 0
+        start = time.perf_counter()
+        for body in emails:
+            core = extract_property(body)
+            if get_deadline(core):
+                matched += 1
+                continue
+            address, ranked = match_address(core, list_address_keys())
+            if address is not None:
+                matched += 1
+            else:
+                shortlist = max(shortlist, min(len(ranked), LLM_CANDIDATE_LIMIT))
+        per_email = (time.perf_counter() - start) * 1000 / len(emails)
+        print(f"{name:<12} {matched:>8} {per_email:>9.2f} {shortlist:>15}")
+
+    # The old agent sent every filename on every email; ~4 characters per token
+    old_prompt = ", ".join(f'"{a}.json"' for a in addresses)
+    print(f"\nOld prompt filename list: {len(old_prompt):,} chars (~{len(old_prompt) // 4:,} tokens) per email")
+    print(f"Now: 0 LLM calls on a local match, at most {LLM_CANDIDATE_LIMIT} filenames otherwise")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+SLA scheduler benchmark at scale.
+
+Fills a scratch deadline store with --reminders open deadlines (--past-due of
+them already overdue, the rest spread over the next 90 days), then runs
+agents/sla_scheduler.py against it with a stub in place of the outbox:
+  - start: time and memory to load every reminder into the heap
+  - catch-up: time until every overdue reminder has been sent
+  - changes: cost per schedule/cancel, in memory and through deadline_store
+    (SQLite write plus notification)
+  - firing: lag between each reminder's time and its alert for --near
+    reminders set to fall due over the next couple of seconds
+
+Usage:
+    python benchmarks/sla_scheduler_bench.py
+    python benchmarks/sla_scheduler_bench.py --reminders 100000 --past-due 1000 --near 500
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT, "agents"))
+sys.path.append(ROOT)   # common/, shared by both services
+SCRATCH = tempfile.mkdtemp(prefix="sla-scheduler-")
+os.environ["DEADLINES_DB"] = os.path.join(SCRATCH, "deadlines.db")
+import deadline_store  # noqa: E402
+from deadline_store import DATETIME_FORMAT, MELBOURNE, delete_deadline, upsert_deadline  # noqa: E402
+from sla_scheduler import SlaScheduler  # noqa: E402
+
+
+def record(index: int, reminder_at: float) -> tuple:
+    address = f"{index} Bench Street, Tarneit VIC 3029"
+    reminder = datetime.fromtimestamp(reminder_at, MELBOURNE).strftime(DATETIME_FORMAT)
+    payload = {"Property_Address": address, "appointment_datetime": reminder, "reminder_datetime": reminder,
+               "Purchaser": [{"First_Name": "Bench", "Last_Name": f"Buyer{index}"}]}
+    return (deadline_store.normalize_address(address), address, reminder, reminder, reminder_at,
+            json.dumps(payload), time.time())
+
+
+def insert(rows: list):
+    """Bulk insert deadline rows in one transaction (upsert_deadline is one connection per row)."""
+    deadline_store._ensure_schema()
+    with deadline_store._connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("INSERT OR REPLACE INTO deadlines VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.execute("COMMIT")
+
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[int(q * (len(samples) - 1))]
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.005)
+    return True
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    sent, lags = [], []
+
+    async def stub_send(recipient: str, subject: str, body: str):
+        sent.append(subject)
+        lags.append(time.time() - scheduled.get(subject.rsplit(" - ", 1)[-1], time.time()))
+
+    scheduled = {}
+    scheduler = SlaScheduler(send=stub_send)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    await scheduler.start()
+    load_seconds = time.perf_counter() - start
+    heap_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    caught_up = await wait_for(lambda: len(sent) >= args.past_due, 120)
+    catch_up_seconds = time.perf_counter() - start
+    sent.clear()
+    lags.clear()
+
+    # In-memory schedule/cancel, as the event loop sees a notification
+    far = time.time() + 200 * 86400
+    keys = [f"bench-change-{i}" for i in range(args.changes)]
+    t = time.perf_counter()
+    for key in keys:
+        scheduler._apply(key, far + rng.random() * 86400)
+    add_us = (time.perf_counter() - t) / len(keys) * 1e6
+    t = time.perf_counter()
+    for key in keys:
+        scheduler._apply(key, None)
+    cancel_us = (time.perf_counter() - t) / len(keys) * 1e6
+
+    # Through the deadline store: SQLite write plus notification
+    writes = min(args.changes, 500)
+    reminder = (datetime.now(MELBOURNE) + timedelta(days=120)).strftime(DATETIME_FORMAT)
+    t = time.perf_counter()
+    for i in range(writes):
+        upsert_deadline({"Property_Address": f"{i} Store Road, Werribee VIC 3030", "appointment_datetime": reminder,
+                         "reminder_datetime": reminder, "Purchaser": []})
+    upsert_ms = (time.perf_counter() - t) / writes * 1000
+    t = time.perf_counter()
+    for i in range(writes):
+        delete_deadline(f"{i} Store Road, Werribee VIC 3030")
+    delete_ms = (time.perf_counter() - t) / writes * 1000
+    await asyncio.sleep(0.05)   # let the notifications reach the heap
+
+    # Near-term reminders, announced the way upsert_deadline does
+    now = time.time()
+    near = []
+    for i in range(args.near):
+        at = now + 0.2 + rng.random() * args.spread
+        row = record(args.reminders + i, at)
+        near.append(row)
+        scheduled[row[1]] = at
+    insert(near)
+    for row in near:
+        deadline_store._notify(row[0], row[4])
+    fired = await wait_for(lambda: len(sent) >= args.near, args.spread + 30)
+    await asyncio.sleep(0.2)   # the last alert's delete runs in a thread
+
+    stats = scheduler.stats()
+    await scheduler.stop()
+    return {
+        "load_seconds": load_seconds, "heap_bytes": heap_bytes, "caught_up": caught_up,
+        "catch_up_seconds": catch_up_seconds, "add_us": add_us, "cancel_us": cancel_us,
+        "upsert_ms": upsert_ms, "delete_ms": delete_ms, "writes": writes,
+        "fired": fired, "lags": list(lags), "stats": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=100_000, help="open deadlines in the store at start")
+    parser.add_argument("--past-due", type=int, default=1000, help="of those, already overdue (missed while down)")
+    parser.add_argument("--changes", type=int, default=10_000, help="schedule + cancel operations to time")
+    parser.add_argument("--near", type=int, default=500, help="reminders due within --spread seconds")
+    parser.add_argument("--spread", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    t = time.perf_counter()
+    insert([record(i, now - rng.random() * 3 * 86400 if i < args.past_due else now + 86400 + rng.random() * 89 * 86400)
+            for i in range(args.reminders)])
+    print(f"Store: {args.reminders} deadlines ({args.past_due} overdue), filled in {time.perf_counter() - t:.1f}s\n")
+
+    r = asyncio.run(run(args))
+    print(f"\nstart           {r['load_seconds'] * 1000:8.1f} ms to load (under tracemalloc), "
+          f"heap + index {r['heap_bytes'] / 2**20:.1f} MiB")
+    print(f"catch-up        {r['catch_up_seconds'] * 1000:8.1f} ms for {args.past_due} overdue reminders"
+          f"{'' if r['caught_up'] else '  (TIMED OUT)'}")
+    print(f"schedule        {r['add_us']:8.2f} µs in memory, {r['upsert_ms']:.2f} ms via upsert_deadline")
+    print(f"cancel          {r['cancel_us']:8.2f} µs in memory, {r['delete_ms']:.2f} ms via delete_deadline")
+    if r["lags"]:
+        lags = [lag * 1000 for lag in r["lags"]]
+        print(f"firing lag      p50 {statistics.median(lags):.1f} ms, p99 {percentile(lags, 0.99):.1f} ms, "
+              f"max {max(lags):.1f} ms over {len(lags)} reminders{'' if r['fired'] else '  (TIMED OUT)'}")
+    print(f"scheduler       {r['stats']}")
+    sys.exit(0 if r["caught_up"] and r["fired"] else 1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
@@ -0,0 +1 @@
+"""Code shared by the agent server (agents/) and the mail monitor (mail_monitoring/)."""
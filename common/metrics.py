@@ -0,0 +1,191 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Latency buckets (seconds) shared by every histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Finished spans kept in memory for GET /spans
+SPAN_BUFFER = int(os.getenv("METRICS_SPAN_BUFFER", "2000"))
+
+# Carried on every hop: webhook → agent server → /send-email → outbox
+CORRELATION_HEADER = "X-Correlation-ID"
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+_lock = threading.Lock()
+_metrics = {}
+SPANS = deque(maxlen=SPAN_BUFFER)
+
+
+# ------------------------------------------------------
+# Correlation ids
+# ------------------------------------------------------
+def new_correlation_id(seed: str | None = None) -> str:
+    """Random id, or a stable one derived from `seed` (e.g. a Graph message id, so retries share it)."""
+    if seed:
+        return hashlib.sha256(seed.encode()).hexdigest()[:16]
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def correlated(cid: str | None):
+    """Set the correlation id for the calls made inside the block."""
+    token = correlation_id.set(cid)
+    try:
+        yield cid
+    finally:
+        correlation_id.reset(token)
+
+
+# ------------------------------------------------------
+# Metric types
+# ------------------------------------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with _lock:
+            return [f"{self.name}{_labels(self.labelnames, k)} {v:g}" for k, v in sorted(self.values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}   # labels → [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with _lock:
+            series = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = []
+        with _lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets + ("+Inf",), series):
+                    le = 'le="%s"' % (bound if bound == "+Inf" else f"{bound:g}")
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-2]}")
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        return _metrics.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labelnames=()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames=()) -> Histogram:
+    return _register(Histogram(name, help, labelnames))
+
+
+# ------------------------------------------------------
+# Spans
+# ------------------------------------------------------
+def observe(metric: Histogram, seconds: float, status: str = "ok", cid: str | None = None, **labels):
+    """Record a finished span: one histogram sample plus an entry in the span buffer."""
+    metric.observe(seconds, status=status, **labels)
+    SPANS.append({
+        "span": metric.name,
+        "correlation_id": cid or correlation_id.get(),
+        "ended_at": round(time.time(), 3),
+        "seconds": round(seconds, 4),
+        "status": status,
+        **labels,
+    })
+
+
+@contextmanager
+def span(metric: Histogram, **labels):
+    """
+    Time the block into `metric` (which must have a "status" label).
+    The yielded dict can be updated with label values or a status before the block ends.
+    """
+    record = {"status": "ok", **labels}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["status"] = "error"
+        raise
+    finally:
+        status = record.pop("status")
+        observe(metric, time.perf_counter() - start, status, **record)
+
+
+def recent_spans(cid: str | None = None, limit: int = 200) -> list:
+    """Newest last; filtered to one correlation id when given."""
+    spans = [s for s in list(SPANS) if cid is None or s["correlation_id"] == cid]
+    return spans[-limit:]
+
+
+# ------------------------------------------------------
+# Exposition
+# ------------------------------------------------------
+def url_template(path: str, collections: set, keep: set = frozenset()) -> str:
+    """/v1/files/file-abc/content → files/{id}/content, so ids never become label values."""
+    out, prev = [], None
+    for part in path.strip("/").split("/"):
+        out.append("{id}" if prev in collections and part not in collections | keep else part)
+        prev = part
+    return "/".join(out)
+
+
+def _gauge_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def render(gauges: dict | None = None) -> str:
+    """
+    Prometheus text exposition of every registered metric, plus `gauges`:
+    {"prefix": stats_dict}, whose numeric values are exported as prefix_key.
+    """
+    lines = []
+    with _lock:
+        metrics = list(_metrics.values())
+    for metric in metrics:
+        lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.kind}"]
+        lines += metric.render()
+    for prefix, stats in (gauges or {}).items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = _gauge_name(f"{prefix}_{key}")
+                lines += [f"# TYPE {name} gauge", f"{name} {value:g}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,59 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# ------------------------------------------------------
+# Pool configuration
+# ------------------------------------------------------
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+# The agent server holds the request open for the whole LangGraph run
+AGENT_READ_TIMEOUT = float(os.getenv("AGENT_READ_TIMEOUT", "600"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+KEEPALIVE_SIZE = int(os.getenv("HTTP_KEEPALIVE_SIZE", "10"))
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_http() -> requests.Session:
+    """Process-wide pooled requests.Session shared by Graph and localhost calls."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                for prefix in ("http://", "https://"):
+                    session.mount(prefix, HTTPAdapter(pool_connections=KEEPALIVE_SIZE, pool_maxsize=POOL_SIZE))
+                _session = session
+    return _session
+
+
+def request_timeout(read: float = READ_TIMEOUT) -> tuple:
+    """(connect, read) timeout tuple for every outbound call."""
+    return (CONNECT_TIMEOUT, read)
+
+
+def pool_stats() -> dict:
+    """Requests issued vs connections (and TLS handshakes) opened per host."""
+    stats = {"requests": 0, "connections": 0, "tls_handshakes": 0, "hosts": {}}
+    if _session is None:
+        return stats
+
+    for adapter in _session.adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats["requests"] += pool.num_requests
+            stats["connections"] += pool.num_connections
+            if pool.scheme == "https":
+                stats["tls_handshakes"] += pool.num_connections
+            stats["hosts"][f"{pool.scheme}://{pool.host}"] = {
+                "requests": pool.num_requests,
+                "connections": pool.num_connections,
+            }
+
+    stats["reused_connections"] = max(stats["requests"] - stats["connections"], 0)
+    stats["pool_size"] = POOL_SIZE
+    return stats
@@ -1,16 +1,80 @@
-import base64
 import os
+import re
+import time
+import hashlib
+import tempfile
 
+CHUNK_SIZE = 64 * 1024
+MAX_ATTACHMENT_BYTES = int(float(os.getenv("MAX_ATTACHMENT_MB", "25")) * 1024 * 1024)
+# Spool files untouched for this long are removed; long enough to outlive a retried message
+SPOOL_RETENTION_MINUTES = float(os.getenv("SPOOL_RETENTION_MINUTES", "60"))
 
-def save_attachment_stream(name: str, file_bytes: bytes):
+
+class AttachmentTooLarge(Exception):
+    """Raised when an attachment exceeds MAX_ATTACHMENT_BYTES while streaming."""
+
+
+def spool_dir() -> str:
     base_dir = os.path.dirname(os.getcwd())
-    target_dir = os.path.join(base_dir, "agents", "data")
+    target_dir = os.path.join(base_dir, "agents", "data", "spool")
     os.makedirs(target_dir, exist_ok=True)
+    return target_dir
+
 
-    filepath = os.path.join(target_dir, name)
+def safe_name(name: str) -> str:
+    """Attachment names come from the sender — keep them to a harmless basename."""
+    name = os.path.basename(name.replace("\\", "/"))
+    return re.sub(r"[^\w.\- ]", "_", name).strip() or "attachment"
 
-    with open(filepath, "wb") as f:
-        f.write(file_bytes)
+
+def save_attachment_stream(name: str, chunks, max_bytes: int = MAX_ATTACHMENT_BYTES) -> str:
+    """
+    Write an iterable of byte chunks to agents/data/spool/<sha256>__<name>,
+    hashing as the bytes arrive so the attachment is never held in memory.
+    Identical content is stored once. Raises AttachmentTooLarge past max_bytes.
+    """
+    target_dir = spool_dir()
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AttachmentTooLarge(f"{name} is larger than {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+
+        filepath = os.path.join(target_dir, f"{digest.hexdigest()}__{safe_name(name)}")
+        if os.path.exists(filepath):
+            os.remove(tmp_path)
+            os.utime(filepath)   # still in use — keep it out of the next cleanup
+        else:
+            os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
     return filepath
 
+
+def cleanup_spool(retention_minutes: float = SPOOL_RETENTION_MINUTES) -> int:
+    """Delete spool files (and abandoned partial downloads) older than the retention window."""
+    target_dir = spool_dir()
+    cutoff = time.time() - retention_minutes * 60
+    removed = 0
+    for entry in os.scandir(target_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            continue
+    if removed:
+        print(f"🧹 Removed {removed} spooled attachment(s)")
+    return removed
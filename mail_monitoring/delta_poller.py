@@ -0,0 +1,199 @@
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from contextlib import contextmanager
+from graph import graph_url
+from work_queue import QUEUE_DB, QueueFull
+
+# "webhook": Graph subscription + periodic catch-up sweep; "delta": poll only
+INGESTION_MODE = os.getenv("INGESTION_MODE", "webhook").lower()
+DELTA_POLL_SECONDS = float(os.getenv("DELTA_POLL_SECONDS", "30"))
+# In webhook mode the delta sweep only backs up missed notifications
+DELTA_SWEEP_SECONDS = float(os.getenv("DELTA_SWEEP_SECONDS", "900"))
+DELTA_PAGE_SIZE = int(os.getenv("DELTA_PAGE_SIZE", "100"))
+# How far back the very first sync queues mail. 0: the first sync only records the delta
+# link, since the webhook has already handled everything received before it
+DELTA_INITIAL_LOOKBACK_HOURS = float(os.getenv("DELTA_INITIAL_LOOKBACK_HOURS", "0"))
+# Messages received this long before the previous sync are treated as already seen,
+# so read/flag changes on old mail are not reprocessed
+DELTA_SKEW_SECONDS = 600
+
+INBOX_DELTA = "me/mailFolders('inbox')/messages/delta"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingestion_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class IngestionState:
+    """Small key/value table for the delta link and subscription, next to the work queue."""
+
+    def __init__(self, path: str = QUEUE_DB):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> str | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM ingestion_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_float(self, key: str) -> float:
+        return float(self.get(key) or 0)
+
+    def set(self, **values):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO ingestion_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                [(k, str(v)) for k, v in values.items()],
+            )
+
+
+class DeltaPoller:
+    """
+    Pages through the inbox delta query and feeds new message ids into the
+    work queue in bulk. The delta link is stored in SQLite, so a restart
+    resumes exactly where the last sync finished.
+    """
+
+    def __init__(self, work_queue, tokens, state: IngestionState | None = None, interval: float | None = None):
+        self.work_queue = work_queue
+        self.tokens = tokens
+        self.state = state or IngestionState()
+        self.interval = interval or (DELTA_POLL_SECONDS if INGESTION_MODE == "delta" else DELTA_SWEEP_SECONDS)
+
+        self.thread = None
+        self.sync_lock = threading.Lock()
+        self.counters = {"syncs": 0, "pages": 0, "seen": 0, "queued": 0, "skipped_old": 0,
+                         "resets": 0, "failures": 0}
+        self.last_sync_seconds = 0.0
+
+    # --------------------------------------------------
+    # Graph paging
+    # --------------------------------------------------
+    def _get(self, url: str, params: dict | None = None):
+        return self.tokens.request("GET", url, params=params,
+                                   headers={"Prefer": f"odata.maxpagesize={DELTA_PAGE_SIZE}"})
+
+    def _initial_request(self, since: datetime) -> tuple:
+        params = {
+            "$select": "id,receivedDateTime",
+            "$filter": f"receivedDateTime ge {since.strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        }
+        return graph_url(INBOX_DELTA), params
+
+    def sync(self) -> int:
+        """Run one delta round to completion. Returns the number of newly queued messages."""
+        with self.sync_lock:
+            return self._sync()
+
+    def _sync(self) -> int:
+        started = time.time()
+        delta_link = self.state.get("delta_link")
+        last_sync = self.state.get_float("last_sync_at")
+
+        # First ever sync without an opted-in lookback: baseline the delta link, queue nothing
+        baseline = not delta_link and DELTA_INITIAL_LOOKBACK_HOURS <= 0
+        if delta_link:
+            url, params = delta_link, None
+            cutoff = last_sync - DELTA_SKEW_SECONDS
+        else:
+            since = datetime.now(timezone.utc) - timedelta(hours=DELTA_INITIAL_LOOKBACK_HOURS)
+            url, params = self._initial_request(since)
+            cutoff = since.timestamp()
+
+        queued = 0
+        while url:
+            r = self._get(url, params)
+            if r.status_code == 410:
+                # Delta token expired or reset by Graph — start over from the lookback window
+                print("♻️ Delta token expired, resyncing inbox")
+                self.counters["resets"] += 1
+                since = datetime.now(timezone.utc) - timedelta(hours=DELTA_INITIAL_LOOKBACK_HOURS)
+                if last_sync:
+                    since = min(since, datetime.fromtimestamp(last_sync - DELTA_SKEW_SECONDS, timezone.utc))
+                url, params = self._initial_request(since)
+                cutoff = since.timestamp()
+                baseline = False
+                continue
+            r.raise_for_status()
+            page = r.json()
+            self.counters["pages"] += 1
+
+            message_ids = []
+            for item in page.get("value", []):
+                if "@removed" in item:
+                    continue
+                self.counters["seen"] += 1
+                received = item.get("receivedDateTime")
+                if received and datetime.fromisoformat(received).timestamp() < cutoff:
+                    self.counters["skipped_old"] += 1
+                    continue
+                message_ids.append(item["id"])
+
+            if message_ids and not baseline:
+                # A full queue leaves the old delta link in place; the retry re-reads these pages
+                # and the queue ignores the ids it already holds.
+                queued += self.work_queue.enqueue_many(message_ids)
+
+            url, params = page.get("@odata.nextLink"), None
+            if url is None and page.get("@odata.deltaLink"):
+                self.state.set(delta_link=page["@odata.deltaLink"], last_sync_at=started)
+
+        self.counters["syncs"] += 1
+        self.counters["queued"] += queued
+        self.last_sync_seconds = time.time() - started
+        if baseline:
+            print("📌 First delta sync: recorded the inbox position, earlier mail is left to the webhook")
+        elif queued:
+            print(f"📥 Delta sync queued {queued} new message(s)")
+        return queued
+
+    # --------------------------------------------------
+    # Background loop
+    # --------------------------------------------------
+    def start(self):
+        """Catch up on anything missed while the service was down, then keep polling."""
+        if self.thread is not None:
+            return self.thread
+
+        def run():
+            while True:
+                try:
+                    self.sync()
+                except QueueFull as e:
+                    print("🚦 Queue full, delta sync will resume next round:", e)
+                except Exception as e:
+                    self.counters["failures"] += 1
+                    print("❌ Delta sync failed:", e)
+                time.sleep(self.interval)
+
+        self.thread = threading.Thread(target=run, name="graph-delta-poller", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def metrics(self) -> dict:
+        last_sync = self.state.get_float("last_sync_at")
+        return {
+            "mode": INGESTION_MODE,
+            "interval_seconds": self.interval,
+            "last_sync_at": last_sync or None,
+            "seconds_since_last_sync": round(time.time() - last_sync, 1) if last_sync else None,
+            "last_sync_seconds": round(self.last_sync_seconds, 3),
+            **self.counters,
+        }
@@ -0,0 +1,193 @@
+import os
+import re
+import base64
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from convert_document import (
+    CHUNK_SIZE, MAX_ATTACHMENT_BYTES, AttachmentTooLarge, save_attachment_stream,
+)
+
+# Point at a local stand-in (benchmarks/graph_standin.py) for testing
+GRAPH_BASE_URL = os.getenv("GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0").rstrip("/")
+# Parallel attachment downloads per email
+GRAPH_DOWNLOAD_CONCURRENCY = int(os.getenv("GRAPH_DOWNLOAD_CONCURRENCY", "4"))
+# Attachments up to this size are fetched together in one JSON $batch (base64 in the response);
+# larger ones are streamed individually so they never sit in memory
+GRAPH_BATCH_MAX_BYTES = int(os.getenv("GRAPH_BATCH_MAX_BYTES", str(1024 * 1024)))
+GRAPH_BATCH_LIMIT = 20   # Graph's per-$batch request cap
+
+MESSAGE_SELECT = "subject,body,from,toRecipients,receivedDateTime,hasAttachments"
+ATTACHMENT_SELECT = "id,name,size,contentType"
+FILE_ATTACHMENT = "#microsoft.graph.fileAttachment"
+
+_stats_lock = threading.Lock()
+STATS = {"emails": 0, "round_trips": 0, "batched_attachments": 0, "streamed_attachments": 0}
+
+
+def _count(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            STATS[key] += value
+
+
+def graph_stats() -> dict:
+    stats = dict(STATS)
+    stats["round_trips_per_email"] = round(stats["round_trips"] / stats["emails"], 2) if stats["emails"] else 0.0
+    return stats
+
+
+def graph_url(path: str) -> str:
+    return f"{GRAPH_BASE_URL}/{path.lstrip('/')}"
+
+
+# ------------------------------------------------------
+# Message
+# ------------------------------------------------------
+def get_message(message_id: str, tokens) -> dict:
+    """
+    One round trip for the fields we use, a plain-text body and the
+    attachment metadata (no contentBytes).
+    """
+    params = {
+        "$select": MESSAGE_SELECT,
+        "$expand": f"attachments($select={ATTACHMENT_SELECT})",
+    }
+    headers = {"Prefer": 'outlook.body-content-type="text"'}
+    r = tokens.request("GET", graph_url(f"me/messages/{message_id}"), params=params, headers=headers)
+    _count(round_trips=1)
+    r.raise_for_status()
+    return r.json()
+
+
+def message_text(data: dict) -> str:
+    body = data.get("body", {})
+    content = body.get("content", "")
+    if body.get("contentType", "").lower() == "html":
+        # The Prefer header was ignored — fall back to stripping tags
+        content = re.sub(r"<.*?>", "", content)
+    return content.strip()
+
+
+# ------------------------------------------------------
+# Attachments
+# ------------------------------------------------------
+def _attachment_value_path(message_id: str, attachment_id: str) -> str:
+    return f"me/messages/{message_id}/attachments/{attachment_id}/$value"
+
+
+def _base64_chunks(encoded: str):
+    """Decode base64 in slices so the decoded bytes are never all in memory at once."""
+    step = CHUNK_SIZE // 3 * 4
+    for i in range(0, len(encoded), step):
+        yield base64.b64decode(encoded[i:i + step])
+
+
+def download_attachment(message_id: str, att: dict, tokens) -> str | None:
+    """Stream one attachment into the spool. Returns the spool path, or None on failure."""
+    url = graph_url(_attachment_value_path(message_id, att["id"]))
+    with tokens.request("GET", url, stream=True) as resp:
+        _count(round_trips=1, streamed_attachments=1)
+        if resp.status_code != 200:
+            print(f"❌ Failed to download attachment {att['name']}")
+            return None
+        try:
+            return save_attachment_stream(att["name"], resp.iter_content(CHUNK_SIZE))
+        except AttachmentTooLarge as e:
+            print(f"⚠️ Skipping {att['name']}:", e)
+            return None
+
+
+def batch_download(message_id: str, atts: list, tokens) -> dict:
+    """Fetch up to GRAPH_BATCH_LIMIT small attachments in one JSON $batch. Returns {id: path}."""
+    batch_requests = [
+        {"id": str(i), "method": "GET", "url": "/" + _attachment_value_path(message_id, att["id"])}
+        for i, att in enumerate(atts)
+    ]
+    r = tokens.request("POST", graph_url("$batch"), json={"requests": batch_requests})
+    _count(round_trips=1)
+    r.raise_for_status()
+
+    saved = {}
+    for item in r.json().get("responses", []):
+        att = atts[int(item["id"])]
+        if item.get("status") != 200:
+            print(f"❌ Failed to download attachment {att['name']} (batch status {item.get('status')})")
+            continue
+        try:
+            saved[att["id"]] = save_attachment_stream(att["name"], _base64_chunks(item.get("body", "")))
+        except AttachmentTooLarge as e:
+            print(f"⚠️ Skipping {att['name']}:", e)
+            continue
+        _count(batched_attachments=1)
+    return saved
+
+
+def download_attachments(message_id: str, attachments: list, tokens) -> list:
+    """
+    Spool every file attachment: small ones through $batch, large ones streamed,
+    all in parallel. Returns spool paths in the message's attachment order.
+    """
+    wanted = []
+    for att in attachments:
+        if att.get("@odata.type", FILE_ATTACHMENT) != FILE_ATTACHMENT:
+            print(f"Skipping non-file attachment: {att['name']}")
+            continue
+        if att.get("size", 0) > MAX_ATTACHMENT_BYTES:
+            print(f"⚠️ Skipping {att['name']}: {att['size']} bytes exceeds the {MAX_ATTACHMENT_BYTES} byte limit")
+            continue
+        wanted.append(att)
+
+    small = [a for a in wanted if a.get("size", 0) <= GRAPH_BATCH_MAX_BYTES]
+    large = [a for a in wanted if a.get("size", 0) > GRAPH_BATCH_MAX_BYTES]
+    # A batch of one is just a slower single GET
+    if len(small) < 2:
+        large, small = large + small, []
+
+    paths = {}
+    with ThreadPoolExecutor(max_workers=max(1, GRAPH_DOWNLOAD_CONCURRENCY)) as pool:
+        # Each download runs in a copy of this context so its spans keep the message's correlation id
+        submit = lambda fn, *args: pool.submit(contextvars.copy_context().run, fn, *args)  # noqa: E731
+        batches = [
+            submit(batch_download, message_id, small[i:i + GRAPH_BATCH_LIMIT], tokens)
+            for i in range(0, len(small), GRAPH_BATCH_LIMIT)
+        ]
+        singles = {att["id"]: submit(download_attachment, message_id, att, tokens) for att in large}
+
+        for future in batches:
+            paths.update(future.result())
+        for att_id, future in singles.items():
+            path = future.result()
+            if path:
+                paths[att_id] = path
+
+    return [paths[att["id"]] for att in wanted if att["id"] in paths]
+
+
+# ------------------------------------------------------
+# Full fetch
+# ------------------------------------------------------
+def fetch_message(message_id: str, tokens) -> dict:
+    """
+    Message fields plus spooled attachment paths, in as few round trips as Graph allows.
+    `tokens` is the TokenManager; every call retries once on 401.
+    """
+    data = get_message(message_id, tokens)
+    _count(emails=1)
+
+    attachments = []
+    if data.get("hasAttachments"):
+        attachments = download_attachments(message_id, data.get("attachments", []), tokens)
+
+    return {
+        "subject": data.get("subject", ""),
+        "body": message_text(data),
+        "sender_email": data.get("from", {}).get("emailAddress", {}).get("address", ""),
+        "recipient_email": (
+            (data.get("toRecipients") or [{}])[0]
+            .get("emailAddress", {})
+            .get("address", "")
+        ),
+        "received_time": data.get("receivedDateTime", ""),
+        "attachments": attachments,
+    }
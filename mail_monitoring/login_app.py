@@ -64,6 +64,8 @@ async def callback(request: Request):
     access = token["access_token"]
     refresh = token["refresh_token"]
 
+    # Expiry first: webhook.py adopts the new tokens once REFRESH_TOKEN changes
+    set_key(".env", "ACCESS_TOKEN_EXPIRES_AT", str(int(token.get("expires_at") or 0)))
     set_key(".env", "ACCESS_TOKEN", access)
     set_key(".env", "REFRESH_TOKEN", refresh)
     time.sleep(5)
@@ -0,0 +1,8 @@
+"""
+Mail monitor metrics. The registry, spans and correlation ids live in common/metrics.py, shared with
+agents; run with the repository root on PYTHONPATH so `common` imports.
+"""
+from common.metrics import (  # noqa: F401
+    CORRELATION_HEADER, correlated, histogram, new_correlation_id, observe, recent_spans, render, span,
+    url_template,
+)
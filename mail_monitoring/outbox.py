@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import uuid
+import random
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from graph import graph_url
+from metrics import histogram, observe
+from work_queue import QUEUE_DB
+
+# Identical messages enqueued within this window are merged into one send
+OUTBOX_LINGER_SECONDS = float(os.getenv("OUTBOX_LINGER_SECONDS", "2"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "5"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "900"))
+# Sent/failed rows are kept this long for status lookups
+OUTBOX_RETENTION_HOURS = float(os.getenv("OUTBOX_RETENTION_HOURS", "72"))
+
+RETRYABLE = {429, 500, 502, 503, 504}
+# Every sendMail in a $batch goes to the same mailbox, and Graph runs at most 4 requests
+# per mailbox at once (the rest come back 429), so a batch is capped there rather than at 20
+OUTBOX_BATCH_SIZE = 4
+
+DELIVERY_SECONDS = histogram("outbox_delivery_seconds",
+                             "Time from /send-email until Graph accepted or rejected the mail", ["status"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           TEXT PRIMARY KEY,
+    fingerprint  TEXT NOT NULL,
+    subject      TEXT NOT NULL,
+    body         TEXT NOT NULL,
+    to_json      TEXT NOT NULL,
+    cc_json      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    available_at REAL NOT NULL,
+    sent_at      REAL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_ready ON outbox (status, available_at);
+CREATE INDEX IF NOT EXISTS outbox_fingerprint ON outbox (fingerprint, status);
+
+CREATE TABLE IF NOT EXISTS outbox_requests (
+    request_id     TEXT PRIMARY KEY,
+    message_id     TEXT NOT NULL,
+    created_at     REAL NOT NULL,
+    correlation_id TEXT
+);
+"""
+
+
+def _fingerprint(subject: str, body: str) -> str:
+    return hashlib.sha256(f"{subject}\0{body}".encode()).hexdigest()
+
+
+def _graph_message(subject: str, body: str, to: list, cc: list) -> dict:
+    message = {
+        "subject": subject,
+        # Convert text newlines to HTML <br>
+        "body": {"contentType": "HTML", "content": body.replace("\n", "<br>")},
+        "toRecipients": [{"emailAddress": {"address": a}} for a in to],
+    }
+    if cc:
+        message["ccRecipients"] = [{"emailAddress": {"address": a}} for a in cc]
+    return {"message": message, "saveToSentItems": "true"}
+
+
+def _retry_after(headers: dict) -> float | None:
+    for key, value in (headers or {}).items():
+        if key.lower() == "retry-after":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class Outbox:
+    """
+    Durable queue of outgoing mail. Requests with the same subject and body
+    that arrive within OUTBOX_LINGER_SECONDS become one message (recipients
+    merged into To/CC); a flusher thread sends up to 20 messages per Graph
+    $batch and retries throttled or failed sends after Retry-After.
+    """
+
+    def __init__(self, tokens, path: str = QUEUE_DB):
+        self.tokens = tokens
+        self.path = path
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.thread = None
+        self.counters = {"requests": 0, "coalesced": 0, "batches": 0, "sent": 0,
+                         "retried": 0, "throttled": 0, "failed": 0}
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Databases created before correlation ids were tracked
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(outbox_requests)")}
+            if "correlation_id" not in columns:
+                conn.execute("ALTER TABLE outbox_requests ADD COLUMN correlation_id TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # --------------------------------------------------
+    # Producer side
+    # --------------------------------------------------
+    def enqueue(self, recipient: str, subject: str, body: str, cc: list | None = None,
+                correlation_id: str | None = None) -> str:
+        """
+        Persist an outgoing email and return a request id for status lookups.
+        `correlation_id` ties the delivery span to the inbound email that caused it.
+        """
+        now = time.time()
+        request_id = uuid.uuid4().hex
+        fingerprint = _fingerprint(subject, body)
+        cc = [a for a in cc or [] if a]
+
+        with self.lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, to_json, cc_json FROM outbox WHERE fingerprint = ? AND status = 'pending' "
+                "AND attempts = 0 AND created_at >= ? LIMIT 1",
+                (fingerprint, now - OUTBOX_LINGER_SECONDS),
+            ).fetchone()
+
+            if row:
+                message_id, to, merged_cc = row[0], json.loads(row[1]), json.loads(row[2])
+                to += [recipient] if recipient not in to else []
+                merged_cc += [a for a in cc if a not in to and a not in merged_cc]
+                merged_cc = [a for a in merged_cc if a not in to]
+                conn.execute("UPDATE outbox SET to_json = ?, cc_json = ? WHERE id = ?",
+                             (json.dumps(to), json.dumps(merged_cc), message_id))
+                self.counters["coalesced"] += 1
+            else:
+                message_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO outbox (id, fingerprint, subject, body, to_json, cc_json, created_at, available_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (message_id, fingerprint, subject, body, json.dumps([recipient]),
+                     json.dumps([a for a in cc if a != recipient]), now, now + OUTBOX_LINGER_SECONDS),
+                )
+            conn.execute("INSERT INTO outbox_requests (request_id, message_id, created_at, correlation_id) "
+                         "VALUES (?, ?, ?, ?)", (request_id, message_id, now, correlation_id))
+            conn.execute("COMMIT")
+
+        self.counters["requests"] += 1
+        with self.wakeup:
+            self.wakeup.notify()
+        return request_id
+
+    # --------------------------------------------------
+    # Flusher
+    # --------------------------------------------------
+    def start(self):
+        if self.thread is not None:
+            return self.thread
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'sending'")
+        self.thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def _run(self):
+        while True:
+            try:
+                if self.flush():
+                    continue
+            except Exception as e:
+                print("❌ Outbox flush failed:", e)
+            with self.wakeup:
+                self.wakeup.wait(timeout=self._next_due_in())
+
+    def _next_due_in(self) -> float:
+        with self._connect() as conn:
+            row = conn.execute("SELECT MIN(available_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return 5.0
+        return min(max(row[0] - time.time(), 0.05), 5.0)
+
+    def _claim(self) -> list:
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            return conn.execute(
+                """
+                UPDATE outbox SET status = 'sending', attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM outbox WHERE status = 'pending' AND available_at <= ?
+                    ORDER BY available_at LIMIT ?
+                )
+                RETURNING id, subject, body, to_json, cc_json, attempts
+                """,
+                (now, OUTBOX_BATCH_SIZE),
+            ).fetchall()
+
+    def flush(self) -> int:
+        """Send one $batch of due messages. Returns how many were claimed."""
+        rows = self._claim()
+        if not rows:
+            return 0
+
+        batch = {"requests": [
+            {
+                "id": str(i),
+                "method": "POST",
+                "url": "/me/sendMail",
+                "headers": {"Content-Type": "application/json"},
+                "body": _graph_message(subject, body, json.loads(to), json.loads(cc)),
+            }
+            for i, (_, subject, body, to, cc, _) in enumerate(rows)
+        ]}
+
+        try:
+            r = self._post_batch(batch)
+        except Exception as e:
+            for row in rows:
+                self._retry(row[0], row[5], repr(e), None)
+            return len(rows)
+
+        self.counters["batches"] += 1
+        if r.status_code != 200:
+            delay = _retry_after(r.headers)
+            for row in rows:
+                self._settle(row[0], row[5], r.status_code, r.text[:500], delay)
+            return len(rows)
+
+        responses = {item["id"]: item for item in r.json().get("responses", [])}
+        for i, row in enumerate(rows):
+            item = responses.get(str(i), {"status": 500, "body": "missing from $batch response"})
+            self._settle(row[0], row[5], item.get("status", 500), json.dumps(item.get("body"))[:500],
+                         _retry_after(item.get("headers")))
+        return len(rows)
+
+    def _post_batch(self, batch: dict):
+        return self.tokens.request("POST", graph_url("$batch"), json=batch)
+
+    def _settle(self, message_id: str, attempts: int, status: int, detail: str, retry_after: float | None):
+        if status in (200, 202):
+            now = time.time()
+            with self.lock, self._connect() as conn:
+                conn.execute("UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                             (now, message_id))
+                self._prune(conn, now)
+            self.counters["sent"] += 1
+            self._observe_delivery(message_id, "sent", now)
+        elif status in RETRYABLE:
+            if status == 429:
+                self.counters["throttled"] += 1
+            self._retry(message_id, attempts, f"HTTP {status}: {detail}", retry_after)
+        else:
+            self._fail(message_id, f"HTTP {status}: {detail}")
+
+    def _retry(self, message_id: str, attempts: int, error: str, retry_after: float | None):
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            self._fail(message_id, error)
+            return
+        delay = retry_after
+        if delay is None:
+            delay = min(OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_BACKOFF_SECONDS)
+            delay *= random.uniform(0.8, 1.2)
+        with self.lock, self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = 'pending', available_at = ?, last_error = ? WHERE id = ?",
+                         (time.time() + delay, error, message_id))
+        self.counters["retried"] += 1
+        print(f"🔁 Outgoing email {message_id} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+
+    def _fail(self, message_id: str, error: str):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = 'failed', sent_at = ?, last_error = ? WHERE id = ?",
+                         (now, error, message_id))
+            self._prune(conn, now)
+        self.counters["failed"] += 1
+        self._observe_delivery(message_id, "failed", now)
+        print(f"❌ Outgoing email {message_id} failed permanently: {error}")
+
+    def _observe_delivery(self, message_id: str, status: str, now: float):
+        """One span per coalesced request, each under its own correlation id."""
+        with self._connect() as conn:
+            requests = conn.execute("SELECT created_at, correlation_id FROM outbox_requests WHERE message_id = ?",
+                                    (message_id,)).fetchall()
+        for created_at, correlation_id in requests:
+            observe(DELIVERY_SECONDS, now - created_at, status, cid=correlation_id)
+
+    def _prune(self, conn, now: float):
+        """Drop finished messages (and their request ids) past the retention window."""
+        cutoff = now - OUTBOX_RETENTION_HOURS * 3600
+        conn.execute("DELETE FROM outbox_requests WHERE message_id IN "
+                     "(SELECT id FROM outbox WHERE status IN ('sent', 'failed') AND sent_at < ?)", (cutoff,))
+        conn.execute("DELETE FROM outbox WHERE status IN ('sent', 'failed') AND sent_at < ?", (cutoff,))
+
+    # --------------------------------------------------
+    # Status
+    # --------------------------------------------------
+    def status(self, request_id: str) -> dict | None:
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT o.id, o.status, o.attempts, o.to_json, o.cc_json, o.subject,
+                       o.created_at, o.sent_at, o.last_error, r.correlation_id
+                FROM outbox_requests r JOIN outbox o ON o.id = r.message_id
+                WHERE r.request_id = ?
+                """,
+                (request_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("message_id", "status", "attempts", "to", "cc", "subject", "created_at", "sent_at", "last_error",
+                "correlation_id")
+        status = dict(zip(keys, row))
+        status["to"], status["cc"] = json.loads(status["to"]), json.loads(status["cc"])
+        status["request_id"] = request_id
+        return status
+
+    def metrics(self) -> dict:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "sent_retained": counts.get("sent", 0),
+            "failed_retained": counts.get("failed", 0),
+            **self.counters,
+        }
@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from graph import graph_url
+
+# Graph caps message subscriptions at 4230 minutes; stay just under it
+SUBSCRIPTION_MINUTES = int(os.getenv("SUBSCRIPTION_MINUTES", "4200"))
+# Renew once less than this much lifetime is left
+SUBSCRIPTION_RENEW_BEFORE_MINUTES = int(os.getenv("SUBSCRIPTION_RENEW_BEFORE_MINUTES", "720"))
+SUBSCRIPTION_CHECK_SECONDS = float(os.getenv("SUBSCRIPTION_CHECK_SECONDS", "600"))
+CLIENT_STATE = os.getenv("SUBSCRIPTION_CLIENT_STATE", "secret123")
+
+
+def _expiry() -> str:
+    moment = datetime.now(timezone.utc) + timedelta(minutes=SUBSCRIPTION_MINUTES)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+def _parse(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+class SubscriptionManager:
+    """
+    Keeps one inbox change-notification subscription alive: created on demand,
+    renewed with PATCH before it expires, recreated if Graph has dropped it.
+    The id and expiry are kept in IngestionState so restarts reuse them.
+    """
+
+    def __init__(self, notification_url: str, tokens, state):
+        self.notification_url = notification_url
+        self.tokens = tokens
+        self.state = state
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def _request(self, method: str, url: str, payload: dict):
+        return self.tokens.request(method, url, json=payload)
+
+    def create(self) -> dict:
+        payload = {
+            "changeType": "created",
+            "notificationUrl": self.notification_url,
+            "resource": "me/mailFolders('inbox')/messages",
+            "expirationDateTime": _expiry(),
+            "clientState": CLIENT_STATE,
+        }
+        r = self._request("POST", graph_url("subscriptions"), payload)
+        data = r.json()
+        print("SUB RESPONSE:", data)
+        if r.status_code < 300:
+            self.state.set(subscription_id=data["id"],
+                           subscription_expires_at=_parse(data["expirationDateTime"]))
+        return data
+
+    def renew(self, subscription_id: str) -> bool:
+        r = self._request("PATCH", graph_url(f"subscriptions/{subscription_id}"),
+                          {"expirationDateTime": _expiry()})
+        if r.status_code >= 300:
+            print(f"⚠️ Subscription renewal failed ({r.status_code}):", r.text)
+            return False
+        self.state.set(subscription_expires_at=_parse(r.json()["expirationDateTime"]))
+        print(f"🔁 Renewed subscription {subscription_id}")
+        return True
+
+    def ensure(self, force: bool = False) -> dict:
+        """Make sure a live subscription exists. Returns its id and expiry."""
+        with self.lock:
+            subscription_id = self.state.get("subscription_id")
+            expires_at = self.state.get_float("subscription_expires_at")
+
+            if force or not subscription_id or expires_at <= time.time():
+                self.create()
+            elif expires_at - time.time() < SUBSCRIPTION_RENEW_BEFORE_MINUTES * 60:
+                if not self.renew(subscription_id):
+                    self.create()
+
+            return {
+                "subscription_id": self.state.get("subscription_id"),
+                "expires_at": self.state.get_float("subscription_expires_at") or None,
+            }
+
+    def start(self):
+        if self.thread is not None:
+            return self.thread
+
+        def run():
+            while True:
+                try:
+                    self.ensure()
+                except Exception as e:
+                    print("❌ Subscription check failed:", e)
+                time.sleep(SUBSCRIPTION_CHECK_SECONDS)
+
+        self.thread = threading.Thread(target=run, name="graph-subscription-renewer", daemon=True)
+        self.thread.start()
+        return self.thread
@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+from dotenv import dotenv_values, set_key
+from clients import get_http, request_timeout
+from metrics import histogram, span, url_template
+
+TOKEN_URL = os.getenv("TOKEN_URL", "https://login.microsoftonline.com/common/oauth2/v2.0/token")
+SCOPE = "openid email profile offline_access Mail.Read Mail.Send IMAP.AccessAsUser.All"
+# Refresh this long before the access token expires
+TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+ENV_FILE = ".env"
+
+GRAPH_COLLECTIONS = {"messages", "attachments", "subscriptions"}
+GRAPH_ACTIONS = {"delta", "$value"}
+GRAPH_SECONDS = histogram("graph_request_seconds", "Microsoft Graph call latency", ["endpoint", "status"])
+
+
+class TokenManager:
+    """
+    In-memory OAuth tokens for Graph.
+
+    - get_token() returns a token that is not about to expire; a background
+      thread refreshes ahead of expiry so callers normally never wait.
+    - Concurrent refreshes collapse into one token request (single flight).
+    - request() retries once on 401 with a fresh token.
+    - Tokens are written back to .env on a background thread, and tokens
+      written to .env by login_app.py are picked up without a restart.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, redirect_uri: str, env_file: str = ENV_FILE):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.redirect_uri = redirect_uri
+        self.env_file = env_file
+
+        values = self._read_env()
+        self.access_token = values.get("ACCESS_TOKEN")
+        self.refresh_token = values.get("REFRESH_TOKEN")
+        # Unknown expiry (tokens from login_app.py): refresh on first use
+        self.expires_at = float(values.get("ACCESS_TOKEN_EXPIRES_AT") or 0)
+        self.env_mtime = self._env_mtime()
+
+        self.lock = threading.Lock()
+        self.persist_wakeup = threading.Condition()
+        self.persist_pending = False
+        self.persisting = False
+        self.threads = []
+        self.counters = {"refreshes": 0, "refresh_failures": 0, "coalesced": 0,
+                         "unauthorized_retries": 0, "reloaded_from_env": 0}
+
+    # --------------------------------------------------
+    # .env
+    # --------------------------------------------------
+    def _env_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.env_file)
+        except FileNotFoundError:
+            return 0.0
+
+    def _read_env(self) -> dict:
+        if not os.path.exists(self.env_file):
+            return {}
+        return dotenv_values(self.env_file)
+
+    def _reload_if_changed(self):
+        """Adopt tokens another process (login_app.py) wrote to .env."""
+        mtime = self._env_mtime()
+        if self.persisting or mtime == self.env_mtime:
+            return
+        self.env_mtime = mtime
+        values = self._read_env()
+        if values.get("REFRESH_TOKEN") and values.get("REFRESH_TOKEN") != self.refresh_token:
+            self.access_token = values.get("ACCESS_TOKEN")
+            self.refresh_token = values["REFRESH_TOKEN"]
+            self.expires_at = float(values.get("ACCESS_TOKEN_EXPIRES_AT") or 0)
+            self.counters["reloaded_from_env"] += 1
+            print("🔑 Picked up new tokens from .env")
+
+    def _persist_loop(self):
+        while True:
+            with self.persist_wakeup:
+                while not self.persist_pending:
+                    self.persist_wakeup.wait()
+                self.persist_pending = False
+            with self.lock:
+                # Our own half-written .env must not be mistaken for a new login
+                self.persisting = True
+                access, refresh, expires_at = self.access_token, self.refresh_token, self.expires_at
+            try:
+                set_key(self.env_file, "ACCESS_TOKEN_EXPIRES_AT", str(int(expires_at)))
+                set_key(self.env_file, "ACCESS_TOKEN", access)
+                set_key(self.env_file, "REFRESH_TOKEN", refresh)
+            except Exception as e:
+                print("⚠️ Could not persist tokens to .env:", e)
+            finally:
+                with self.lock:
+                    self.env_mtime = self._env_mtime()
+                    self.persisting = False
+
+    def _schedule_persist(self):
+        with self.persist_wakeup:
+            self.persist_pending = True
+            self.persist_wakeup.notify()
+
+    # --------------------------------------------------
+    # Tokens
+    # --------------------------------------------------
+    def _expiring(self) -> bool:
+        return time.time() >= self.expires_at - TOKEN_REFRESH_MARGIN_SECONDS
+
+    def get_token(self) -> str:
+        """Current access token, refreshed first if it is missing or about to expire."""
+        with self.lock:
+            self._reload_if_changed()
+            if self.access_token and not self._expiring():
+                return self.access_token
+            stale = self.access_token
+        self.refresh(stale)
+        return self.access_token
+
+    def refresh(self, stale_token: str | None = None, force: bool = False) -> bool:
+        """
+        Refresh the access token. Callers pass the token they saw rejected or
+        expiring, so concurrent callers share one refresh: whoever gets the lock
+        second finds the token already replaced and returns without a request.
+        """
+        with self.lock:
+            if not force and self.access_token != stale_token and not self._expiring():
+                self.counters["coalesced"] += 1
+                return True
+
+            data = {
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+                "redirect_uri": self.redirect_uri,
+                "scope": SCOPE,
+            }
+            try:
+                resp = get_http().post(TOKEN_URL, data=data, timeout=request_timeout()).json()
+            except Exception as e:
+                resp = {"error": repr(e)}
+
+            if "access_token" not in resp:
+                self.counters["refresh_failures"] += 1
+                print("❌ Refresh failed:", resp.get("error_description") or resp.get("error"))
+                return False
+
+            self.access_token = resp["access_token"]
+            self.refresh_token = resp.get("refresh_token", self.refresh_token)
+            self.expires_at = time.time() + float(resp.get("expires_in", 3600))
+            self.counters["refreshes"] += 1
+
+        self._schedule_persist()
+        print("🔄 Tokens refreshed")
+        return True
+
+    def request(self, method: str, url: str, **kwargs):
+        """Authorised Graph call through the shared session, retried once on 401."""
+        headers = kwargs.pop("headers", {}) or {}
+        kwargs.setdefault("timeout", request_timeout())
+
+        # /v1.0/me/messages/AAMk.../$value → me/messages/{id}/$value
+        path = urlsplit(url).path.split("/", 2)[-1]
+        endpoint = f"{method} {url_template(path, GRAPH_COLLECTIONS, GRAPH_ACTIONS)}"
+        with span(GRAPH_SECONDS, endpoint=endpoint) as record:
+            token = self.get_token()
+            r = get_http().request(method, url, headers={**headers, "Authorization": f"Bearer {token}"}, **kwargs)
+            if r.status_code == 401:
+                r.close()
+                self.counters["unauthorized_retries"] += 1
+                if self.refresh(token):
+                    r = get_http().request(method, url,
+                                           headers={**headers, "Authorization": f"Bearer {self.access_token}"},
+                                           **kwargs)
+            record["status"] = str(r.status_code)
+        return r
+
+    # --------------------------------------------------
+    # Background threads
+    # --------------------------------------------------
+    def start(self):
+        """Start proactive refresh and async persistence."""
+        if self.threads:
+            return
+
+        def refresher():
+            while True:
+                wait = self.expires_at - TOKEN_REFRESH_MARGIN_SECONDS - time.time()
+                if wait > 0:
+                    time.sleep(min(wait, 60))   # re-check regularly: .env or a 401 may move expiry
+                    continue
+                if not self.refresh_token:
+                    time.sleep(60)
+                    continue
+                if not self.refresh(self.access_token):
+                    time.sleep(30)
+
+        for target, name in ((refresher, "token-refresher"), (self._persist_loop, "token-persister")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stats(self) -> dict:
+        return {
+            "expires_in_seconds": round(self.expires_at - time.time(), 1) if self.expires_at else None,
+            "has_refresh_token": bool(self.refresh_token),
+            **self.counters,
+        }
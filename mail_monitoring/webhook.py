@@ -1,16 +1,21 @@
 import os
-import re
-import requests
-from datetime import datetime, timedelta
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import Response
+from fastapi import FastAPI, Header, Request, HTTPException
+from fastapi.responses import PlainTextResponse, Response
 from typing import Optional, List
 from pydantic import BaseModel
-from dotenv import load_dotenv, set_key
+from dotenv import load_dotenv
 import uvicorn
-from cachetools import TTLCache
-from convert_document import save_attachment_stream
-from fastapi import BackgroundTasks
+from convert_document import cleanup_spool
+from graph import fetch_message, graph_stats
+from clients import AGENT_READ_TIMEOUT, get_http, pool_stats, request_timeout
+from token_manager import TokenManager
+from work_queue import WorkQueue, QueueFull
+from delta_poller import INGESTION_MODE, DeltaPoller, IngestionState
+from subscriptions import SubscriptionManager
+from outbox import Outbox
+from metrics import (
+    CORRELATION_HEADER, correlated, histogram, new_correlation_id, recent_spans, render, span,
+)
 
 
 load_dotenv()
@@ -19,92 +24,56 @@ CLIENT_ID = os.getenv("CLIENT_ID")
 CLIENT_SECRET = os.getenv("CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
 
-ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
-REFRESH_TOKEN = os.getenv("REFRESH_TOKEN")
-
 NGROK_URL = os.getenv("NGROK_URL")
-WEBHOOK_URL = "https://valarie-keratoplastic-fissiparously.ngrok-free.dev/webhook"
+# Public URL Graph posts notifications to (the ngrok tunnel + /webhook)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", NGROK_URL)
+# LangGraph agent server
+AGENT_URL = os.getenv("AGENT_URL", "http://localhost:2000/incoming-email")
 
 app = FastAPI()
-processed_messages = TTLCache(maxsize=1000, ttl=600)  # store for 10 minutes
 
 # -----------------------------------
-# REFRESH TOKENS
+# TOKENS
 # -----------------------------------
-def refresh_tokens():
-    global ACCESS_TOKEN, REFRESH_TOKEN
-
-    url = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
-    data = {
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "grant_type": "refresh_token",
-        "refresh_token": REFRESH_TOKEN,
-        "redirect_uri": REDIRECT_URI,
-        "scope": "openid email profile offline_access Mail.Read Mail.Send IMAP.AccessAsUser.All",
-    }
-
-    resp = requests.post(url, data=data).json()
-    # print("REFRESH:", resp)
-
-    if "access_token" not in resp:
-        print("❌ Refresh failed")
-        return False
+# Access token kept in memory and refreshed ahead of expiry; all Graph calls go through it
+tokens = TokenManager(CLIENT_ID, CLIENT_SECRET, REDIRECT_URI)
 
-    ACCESS_TOKEN = resp["access_token"]
-    REFRESH_TOKEN = resp["refresh_token"]
 
-    set_key(".env", "ACCESS_TOKEN", ACCESS_TOKEN)
-    set_key(".env", "REFRESH_TOKEN", REFRESH_TOKEN)
-
-    print("🔄 Tokens refreshed")
-    return True
+@app.get("/token/stats")
+def token_stats():
+    return tokens.stats()
 
 # -----------------------------------
 # SUBSCRIBE
 # -----------------------------------
-@app.get("/subscribe")
-def subscribe():
-    expiration = (datetime.utcnow() + timedelta(minutes=4210)).isoformat() + "Z"
-
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-    payload = {
-        "changeType": "created",
-        "notificationUrl": WEBHOOK_URL,
-        "resource": "me/mailFolders('inbox')/messages",
-        "expirationDateTime": expiration,
-        "clientState": "secret123",
-    }
-
-    url = "https://graph.microsoft.com/v1.0/subscriptions"
-    r = requests.post(url, json=payload, headers=headers)
-    data = r.json()
-    print("SUB RESPONSE:", data)
+ingestion_state = IngestionState()
+subscriptions = SubscriptionManager(WEBHOOK_URL, tokens, ingestion_state)
 
-    if data.get("error"):
-        if refresh_tokens():
-            headers["Authorization"] = f"Bearer {ACCESS_TOKEN}"
-            r2 = requests.post(url, json=payload, headers=headers)
-            print("SUB AFTER REFRESH:", r2.json())
-            return r2.json()
 
-    return data
+@app.get("/subscribe")
+def subscribe():
+    return subscriptions.create()
 
 # -----------------------------------
-# BACKGROUND PROCESSOR
+# QUEUE WORKER
 # -----------------------------------
-def process_in_background(message_id: str):
+MESSAGE_SECONDS = histogram("mail_message_seconds", "Queue worker time per message (fetch + agent)", ["status"])
+AGENT_SECONDS = histogram("agent_request_seconds", "Agent server /incoming-email call latency", ["status"])
+
+
+def process_message(message_id: str):
     """
-    This runs AFTER the webhook responds.
+    Runs on a queue worker thread AFTER the webhook responds.
     Heavy operations go here:
       - fetch full email
       - save attachments
       - call local LangGraph agent
       - send outgoing mail
+    Raising makes the queue retry with backoff (and dead-letter eventually).
+    The correlation id is derived from the message id, so retries share it.
     """
-
-    try:
-        print(f"🚀 Background worker started for message: {message_id}")
+    with correlated(new_correlation_id(message_id)) as cid, span(MESSAGE_SECONDS):
+        print(f"🚀 Queue worker started for message: {message_id} [{cid}]")
 
         email = fetch_email(message_id)
 
@@ -116,21 +85,49 @@ def process_in_background(message_id: str):
             "attachments": email["attachments"]
         }
 
-        print("➡️ Sending to agent:", payload)
+        print(f"➡️ Sending to agent [{cid}]: {email['subject']!r}, {len(email['attachments'])} attachment(s)")
 
         # send the full payload to your LangGraph server
-        resp = requests.post("http://localhost:2000/incoming-email", json=payload)
-        print("Agent response:", resp.text)
-
-    except Exception as e:
-        print("❌ Background processing failed:", e)
+        with span(AGENT_SECONDS) as record:
+            resp = get_http().post(AGENT_URL, json=payload, headers={CORRELATION_HEADER: cid},
+                                   timeout=request_timeout(AGENT_READ_TIMEOUT))
+            record["status"] = str(resp.status_code)
+        resp.raise_for_status()
+        print(f"Agent response [{cid}]:", resp.text)
+
+    # Spooled attachments are content-addressed and may be shared with another
+    # in-flight message, so they are aged out rather than deleted here.
+    cleanup_spool()
+
+
+# Durable queue between Graph notifications and the agent server
+work_queue = WorkQueue(process_message)
+# Delta-query sweep: the only ingestion path in "delta" mode, a safety net for missed notifications otherwise
+delta_poller = DeltaPoller(work_queue, tokens, ingestion_state)
+# Outgoing mail: coalesced and sent through Graph $batch by a background flusher
+outbox = Outbox(tokens)
+
+
+@app.on_event("startup")
+def start_queue_workers():
+    cleanup_spool()
+    tokens.start()
+    work_queue.start()
+    outbox.start()
+    # The first delta round runs immediately and catches up on mail that arrived while we were down
+    delta_poller.start()
+    if INGESTION_MODE == "webhook":
+        if WEBHOOK_URL:
+            subscriptions.start()
+        else:
+            print("⚠️ WEBHOOK_URL / NGROK_URL not set — no Graph subscription, relying on the delta sweep")
 
 
 # -----------------------------------
 # WEBHOOK ENDPOINT — NON-BLOCKING VERSION
 # -----------------------------------
 @app.api_route("/webhook", methods=["GET", "POST"])
-async def webhook(request: Request, background_tasks: BackgroundTasks):
+async def webhook(request: Request):
 
     # --- VALIDATION HANDLING ---
     validation = request.query_params.get("validationToken")
@@ -150,87 +147,75 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
     print("\n📩 EVENT:", body)
 
     try:
-        message_id = body["value"][0]["resourceData"]["id"]
+        message_ids = [n["resourceData"]["id"] for n in body["value"]]
+    except Exception as e:
+        print("⚠️ Parsing error:", e)
+        return {"status": "accepted"}
 
-        # 🛑 DEDUPE: skip if already processed
-        if message_id in processed_messages:
-            print(f"⚠️ Duplicate notification ignored: {message_id}")
-            return {"status": "duplicate"}
+    try:
+        # 🛑 DEDUPE: the queue ignores message ids it has already seen
+        accepted = work_queue.enqueue_many(message_ids)
+    except QueueFull as e:
+        # Backpressure — Graph redelivers notifications that get a 503
+        print("🚦 Queue full, asking Graph to retry later:", e)
+        return Response(status_code=503, headers={"Retry-After": "60"})
+    if accepted < len(message_ids):
+        print(f"⚠️ {len(message_ids) - accepted} duplicate notification(s) ignored")
 
-        processed_messages[message_id] = True
+    print("⬅️ Webhook acknowledged, processing will continue on the queue.")
 
-        # 🚀 DO NOT PROCESS HERE — schedule background task
-        background_tasks.add_task(process_in_background, message_id)
+    # respond immediately (must be under 5 seconds)
+    return {"status": "accepted" if accepted else "duplicate"}
 
-        print("⬅️ Webhook acknowledged, processing will continue in background.")
 
-    except Exception as e:
-        print("⚠️ Parsing error:", e)
+# -----------------------------------
+# QUEUE METRICS
+# -----------------------------------
+@app.get("/queue/metrics")
+def queue_metrics():
+    return work_queue.metrics()
+
+
+@app.get("/queue/dead-letters")
+def queue_dead_letters():
+    return work_queue.dead_letters()
 
-    # respond immediately (must be under 5 seconds)
-    return {"status": "accepted"}
+
+@app.post("/queue/dead-letters/{message_id}/retry")
+def retry_dead_letter(message_id: str):
+    if not work_queue.retry_dead_letter(message_id):
+        raise HTTPException(status_code=404, detail="Unknown dead letter")
+    return {"status": "requeued"}
 
 
 # -----------------------------------
-# FETCH EMAIL
+# INGESTION (delta sweep + subscription)
 # -----------------------------------
-def fetch_email(message_id):
-    url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}"
-    headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-
-    r = requests.get(url, headers=headers)
-    data = r.json()
-
-    subject = data.get("subject", "")
-    body_html = data.get("body", {}).get("content", "")
-    body_text = re.sub(r"<.*?>", "", body_html).strip()
-    sender_email = data.get("from", {}).get("emailAddress", {}).get("address", "")
-    recipient_email = (
-        data.get("toRecipients", [{}])[0]
-        .get("emailAddress", {})
-        .get("address", "")
-    )
-
-    attachments_list = []
-
-    if data.get("hasAttachments"):
-
-        # 1️⃣ Get metadata list
-        meta_url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}/attachments"
-        meta_resp = requests.get(meta_url, headers=headers).json()
-
-        for att in meta_resp.get("value", []):
-            att_id = att["id"]
-            att_name = att["name"]
-
-            # Only handle file attachments
-            if att["@odata.type"] != "#microsoft.graph.fileAttachment":
-                print(f"Skipping non-file attachment: {att_name}")
-                continue
-
-            # 2️⃣ Download raw file stream
-            download_url = f"https://graph.microsoft.com/v1.0/me/messages/{message_id}/attachments/{att_id}/$value"
-            file_resp = requests.get(download_url, headers=headers)
-
-            if file_resp.status_code == 200:
-                saved_path = save_attachment_stream(att_name, file_resp.content)
-                attachments_list.append(saved_path)
-            else:
-                print(f"❌ Failed to download attachment {att_name}")
-
-    summary = {
-        "subject": subject,
-        "body": body_text,
-        "sender_email": sender_email,
-        "recipient_email": recipient_email,
-        "received_time": data.get("receivedDateTime", ""),
-        "attachments": attachments_list
+@app.get("/ingestion/metrics")
+def ingestion_metrics():
+    return {
+        **delta_poller.metrics(),
+        "subscription_id": ingestion_state.get("subscription_id"),
+        "subscription_expires_at": ingestion_state.get_float("subscription_expires_at") or None,
     }
 
-    print("\n📨 CLEAN EMAIL DATA:", summary)
-    return summary
+
+@app.post("/ingestion/sync")
+def ingestion_sync():
+    """Run a delta catch-up round now."""
+    try:
+        return {"queued": delta_poller.sync()}
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
+# -----------------------------------
+# FETCH EMAIL
+# -----------------------------------
+def fetch_email(message_id):
+    summary = fetch_message(message_id, tokens)
+    print(f"📨 Fetched email from {summary['sender_email']}: {summary['subject']!r}")
+    return summary
 
 
 # -----------------------------------
@@ -242,51 +227,53 @@ class SendEmailRequest(BaseModel):
     subject: str
     body: str
 
-@app.post("/send-email")
-def send_email_route(payload: SendEmailRequest):
-    url = "https://graph.microsoft.com/v1.0/me/sendMail"
-
-    # Convert text newlines to HTML <br>
-    html_body = payload.body.replace("\n", "<br>")
-
-    # Build message
-    email_msg = {
-        "message": {
-            "subject": payload.subject,
-            "body": {
-                "contentType": "HTML",
-                "content": html_body
-            },
-            "toRecipients": [
-                {"emailAddress": {"address": payload.recipient}}
-            ]
-        },
-        "saveToSentItems": "true"
-    }
+@app.post("/send-email", status_code=202)
+def send_email_route(payload: SendEmailRequest, x_correlation_id: Optional[str] = Header(None)):
+    """Queue the email and return immediately; the outbox flusher delivers it via Graph $batch."""
+    request_id = outbox.enqueue(payload.recipient, payload.subject, payload.body, payload.cc, x_correlation_id)
+    return {"status": "queued", "id": request_id}
+
+
+@app.get("/send-email/{request_id}")
+def send_email_status(request_id: str):
+    status = outbox.status(request_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown email request")
+    return status
 
-    # --------------------------------------------
-    # Add CC recipients only if provided
-    # --------------------------------------------
-    if payload.cc:
-        email_msg["message"]["ccRecipients"] = [
-            {"emailAddress": {"address": cc_addr}}
-            for cc_addr in payload.cc
-        ]
-
-    headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
-        "Content-Type": "application/json"
-    }
 
-    r = requests.post(url, headers=headers, json=email_msg)
+@app.get("/outbox/metrics")
+def outbox_metrics():
+    return outbox.metrics()
 
-    if r.status_code == 202:
-        return {"status": "success", "detail": "Email sent successfully."}
 
-    raise HTTPException(
-        status_code=r.status_code,
-        detail={"error": "Failed to send email", "response": r.text}
-    )
+# -----------------------------------
+# CONNECTION POOL STATS
+# -----------------------------------
+@app.get("/pool-stats")
+def http_pool_stats():
+    return {**pool_stats(), "graph": graph_stats()}
+
+
+# -----------------------------------
+# METRICS
+# -----------------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return render({
+        "mail_queue": work_queue.metrics(),
+        "outbox": outbox.metrics(),
+        "ingestion": delta_poller.metrics(),
+        "oauth_token": tokens.stats(),
+        "graph": graph_stats(),
+        "http_pool": pool_stats(),
+    })
+
+
+@app.get("/spans")
+def spans(correlation_id: Optional[str] = None, limit: int = 200):
+    """Recent Graph, agent and outbox spans, e.g. everything for one X-Correlation-ID."""
+    return recent_spans(correlation_id, limit)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,303 @@
+import os
+import time
+import random
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+QUEUE_DB = os.getenv("QUEUE_DB", "mail_queue.db")
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "4"))
+QUEUE_MAX_DEPTH = int(os.getenv("QUEUE_MAX_DEPTH", "500"))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "5"))
+QUEUE_BACKOFF_SECONDS = float(os.getenv("QUEUE_BACKOFF_SECONDS", "5"))
+QUEUE_MAX_BACKOFF_SECONDS = float(os.getenv("QUEUE_MAX_BACKOFF_SECONDS", "600"))
+# Finished rows are kept this long so late duplicate notifications are still ignored
+QUEUE_RETENTION_HOURS = float(os.getenv("QUEUE_RETENTION_HOURS", "24"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id   TEXT UNIQUE NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    enqueued_at  REAL NOT NULL,
+    available_at REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+
+CREATE TABLE IF NOT EXISTS dead_letter (
+    message_id  TEXT PRIMARY KEY,
+    attempts    INTEGER NOT NULL,
+    last_error  TEXT,
+    enqueued_at REAL NOT NULL,
+    failed_at   REAL NOT NULL
+);
+"""
+
+
+class QueueFull(Exception):
+    """Raised when the queue is at QUEUE_MAX_DEPTH and cannot accept more work."""
+
+
+class WorkQueue:
+    """
+    Durable SQLite-backed queue of Graph message ids, drained by a bounded
+    pool of worker threads with retry, exponential backoff and a dead-letter table.
+    """
+
+    def __init__(self, handler, path: str = QUEUE_DB, workers: int = QUEUE_WORKERS,
+                 max_depth: int = QUEUE_MAX_DEPTH, max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        self.handler = handler
+        self.path = path
+        self.workers = workers
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition()
+        self.threads = []
+        self.wait_times = deque(maxlen=1000)
+        self.counters = {"enqueued": 0, "duplicates": 0, "rejected": 0,
+                         "succeeded": 0, "retried": 0, "dead_lettered": 0}
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived autocommit connection; every statement is its own transaction."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # --------------------------------------------------
+    # Producer side
+    # --------------------------------------------------
+    def enqueue(self, message_id: str) -> bool:
+        """
+        Persist a message id. Returns False for a duplicate,
+        raises QueueFull when backpressure applies.
+        """
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status != 'done'").fetchone()[0]
+            if depth >= self.max_depth:
+                self.counters["rejected"] += 1
+                raise QueueFull(f"queue depth {depth} reached limit {self.max_depth}")
+
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jobs (message_id, enqueued_at, available_at) VALUES (?, ?, ?)",
+                (message_id, now, now),
+            )
+            if cur.rowcount == 0:
+                self.counters["duplicates"] += 1
+                return False
+
+        self.counters["enqueued"] += 1
+        with self.wakeup:
+            self.wakeup.notify()
+        return True
+
+    def enqueue_many(self, message_ids: list) -> int:
+        """
+        Persist a batch of message ids in one transaction. Returns how many were new.
+        Ids that fit under the depth limit are kept even when QueueFull is raised.
+        """
+        now = time.time()
+        accepted = rejected = 0
+        with self.lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status != 'done'").fetchone()[0]
+                for i, message_id in enumerate(message_ids):
+                    if depth >= self.max_depth:
+                        rejected = len(message_ids) - i
+                        break
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO jobs (message_id, enqueued_at, available_at) VALUES (?, ?, ?)",
+                        (message_id, now, now),
+                    )
+                    if cur.rowcount:
+                        accepted += 1
+                        depth += 1
+                    else:
+                        self.counters["duplicates"] += 1
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        self.counters["enqueued"] += accepted
+        self.counters["rejected"] += rejected
+        if accepted:
+            with self.wakeup:
+                self.wakeup.notify_all()
+        if rejected:
+            raise QueueFull(f"queue depth reached limit {self.max_depth}, {rejected} message(s) not queued")
+        return accepted
+
+    # --------------------------------------------------
+    # Consumer side
+    # --------------------------------------------------
+    def start(self):
+        """Requeue work interrupted by a crash and start the worker pool."""
+        if self.threads:
+            return
+        with self._connect() as conn:
+            recovered = conn.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ? WHERE status = 'processing'",
+                (time.time(),),
+            ).rowcount
+        if recovered:
+            print(f"♻️ Requeued {recovered} message(s) interrupted by a restart")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"mail-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _claim(self):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            return conn.execute(
+                """
+                UPDATE jobs SET status = 'processing', started_at = ?, attempts = attempts + 1
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE status = 'pending' AND available_at <= ?
+                    ORDER BY available_at LIMIT 1
+                )
+                RETURNING id, message_id, attempts, enqueued_at
+                """,
+                (now, now),
+            ).fetchone()
+
+    def _next_due_in(self) -> float:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MIN(available_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()
+        if row[0] is None:
+            return 5.0
+        return min(max(row[0] - time.time(), 0.05), 5.0)
+
+    def _run(self):
+        while True:
+            job = self._claim()
+            if job is None:
+                with self.wakeup:
+                    self.wakeup.wait(timeout=self._next_due_in())
+                continue
+
+            job_id, message_id, attempts, enqueued_at = job
+            if attempts == 1:
+                self.wait_times.append(time.time() - enqueued_at)
+
+            try:
+                self.handler(message_id)
+            except Exception as e:
+                self._fail(job_id, message_id, attempts, enqueued_at, repr(e))
+            else:
+                self._complete(job_id)
+
+    def _complete(self, job_id: int):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, last_error = NULL WHERE id = ?",
+                (now, job_id),
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?",
+                (now - QUEUE_RETENTION_HOURS * 3600,),
+            )
+        self.counters["succeeded"] += 1
+
+    def _fail(self, job_id: int, message_id: str, attempts: int, enqueued_at: float, error: str):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            if attempts >= self.max_attempts:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dead_letter VALUES (?, ?, ?, ?, ?)",
+                    (message_id, attempts, error, enqueued_at, now),
+                )
+                # Keep the row as 'done' so duplicate notifications stay ignored
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', finished_at = ?, last_error = ? WHERE id = ?",
+                    (now, error, job_id),
+                )
+                self.counters["dead_lettered"] += 1
+                print(f"☠️ Message {message_id} moved to dead letters after {attempts} attempts: {error}")
+                return
+
+            backoff = min(QUEUE_BACKOFF_SECONDS * 2 ** (attempts - 1), QUEUE_MAX_BACKOFF_SECONDS)
+            backoff *= random.uniform(0.8, 1.2)
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', available_at = ?, last_error = ? WHERE id = ?",
+                (now + backoff, error, job_id),
+            )
+        self.counters["retried"] += 1
+        print(f"🔁 Message {message_id} failed (attempt {attempts}), retrying in {backoff:.0f}s: {error}")
+
+    # --------------------------------------------------
+    # Dead letters
+    # --------------------------------------------------
+    def dead_letters(self) -> list:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT message_id, attempts, last_error, enqueued_at, failed_at "
+                "FROM dead_letter ORDER BY failed_at DESC"
+            ).fetchall()
+        keys = ("message_id", "attempts", "last_error", "enqueued_at", "failed_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def retry_dead_letter(self, message_id: str) -> bool:
+        """Move a dead letter back onto the queue with a fresh attempt budget."""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            if conn.execute("DELETE FROM dead_letter WHERE message_id = ?", (message_id,)).rowcount == 0:
+                return False
+            conn.execute(
+                """
+                INSERT INTO jobs (message_id, enqueued_at, available_at) VALUES (?, ?, ?)
+                ON CONFLICT (message_id) DO UPDATE
+                SET status = 'pending', attempts = 0, available_at = excluded.available_at
+                """,
+                (message_id, now, now),
+            )
+        with self.wakeup:
+            self.wakeup.notify()
+        return True
+
+    # --------------------------------------------------
+    # Metrics
+    # --------------------------------------------------
+    def metrics(self) -> dict:
+        now = time.time()
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(enqueued_at) FROM jobs WHERE status = 'pending'"
+            ).fetchone()[0]
+            dead = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+        waits = sorted(self.wait_times)
+        return {
+            "depth": counts.get("pending", 0),
+            "processing": counts.get("processing", 0),
+            "dead_letters": dead,
+            "max_depth": self.max_depth,
+            "workers": self.workers,
+            "oldest_pending_age_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "wait_seconds_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_seconds_p95": round(waits[int(len(waits) * 0.95)], 3) if waits else 0.0,
+            **self.counters,
+        }
@@ -0,0 +1,142 @@
+"""
+diff_contract on the sample EOI (data/EOI_John_Jane-Smith.pdf) against the
+fields of the sample contracts (data/CONTRACT_OF_SALE_*_V1/V2), written out
+as the contract checker's extraction would return them.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import copy
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agents"))
+from contract_diff import diff_contract  # noqa: E402
+
+EOI = {
+    "Purchaser": [
+        {"First_Name": "John", "Last_Name": "Smith", "Purchaser_Mobile": "+61 411 222 333",
+         "Purchaser_Email": "johnsmith@gmail.com"},
+        {"First_Name": "Jane", "Last_Name": "Smith", "Purchaser_Mobile": "+61 422 333 444",
+         "Purchaser_Email": "janesmith@gmail.com"},
+    ],
+    "Residential_Address": "32 Wallaby Way Sydney 2000 NSW",
+    "Lot_Number": "95",
+    "Property_Address": "Fake Rise VIC 3336",
+    "Project_Name": "",
+    "Total_Price": "AU$ 550,000.00",
+    "Land_Price": "AU$ 250,000.00",
+    "Build_Price": "AU$ 300,000.00",
+    "Finance_Terms": "Not Subject to Finance",
+    "Solicitor_Email": "michael@biglegalfirm.com.au",
+    "Solicitor_Name": "Michael Ken",
+    "Finance_Provider": "Great Finance",
+}
+
+# V2 agrees with the EOI in every field it states
+CONTRACT_V2 = {
+    "Purchaser": [
+        {"First_Name": "John", "Last_Name": "Smith", "Purchaser_Email": "johnsmith@gmail.com",
+         "Purchaser_Mobile": "+61 411 222 333"},
+        {"First_Name": "Jane", "Last_Name": "Smith", "Purchaser_Email": "janesmith@gmail.com",
+         "Purchaser_Mobile": "+61 422 333 444"},
+    ],
+    "Residential_Address": None,
+    "Lot_Number": "95",
+    "Property_Address": "Fake Rise, VIC 3336",
+    "Project_Name": "Fake Rise Estate",
+    "Total_Price": "AU$550,000.00",
+    "Land_Price": "AU$250,000.00",
+    "Build_Price": "AU$300,000.00",
+    "Finance_Terms": "Not Subject to Finance",
+    "Solicitor_Name": "Michael Ken",
+    "Solicitor_Email": "michael@biglegalfirm.com.au",
+    "Finance_Provider": None,
+}
+
+# V1: wrong lot, prices, finance terms and Jane's email
+CONTRACT_V1 = copy.deepcopy(CONTRACT_V2)
+CONTRACT_V1["Purchaser"][1]["Purchaser_Email"] = "jane.smith@outlook.com"
+CONTRACT_V1.update(Lot_Number="59", Total_Price="AU$565,000.00", Build_Price="AU$315,000.00",
+                   Finance_Terms="Subject to Finance")
+
+
+@pytest.fixture
+def eoi() -> dict:
+    return copy.deepcopy(EOI)
+
+
+@pytest.fixture
+def v1() -> dict:
+    return copy.deepcopy(CONTRACT_V1)
+
+
+@pytest.fixture
+def v2() -> dict:
+    return copy.deepcopy(CONTRACT_V2)
+
+
+def incorrect(result: dict) -> dict:
+    return {f["Field"]: (f["EOI_Value"], f["Contract_Value"]) for f in result["Incorrect_Fields"]}
+
+
+def test_matching_contract_validates(eoi, v2):
+    result = diff_contract(eoi, v2)
+    assert result == {"Contract_Validation": True, "Incorrect_Fields": []}
+
+
+def test_reports_each_discrepancy(eoi, v1):
+    result = diff_contract(eoi, v1)
+    assert not result["Contract_Validation"]
+    assert incorrect(result) == {
+        "Purchaser_Email (Jane Smith)": ("janesmith@gmail.com", "jane.smith@outlook.com"),
+        "Lot_Number": ("95", "59"),
+        "Total_Price": ("AU$ 550,000.00", "AU$565,000.00"),
+        "Build_Price": ("AU$ 300,000.00", "AU$315,000.00"),
+        "Finance_Terms": ("Not Subject to Finance", "Subject to Finance"),
+    }
+
+
+def test_full_name_in_first_name_is_not_a_mismatch(eoi, v2):
+    contract = copy.deepcopy(v2)
+    for purchaser in contract["Purchaser"]:
+        purchaser["First_Name"] = f"{purchaser['First_Name']} {purchaser['Last_Name']}"
+        purchaser["Last_Name"] = None
+    assert diff_contract(eoi, contract)["Contract_Validation"]
+
+
+def test_missing_name_part_is_unknown_not_different(eoi, v2):
+    contract = copy.deepcopy(v2)
+    contract["Purchaser"][0]["Last_Name"] = None
+    contract["Purchaser"][1]["First_Name"] = None
+    assert diff_contract(eoi, contract)["Contract_Validation"]
+
+
+def test_name_order_does_not_matter(eoi, v2):
+    contract = copy.deepcopy(v2)
+    for purchaser in contract["Purchaser"]:
+        purchaser["First_Name"], purchaser["Last_Name"] = purchaser["Last_Name"], purchaser["First_Name"]
+    assert diff_contract(eoi, contract)["Contract_Validation"]
+
+
+def test_different_purchaser_is_reported(eoi, v2):
+    contract = copy.deepcopy(v2)
+    contract["Purchaser"][1].update(First_Name="Janet", Last_Name=None)
+    assert incorrect(diff_contract(eoi, contract)) == {"Purchaser_Name": ("Jane Smith", "Janet")}
+
+
+def test_fields_the_contract_does_not_state_are_skipped(eoi, v2):
+    contract = copy.deepcopy(v2)
+    for field in ("Lot_Number", "Total_Price", "Finance_Terms", "Solicitor_Name"):
+        contract[field] = None
+    contract["Purchaser"][0]["Purchaser_Email"] = None
+    assert diff_contract(eoi, contract)["Contract_Validation"]
+
+
+def test_empty_eoi_fields_are_ignored(eoi, v1):
+    empty = copy.deepcopy(eoi)
+    for field in ("Lot_Number", "Total_Price", "Build_Price", "Finance_Terms"):
+        empty[field] = ""
+    empty["Purchaser"][1]["Purchaser_Email"] = ""
+    assert diff_contract(empty, v1)["Contract_Validation"]
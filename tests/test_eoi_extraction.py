@@ -0,0 +1,99 @@
+"""
+eoi_extractor on an email carrying two EOIs, with extraction and ingestion
+stubbed: a failure in either fails the email, and the retry only redoes the
+EOI that failed.
+
+    python -m pytest tests
+"""
+import os
+import sys
+import asyncio
+import hashlib
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agents"))
+import deal_index  # noqa: E402
+import eoi_extraction_agent  # noqa: E402
+from deal_index import DealIndex  # noqa: E402
+
+
+def eoi(address: str) -> dict:
+    return {"Purchaser": [{"First_Name": "John", "Last_Name": "Smith", "Purchaser_Email": "johnsmith@gmail.com",
+                           "Purchaser_Mobile": "+61 411 222 333"}],
+            "Residential_Address": "32 Wallaby Way Sydney 2000 NSW", "Lot_Number": "95",
+            "Property_Address": address, "Project_Name": "", "Total_Price": "AU$ 550,000.00",
+            "Land_Price": "AU$ 250,000.00", "Build_Price": "AU$ 300,000.00",
+            "Finance_Terms": "Not Subject to Finance", "Solicitor_Name": "Michael Ken",
+            "Solicitor_Email": "michael@biglegalfirm.com.au", "Finance_Provider": None}
+
+
+def spool(directory, name: str) -> str:
+    """Write an attachment the way the mail monitor spools it: <sha256>__<name>."""
+    data = f"%PDF-1.4 {name}".encode()
+    path = directory / f"{hashlib.sha256(data).hexdigest()}__{name}"
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """Stubbed extraction (fails for names in `failing`), a scratch deal index and a recording ingest."""
+    state = {"failing": set(), "extracted": [], "ingested": []}
+    index = DealIndex(path=str(tmp_path / "deal_index.jsonl"))
+
+    async def extract(client, path, body):
+        name = os.path.basename(path).split("__", 1)[1]
+        state["extracted"].append(name)
+        if name in state["failing"]:
+            raise RuntimeError(f"could not read {name}")
+        return eoi(f"{name[:-4]} Street, Tarneit VIC 3029")
+
+    monkeypatch.setattr(deal_index, "DEAL_INDEX", index)
+    monkeypatch.setattr(eoi_extraction_agent, "get_async_openai", lambda: None)
+    monkeypatch.setattr(eoi_extraction_agent, "extract_eoi", extract)
+    monkeypatch.setattr(eoi_extraction_agent, "ingest_eoi", lambda e, sender: state["ingested"].append(e))
+    state["index"] = index
+    return state
+
+
+def run(paths: list) -> dict:
+    email = {"from": "agent@example.com", "body": "", "attachments": paths}
+    return asyncio.run(eoi_extraction_agent.eoi_extractor({"email": email}))
+
+
+def test_one_failed_eoi_fails_the_email_and_the_retry_redoes_only_it(agent, tmp_path):
+    paths = [spool(tmp_path, "1.pdf"), spool(tmp_path, "2.pdf")]
+
+    agent["failing"] = {"2.pdf"}
+    with pytest.raises(RuntimeError, match="1 of 2"):
+        run(paths)
+    assert [e["Property_Address"] for e in agent["ingested"]] == ["1 Street, Tarneit VIC 3029"]
+
+    agent["failing"], agent["extracted"] = set(), []
+    result = run(paths)
+    assert agent["extracted"] == ["2.pdf"]
+    assert [e["Property_Address"] for e in agent["ingested"]] == ["1 Street, Tarneit VIC 3029",
+                                                                  "2 Street, Tarneit VIC 3029"]
+    assert [d["status"] for d in result["documents"]] == ["ok", "ok"]
+    assert len(agent["index"]) == 2
+
+
+def test_already_ingested_eois_survive_a_restart(agent, tmp_path):
+    paths = [spool(tmp_path, "1.pdf")]
+    run(paths)
+
+    restarted = DealIndex(path=agent["index"].path)
+    assert restarted.ingested(os.path.basename(paths[0]).split("__", 1)[0]) == eoi("1 Street, Tarneit VIC 3029")
+    assert restarted.deals == agent["index"].deals
+
+
+def test_same_deal_is_upserted_not_appended(tmp_path):
+    index = DealIndex(path=str(tmp_path / "deal_index.jsonl"))
+    assert index.add(eoi("1 Street, Tarneit VIC 3029"))
+    assert not index.add(eoi("1 Street, Tarneit VIC 3029"))
+    changed = {**eoi("1 Street, Tarneit VIC 3029"), "Lot_Number": "96"}
+    assert index.add(changed)
+    assert list(index.deals.values()) == [changed]
+    with open(index.path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
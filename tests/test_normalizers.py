@@ -0,0 +1,42 @@
+"""
+normalize_amount / normalize_phone on the formats seen in EOIs and contracts.
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agents"))
+from normalizers import normalize_amount, normalize_phone  # noqa: E402
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("AU$ 550,000.00", 55000000),
+    ("$550,000", 55000000),
+    ("$550,000 3 bedrooms", 55000000),
+    ("1 200 000", 120000000),
+    ("$550k", 55000000),
+    ("1.2m", 120000000),
+    ("1.2 million", 120000000),
+])
+def test_normalize_amount(text, cents):
+    assert normalize_amount(text) == cents
+
+
+def test_normalize_amount_without_a_number():
+    assert normalize_amount("TBC") is None
+
+
+@pytest.mark.parametrize("text, digits", [
+    ("+61 411 222 333", "0411222333"),
+    ("+61 0411 222 333", "0411222333"),
+    ("0061 411 222 333", "0411222333"),
+    ("0411 222 333", "0411222333"),
+    ("(03) 9123 4567", "0391234567"),
+    ("61 3 9123 4567", "0391234567"),
+    ("6123 4567", "61234567"),
+])
+def test_normalize_phone(text, digits):
+    assert normalize_phone(text) == digits